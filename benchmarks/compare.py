@@ -0,0 +1,77 @@
+"""Compare two benchmark results, failing on regressions.
+
+Usage::
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+# -----------------------------------------------------------------------------
+
+
+def compare(
+    baseline: Dict[str, Any], current: Dict[str, Any], threshold: float
+) -> List[str]:
+    """The regressions of ``current`` over ``baseline`` beyond ``threshold``.
+
+    Throughput may drop, and introspection time, peak memory, bytes
+    transferred and (for ``startup`` results) import time and time to the
+    first row may grow, by at most ``threshold`` (a fraction).
+    """
+    regressions = []
+
+    def check(name: str, before: Optional[float], after: Optional[float]) -> None:
+        if not before or after is None:
+            return
+        change = (after - before) / before
+        # Higher is better for throughput only
+        if name.endswith("rows_per_sec"):
+            change = -change
+        if change > threshold:
+            regressions.append(f"{name}: {before:.6g} -> {after:.6g}")
+
+    check("introspection", baseline.get("introspection"), current.get("introspection"))
+    for key in ["import", "first_row"]:
+        check(
+            f"startup.{key}",
+            baseline.get("startup", {}).get(key),
+            current.get("startup", {}).get(key),
+        )
+    for mode, before in baseline.get("modes", {}).items():
+        after = current.get("modes", {}).get(mode)
+        if after is None:
+            continue
+        for key in ["rows_per_sec", "peak_memory", "bytes"]:
+            check(f"{mode}.{key}", before.get(key), after.get(key))
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    if baseline.get("config") != current.get("config"):
+        sys.stderr.write("Warning: results were run with different configs\n")
+
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        sys.stdout.write(f"REGRESSION {regression}\n")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
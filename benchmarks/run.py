@@ -0,0 +1,185 @@
+"""Benchmark graphqldb against a local synthetic GraphQL server.
+
+Usage::
+
+    python -m benchmarks.run --rows 10000 --width 20 --output results.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess  # noqa: S404
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+from graphqldb import events
+from graphqldb.dialect import get_adapter
+
+from .server import SchemaConfig, SyntheticServer, serve
+
+# -----------------------------------------------------------------------------
+
+# How the rows are read
+MODES = ["direct", "vtable", "arrow"]
+
+# -----------------------------------------------------------------------------
+
+
+def get_commit() -> Optional[str]:
+    try:
+        return subprocess.run(  # noqa: S603,S607
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _read_sql(engine: Engine, table: str) -> Callable[[], int]:
+    def read() -> int:
+        with engine.connect() as connection:
+            result = connection.execute(text(f'SELECT * FROM "{table}"'))  # noqa: S608
+            return sum(1 for _ in result)
+
+    return read
+
+
+def _read_arrow(engine: Engine, table: str) -> Callable[[], int]:
+    from graphqldb import fetch_arrow
+
+    def read() -> int:
+        return fetch_arrow(engine, table).num_rows
+
+    return read
+
+
+def measure(
+    read: Callable[[], int], server: SyntheticServer, repeat: int
+) -> Dict[str, Any]:
+    """Run ``read`` ``repeat`` times, reporting the median of the timings."""
+    durations = []
+    request_durations = []
+    decode_durations = []
+    peaks = []
+    rows = 0
+    requests_start, bytes_start = server.requests, server.bytes_sent
+
+    recorded: List[events.QueryEvent] = []
+    events.add_listener(recorded.append)
+    try:
+        for _ in range(repeat):
+            recorded.clear()
+            tracemalloc.start()
+            start = time.perf_counter()
+            rows = read()
+            durations.append(time.perf_counter() - start)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            request_durations.append(sum(e.request_duration for e in recorded))
+            decode_durations.append(sum(e.decode_duration for e in recorded))
+    finally:
+        events.remove_listener(recorded.append)
+
+    duration = statistics.median(durations)
+    return {
+        "rows": rows,
+        "duration": duration,
+        "rows_per_sec": rows / duration if duration else None,
+        "request_duration": statistics.median(request_durations),
+        "decode_duration": statistics.median(decode_durations),
+        "peak_memory": max(peaks),
+        "requests": (server.requests - requests_start) // repeat,
+        "bytes": (server.bytes_sent - bytes_start) // repeat,
+    }
+
+
+def run(config: SchemaConfig, modes: List[str], repeat: int) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "commit": get_commit(),
+        "python": sys.version.split()[0],
+        "config": config._asdict(),
+        "modes": {},
+    }
+    with serve(config) as (url, server):
+        table = config.get_table_name(0)
+        list_queries = None if config.relay else [table]
+
+        # Introspecting the schema is the cost of the first statement on a table
+        engine = create_engine(url, list_queries=list_queries)
+        start = time.perf_counter()
+        get_adapter(engine, table)
+        results["introspection"] = time.perf_counter() - start
+
+        for mode in modes:
+            if mode == "arrow":
+                read = _read_arrow(engine, table)
+            else:
+                mode_engine = create_engine(
+                    url,
+                    list_queries=list_queries,
+                    direct_execution=mode == "direct",
+                )
+                read = _read_sql(mode_engine, table)
+            results["modes"][mode] = measure(read, server, repeat)
+
+    # Of the whole process (kilobytes on Linux)
+    results["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return results
+
+
+# -----------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    defaults = SchemaConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=defaults.rows)
+    parser.add_argument("--width", type=int, default=defaults.width)
+    parser.add_argument("--types", type=int, default=defaults.types)
+    parser.add_argument("--page-size", type=int, default=defaults.page_size)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=defaults.latency,
+        help="Seconds added to every request",
+    )
+    parser.add_argument(
+        "--lists",
+        action="store_true",
+        help="Serve plain lists rather than Relay connections",
+    )
+    parser.add_argument("--mode", action="append", choices=MODES, dest="modes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write the results here, not to stdout")
+    args = parser.parse_args(argv)
+
+    config = SchemaConfig(
+        types=args.types,
+        width=args.width,
+        rows=args.rows,
+        relay=not args.lists,
+        page_size=args.page_size,
+        latency=args.latency,
+    )
+    results = run(config, args.modes or MODES, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
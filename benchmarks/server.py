@@ -0,0 +1,247 @@
+"""A local GraphQL server over a synthetic schema, for benchmarking.
+
+This is not a GraphQL implementation: it answers the introspection query and
+the page queries that ``GraphQLAdapter`` sends, which is all we need.
+"""
+from __future__ import annotations
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# -----------------------------------------------------------------------------
+
+# Scalar types of the non-id fields, in turn
+FIELD_TYPES = ["String", "Int", "Float", "Boolean"]
+
+
+class SchemaConfig(NamedTuple):
+    # Number of tables (root fields)
+    types: int = 1
+    # Number of fields on each node, including ``id``
+    width: int = 10
+    # Rows in each table
+    rows: int = 1000
+    # Relay connections (``allItems0``) or plain lists (``items0``)
+    relay: bool = True
+    # Page size used when the client doesn't ask for one
+    page_size: int = 100
+    # Seconds added to every request
+    latency: float = 0.0
+
+    def get_table_name(self, i: int) -> str:
+        return f"allItems{i}" if self.relay else f"items{i}"
+
+    def get_fields(self) -> List[Tuple[str, str]]:
+        return [("id", "ID")] + [
+            (f"f{j}", FIELD_TYPES[(j - 1) % len(FIELD_TYPES)])
+            for j in range(1, self.width)
+        ]
+
+
+# -----------------------------------------------------------------------------
+
+
+def _type_ref(name: Optional[str], kind: str, of_type: Any = None) -> Dict[str, Any]:
+    return {"name": name, "kind": kind, "ofType": of_type}
+
+
+def _object(name: str, fields: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"name": name, "kind": "OBJECT", "fields": fields, "interfaces": []}
+
+
+def get_introspection(config: SchemaConfig) -> Dict[str, Any]:
+    query_fields = []
+    types = [
+        {"name": name, "kind": "SCALAR", "fields": None, "interfaces": None}
+        for name in ["ID", "Boolean"] + FIELD_TYPES
+    ]
+    node_fields = [
+        {"name": name, "type": _type_ref(type_name, "SCALAR")}
+        for name, type_name in config.get_fields()
+    ]
+    for i in range(config.types):
+        if config.relay:
+            query_fields.append(
+                {
+                    "name": config.get_table_name(i),
+                    "type": _type_ref(f"ItemsConnection{i}", "OBJECT"),
+                    "args": [
+                        {"name": "after", "type": {"kind": "SCALAR"}},
+                        {"name": "first", "type": {"kind": "SCALAR"}},
+                    ],
+                }
+            )
+            types.append(
+                _object(
+                    f"ItemsConnection{i}",
+                    [
+                        {
+                            "name": "edges",
+                            "type": _type_ref(
+                                None, "LIST", _type_ref(f"ItemsEdge{i}", "OBJECT")
+                            ),
+                        },
+                        {"name": "pageInfo", "type": _type_ref("PageInfo", "OBJECT")},
+                    ],
+                )
+            )
+            types.append(
+                _object(
+                    f"ItemsEdge{i}",
+                    [{"name": "node", "type": _type_ref(f"Item{i}", "OBJECT")}],
+                )
+            )
+        else:
+            query_fields.append(
+                {
+                    "name": config.get_table_name(i),
+                    "type": _type_ref(
+                        None,
+                        "NON_NULL",
+                        _type_ref(
+                            None,
+                            "LIST",
+                            _type_ref(
+                                None, "NON_NULL", _type_ref(f"Item{i}", "OBJECT")
+                            ),
+                        ),
+                    ),
+                    "args": [],
+                }
+            )
+        types.append(_object(f"Item{i}", node_fields))
+
+    types.append(
+        _object(
+            "PageInfo",
+            [
+                {"name": "hasNextPage", "type": _type_ref("Boolean", "SCALAR")},
+                {"name": "endCursor", "type": _type_ref("String", "SCALAR")},
+            ],
+        )
+    )
+    return {"__schema": {"queryType": {"fields": query_fields}, "types": types}}
+
+
+def get_value(row: int, name: str, type_name: str) -> Any:
+    if type_name == "ID":
+        return f"item-{row}"
+    j = int(name[1:])
+    if type_name == "String":
+        return f"value {row} {j}"
+    elif type_name == "Int":
+        return row * j
+    elif type_name == "Float":
+        return row / (j + 1)
+    return row % 2 == 0
+
+
+# -----------------------------------------------------------------------------
+
+ROOT_FIELD_RE = re.compile(r"query\s*{\s*(\w+)\s*(\(([^)]*)\))?")
+ARG_RE = re.compile(r'(\w+):\s*("([^"]*)"|\d+)')
+NODE_SELECTION_RE = re.compile(r"node\s*{([^{}]*)}")
+LIST_SELECTION_RE = re.compile(r"query\s*{\s*\w+\s*(\([^)]*\))?\s*{([^{}]*)}")
+
+
+class SyntheticServer:
+    def __init__(self, config: SchemaConfig):
+        self.config = config
+        self.introspection = json.dumps({"data": get_introspection(config)}).encode()
+        self.fields = dict(config.get_fields())
+
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def get_response(self, query: str) -> bytes:
+        if "__schema" in query:
+            return self.introspection
+
+        match = ROOT_FIELD_RE.search(query)
+        if match is None:
+            raise ValueError(f"Unsupported query: {query}")
+        table = match.group(1)
+        args: Dict[str, Any] = {}
+        for name, value, value_str in ARG_RE.findall(match.group(3) or ""):
+            args[name] = value_str if value.startswith('"') else int(value)
+
+        if self.config.relay:
+            selection = NODE_SELECTION_RE.search(query)
+        else:
+            selection = LIST_SELECTION_RE.search(query)
+        if selection is None:
+            raise ValueError(f"Unsupported query: {query}")
+        columns = selection.group(selection.lastindex or 1).split()
+
+        start = int(args.get("after", -1)) + 1
+        if self.config.relay:
+            end = min(
+                start + int(args.get("first", self.config.page_size)), self.config.rows
+            )
+        else:
+            end = self.config.rows
+        nodes = [
+            {c: get_value(row, c, self.fields[c]) for c in columns}
+            for row in range(start, end)
+        ]
+
+        if self.config.relay:
+            data: Any = {
+                "edges": [{"node": node} for node in nodes],
+                "pageInfo": {
+                    "endCursor": str(end - 1) if nodes else None,
+                    "hasNextPage": end < self.config.rows,
+                },
+            }
+        else:
+            data = nodes
+        return json.dumps({"data": {table: data}}).encode()
+
+
+def _make_handler(server: SyntheticServer) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:  # noqa: N802
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            if server.config.latency:
+                time.sleep(server.config.latency)
+
+            response = server.get_response(json.loads(body)["query"])
+            server.requests += 1
+            server.bytes_received += len(body)
+            server.bytes_sent += len(response)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+@contextmanager
+def serve(config: SchemaConfig) -> Iterator[Tuple[str, SyntheticServer]]:
+    """Run the server in a background thread.
+
+    Yields the SQLAlchemy URL to connect with and the server (for its counters).
+    """
+    synthetic = SyntheticServer(config)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _make_handler(synthetic))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        port = httpd.server_address[1]
+        yield f"graphql://127.0.0.1:{port}/graphql?is_https=0", synthetic
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+        thread.join()
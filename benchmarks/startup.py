@@ -0,0 +1,138 @@
+"""Benchmark the cold start of graphqldb: import, engine creation, first row.
+
+Each run is a fresh interpreter reading one row from a local synthetic server,
+as a short-lived script or task would. Usage::
+
+    python -m benchmarks.startup --output startup.json --max-import 1.0
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess  # noqa: S404
+import sys
+from typing import Any, Dict, List, Optional
+
+from .run import get_commit
+from .server import SchemaConfig, serve
+
+# -----------------------------------------------------------------------------
+
+# Optional dependencies that are only to be imported once used
+LAZY_MODULES = ["httpx", "numpy", "opentelemetry", "pyarrow"]
+
+# Run in each fresh interpreter, with the URL and table as arguments
+_CHILD = """
+import json, sys, time
+
+start = time.perf_counter()
+import graphqldb
+package = time.perf_counter()
+import graphqldb.dialect
+imported = time.perf_counter()
+
+from sqlalchemy import create_engine, text
+
+engine = create_engine(sys.argv[1])
+created = time.perf_counter()
+with engine.connect() as connection:
+    query = text('SELECT * FROM "%s" LIMIT 1' % sys.argv[2])
+    connection.execute(query).fetchone()
+first_row = time.perf_counter()
+
+json.dump(
+    {
+        "import_package": package - start,
+        "import": imported - start,
+        "create_engine": created - imported,
+        "first_row": first_row - start,
+        "modules": len(sys.modules),
+        "lazy_modules": sorted(m for m in json.loads(sys.argv[3]) if m in sys.modules),
+    },
+    sys.stdout,
+)
+"""
+
+# -----------------------------------------------------------------------------
+
+
+def measure_once(url: str, table: str) -> Dict[str, Any]:
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", _CHILD, url, table, json.dumps(LAZY_MODULES)],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def run(config: SchemaConfig, repeat: int) -> Dict[str, Any]:
+    with serve(config) as (url, _):
+        runs = [measure_once(url, config.get_table_name(0)) for _ in range(repeat)]
+
+    startup: Dict[str, Any] = {
+        key: statistics.median(r[key] for r in runs)
+        for key in ["import_package", "import", "create_engine", "first_row"]
+    }
+    startup["modules"] = max(r["modules"] for r in runs)
+    startup["lazy_modules"] = sorted({m for r in runs for m in r["lazy_modules"]})
+    return {
+        "commit": get_commit(),
+        "python": sys.version.split()[0],
+        "config": config._asdict(),
+        "startup": startup,
+    }
+
+
+def check_budget(
+    startup: Dict[str, Any],
+    max_import: Optional[float] = None,
+    max_first_row: Optional[float] = None,
+) -> List[str]:
+    """What of ``startup`` is over budget (in seconds), or imported too soon."""
+    failures = []
+    if max_import is not None and startup["import"] > max_import:
+        failures.append(f"import: {startup['import']:.3f}s > {max_import}s")
+    if max_first_row is not None and startup["first_row"] > max_first_row:
+        failures.append(f"first_row: {startup['first_row']:.3f}s > {max_first_row}s")
+    if startup["lazy_modules"]:
+        failures.append(f"imported before use: {', '.join(startup['lazy_modules'])}")
+    return failures
+
+
+# -----------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--max-import", type=float, help="Seconds `import graphqldb.dialect` may take"
+    )
+    parser.add_argument(
+        "--max-first-row",
+        type=float,
+        help="Seconds from the first import to the first row",
+    )
+    parser.add_argument("--output", help="Write the results here, not to stdout")
+    args = parser.parse_args(argv)
+
+    results = run(SchemaConfig(rows=10), args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    failures = check_budget(results["startup"], args.max_import, args.max_first_row)
+    for failure in failures:
+        sys.stderr.write(f"OVER BUDGET {failure}\n")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
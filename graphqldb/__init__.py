@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .columnar import (
+        fetch_arrow,
+        fetch_numpy,
+        iter_arrow_batches,
+        iter_numpy_batches,
+    )
+    from .dialect import explain, refresh_snapshot
+
+__all__ = [
+    "explain",
+    "fetch_arrow",
+    "fetch_numpy",
+    "iter_arrow_batches",
+    "iter_numpy_batches",
+    "refresh_snapshot",
+]
+
+# Where each export lives. These are imported on first use, so importing the
+# package (e.g. for ``graphqldb.events``) doesn't pull in the dialect, and with
+# it shillelagh, APSW and SQLAlchemy.
+_EXPORTS = {
+    "explain": "dialect",
+    "fetch_arrow": "columnar",
+    "fetch_numpy": "columnar",
+    "iter_arrow_batches": "columnar",
+    "iter_numpy_batches": "columnar",
+    "refresh_snapshot": "dialect",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *__all__])
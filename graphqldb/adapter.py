@@ -1,22 +1,36 @@
 from __future__ import annotations
 
-from collections import defaultdict
+import itertools
+import json
+import operator
+import threading
+import time
+import uuid
+import weakref
+from functools import lru_cache
 from typing import (
     Any,
+    Callable,
     Collection,
     Dict,
+    FrozenSet,
+    Generator,
+    Hashable,
+    Iterable,
     Iterator,
     List,
+    Mapping,
+    NamedTuple,
     Optional,
     Sequence,
     Tuple,
-    TypedDict,
+    TypeVar,
     Union,
     cast,
 )
 from urllib.parse import parse_qs, urlparse
 
-from shillelagh.adapters.base import Adapter
+from shillelagh.adapters.base import FIXED_COST, Adapter
 from shillelagh.fields import (
     Boolean,
     Field,
@@ -28,162 +42,250 @@ from shillelagh.fields import (
     ISOTime,
     String,
 )
-from shillelagh.typing import RequestedOrder
-
-from .lib import get_last_query, run_query
+from shillelagh.filters import Equal, Operator
+from shillelagh.typing import RequestedOrder, Row
+
+from . import events, plan
+from .cancel import get_current_scope
+from .checkpoint import CheckpointStore, get_checkpoint_key
+from .cost import get_budget
+from .endpoints import ROUND_ROBIN, get_endpoints, get_pool
+from .incremental import IncrementalResult
+from .interning import DictionaryEncoder
+from .lib import get_last_query, run_query, run_query_incremental
+from .parsing import get_parser
+from .plan import QueryPlan, describe_order_by, describe_predicate
+from .schema import FieldDef, Schema, TypeInfo, TypeRef, get_schema
+from .snapshot import Snapshot, SnapshotConfig
+from .sql import Aggregate, Predicate, Select, SelectItem, sort_rows
+from .transport import HTTP1, MAX_STREAMS, get_session
 
 # -----------------------------------------------------------------------------
 
 
-class MaybeNamed(TypedDict):
-    name: Optional[str]
+QueryArg = Union[str, int]
 
+T = TypeVar("T")
 
-class TypeInfo(MaybeNamed):
-    ofType: Optional[Union[TypeInfo, MaybeNamed]]
-    # technically an enum:
-    kind: str
+# The columns (name and type) and rows of a statement executed directly
+DirectResult = Tuple[List[Tuple[str, Field]], Iterable[Tuple[Any, ...]]]
 
+# -----------------------------------------------------------------------------
 
-class FieldInfo(TypedDict):
-    name: str
-    type: TypeInfo
+# The column (and argument) used to identify a single node
+ID_COLUMN = "id"
 
+# Max number of aliased singular lookups to send in a single request
+LOOKUP_BATCH_SIZE = 50
 
-class TypeInfoWithFields(TypeInfo):
-    fields: Optional[List[FieldInfo]]
+# Estimated cost of resolving an id-equality constraint via a singular field
+LOOKUP_COST = 1
 
+# Largest ``first`` we will send to satisfy a LIMIT (servers often cap this)
+MAX_LIMIT_PAGE_SIZE = 100
 
-QueryArg = Union[str, int]
+# Max number of aliased aggregate fields (one per group) in a single request
+AGGREGATE_BATCH_SIZE = 50
+
+# How deep an include given by field name (rather than by path) is followed;
+# this stops cycles such as ``Person.homeworld.residents.homeworld...``
+MAX_INCLUDE_DEPTH = 4
+
+# Selection sets remembered, by columns requested
+PLAN_CACHE_SIZE = 1024
 
 # -----------------------------------------------------------------------------
 
 
-def parse_gql_type(type_info: TypeInfo) -> Field:
-    # TODO(cancan101): do we want to handle Nones here?
-    name: Optional[str] = type_info["name"]
-    if name == "String":
-        return String()
-    elif name == "ID":
-        # TODO(cancan101): figure out if we want to map this to UUID, int, etc
-        # This should probably be an API-level setting
-        return String()
-    elif name == "Int":
-        return Integer()
-    elif name == "Float":
-        return Float()
-    elif name == "Boolean":
-        return Boolean()
+# Fields are not modified once built, so tables share one instance per scalar
+SCALAR_FIELDS: Dict[str, Field] = {
+    "String": String(),
+    # TODO(cancan101): figure out if we want to map this to UUID, int, etc
+    # This should probably be an API-level setting
+    "ID": String(),
+    "Int": Integer(),
+    "Float": Float(),
+    "Boolean": Boolean(),
     # These are extended scalars:
-    elif name == "DateTime":
-        # https://www.graphql-scalars.dev/docs/scalars/date-time
-        return ISODateTime()
-    elif name == "Date":
-        # https://www.graphql-scalars.dev/docs/scalars/date
-        return ISODate()
-    elif name == "Time":
-        # https://www.graphql-scalars.dev/docs/scalars/time
-        return ISOTime()
-    else:
+    # https://www.graphql-scalars.dev/docs/scalars/date-time
+    "DateTime": ISODateTime(),
+    # https://www.graphql-scalars.dev/docs/scalars/date
+    "Date": ISODate(),
+    # https://www.graphql-scalars.dev/docs/scalars/time
+    "Time": ISOTime(),
+}
+
+
+def parse_gql_type(type_info: Union[TypeInfo, TypeRef]) -> Field:
+    # TODO(cancan101): do we want to handle Nones here?
+    name = type_info.name if isinstance(type_info, TypeRef) else type_info["name"]
+    field = SCALAR_FIELDS.get(name) if name is not None else None
+    if field is None:
         # TODO(cancan101): how do we want to handle other scalars?
         raise ValueError(f"Unknown type: {name}")
+    return field
+
+
+def is_included(path: Sequence[str], include: Collection[str]) -> bool:
+    """Whether the field at ``path`` is included.
+
+    Entries are either a field name, matched at any depth (up to
+    ``MAX_INCLUDE_DEPTH``), or a ``__``-separated path, which also includes the
+    fields along the way.
+    """
+    if path[-1] in include and len(path) <= MAX_INCLUDE_DEPTH:
+        return True
+    path_str = "__".join(path)
+    return any(i == path_str or i.startswith(f"{path_str}__") for i in include)
+
+
+def get_connection_node_type_name(type_name: str, *, schema: Schema) -> Optional[str]:
+    """The node type of a Relay-style connection type, or None."""
+    edges_field = (schema.get_fields(type_name) or {}).get("edges")
+    if edges_field is None:
+        return None
+    edges_type_name = edges_field.type.named_type
+    if edges_type_name is None:
+        return None
+    node_field = (schema.get_fields(edges_type_name) or {}).get("node")
+    if node_field is None:
+        return None
+    return node_field.type.named_type
+
+
+def is_table_field(field: FieldDef, *, schema: Schema) -> bool:
+    """Whether a query field returns a connection or a list, i.e. is a table."""
+    ref = field.type
+    if ref.kind == "NON_NULL" and ref.of_type is not None:
+        ref = ref.of_type
+    if ref.kind == "LIST":
+        return True
+    return (
+        ref.name is not None
+        and get_connection_node_type_name(ref.name, schema=schema) is not None
+    )
 
 
 def get_type_entries(
-    field_obj: FieldInfo,
+    field: FieldDef,
     *,
-    data_types: Dict[str, TypeInfoWithFields],
+    schema: Schema,
     include: Collection[str],
     path: Optional[List[str]] = None,
+    list_paths: Optional[Dict[str, bool]] = None,
 ) -> Dict[str, Field]:
+    """Get the (flattened) columns for a field.
+
+    Included list and connection children are recorded in ``list_paths``
+    (path -> whether it is a connection), as their values span several rows.
+    Lists of scalars are skipped, even when included.
+    """
     path = path or []
 
-    field_name = field_obj["name"]
+    field_name = field.name
     new_path = path + [field_name]
 
-    field_obj_type = field_obj["type"]
+    field_type = field.type
 
-    kind = field_obj_type["kind"]
+    kind = field_type.kind
     if kind == "SCALAR":
-        field_field = parse_gql_type(field_obj_type)
+        field_field = parse_gql_type(field_type)
         return {"__".join(new_path): field_field}
     elif kind == "NON_NULL":
-        of_type = field_obj_type["ofType"]
+        of_type = field_type.of_type
 
         if of_type is None:
             raise ValueError("of_type is None")
-
-        of_type_name = of_type["name"]
-        if of_type_name is None:
+        if of_type.name is None and of_type.kind != "LIST":
             raise ValueError("of_type_name is None")
 
         return get_type_entries(
-            FieldInfo(
-                name=field_name,
-                type=data_types[of_type_name],
-            ),
-            data_types=data_types,
+            field._replace(type=of_type),
+            schema=schema,
             include=include,
             path=path,
+            list_paths=list_paths,
         )
     # TODO(cancan101): other types to handle:
-    # LIST, ENUM, UNION, INTERFACE, OBJECT (implicitly handled)
+    # ENUM, UNION, INTERFACE, OBJECT (implicitly handled)
     else:
         # Check to see if this is a requested include
-        if field_name in include:
-            ret = {}
-            name = field_obj_type["name"]
-            if name is None:
-                raise ValueError(f"Unable to get type of: {field_name}")
-
-            fields = data_types[name]["fields"]
-            if fields is None:
-                raise ValueError(f"Unable to get fields for: {name}")
-
-            for field in fields:
-                ret.update(
-                    get_type_entries(
-                        field, data_types=data_types, include=include, path=new_path
-                    )
+        if not is_included(new_path, include):
+            return {}
+
+        name = field_type.named_type
+        if name is None:
+            raise ValueError(f"Unable to get type of: {field_name}")
+
+        path_str = "__".join(new_path)
+        if kind == "LIST":
+            if schema.get_fields(name) is None and name in schema.types:
+                # A list of scalars (or enums) has no fields to be columns, and
+                # as a single value wouldn't fit one either, so it's skipped
+                return {}
+            if list_paths is not None:
+                list_paths[path_str] = False
+        else:
+            node_type_name = get_connection_node_type_name(name, schema=schema)
+            if node_type_name is not None:
+                # The columns are those of the nodes, skipping ``edges { node }``
+                name = node_type_name
+                if list_paths is not None:
+                    list_paths[path_str] = True
+
+        fields = schema.get_fields(name)
+        if fields is None:
+            raise ValueError(f"Unable to get fields for: {name}")
+
+        ret = {}
+        for child in fields.values():
+            ret.update(
+                get_type_entries(
+                    child,
+                    schema=schema,
+                    include=include,
+                    path=new_path,
+                    list_paths=list_paths,
                 )
-            return ret
+            )
+        return ret
 
-        return {}
 
+def find_lookup_field(
+    node_type_name: str, *, schema: Schema
+) -> Optional[Tuple[str, Optional[str]]]:
+    """Find a root field that fetches a single node by id.
 
-# -----------------------------------------------------------------------------
+    Returns the name of the field along with the type to use for an inline
+    fragment, which is needed when the field returns an interface
+    (e.g. ``node(id:)``) rather than the node type itself.
+    """
+    node_interfaces = schema.types[node_type_name].interfaces
 
+    fragment_match: Optional[Tuple[str, Optional[str]]] = None
+    for query in schema.query_fields.values():
+        if ID_COLUMN not in query.args:
+            continue
+        # We can only supply the id, so any other argument must be optional
+        if any(
+            name != ID_COLUMN and arg_type.kind == "NON_NULL"
+            for name, arg_type in query.args.items()
+        ):
+            continue
 
-# clean these up:
-def find_by_name(name: str, *, types: List[FieldInfo]) -> Optional[FieldInfo]:
-    name_match = [x for x in types if x["name"] == name]
-    if len(name_match) == 0:
-        return None
-    return name_match[0]
+        return_type: Optional[TypeRef] = query.type
+        if query.type.kind == "NON_NULL":
+            return_type = query.type.of_type
+        if return_type is None:
+            continue
 
+        return_type_name = return_type.name
+        if return_type_name == node_type_name:
+            return (query.name, None)
+        elif return_type_name in node_interfaces and fragment_match is None:
+            fragment_match = (query.name, node_type_name)
 
-def find_type_by_name(name: str, *, types: List[FieldInfo]) -> Optional[TypeInfo]:
-    entry = find_by_name(name, types=types)
-    if entry is None:
-        return None
-    return entry["type"]
-
-
-def get_edges_type_name(fields: List[FieldInfo]) -> Optional[str]:
-    entry_type = find_type_by_name("edges", types=fields)
-    if entry_type is None:
-        return None
-    edges_info = entry_type["ofType"]
-    if edges_info is None:
-        return None
-    return edges_info["name"]
-
-
-def get_node_type_name(fields: List[FieldInfo]) -> Optional[str]:
-    node_info = find_type_by_name("node", types=fields)
-    if node_info is None:
-        return None
-    return node_info["name"]
+    return fragment_match
 
 
 # -----------------------------------------------------------------------------
@@ -200,25 +302,97 @@ def extract_flattened_value(node: Dict[str, Any], field_name: str) -> Any:
     return ret
 
 
-def get_gql_fields(column_names: Sequence[str]) -> str:
-    # TODO(cancan101): actually nest this
-    def get_field_str(fields: List[str], root: Optional[str] = None) -> str:
-        ret = " ".join(fields)
-        if root is not None:
-            ret = f"{root} {{{ret}}}"
-        return ret
+def get_gql_fields(
+    column_names: Sequence[str],
+    connection_paths: Collection[str] = (),
+    deferred_paths: Collection[str] = (),
+) -> str:
+    """Build the selection set for ``__``-flattened column names.
+
+    The children of paths in ``connection_paths`` are selected through
+    ``edges {node {...}}``, and paths in ``deferred_paths`` in an ``@defer``
+    fragment.
+    """
+    tree: Dict[str, Dict[str, Any]] = {}
+    for column_name in column_names:
+        level = tree
+        for part in column_name.split("__"):
+            level = level.setdefault(part, {})
+
+    def get_field_str(fields: Dict[str, Dict[str, Any]], prefix: str) -> str:
+        fields_strs = []
+        for name, children in fields.items():
+            if not children:
+                fields_strs.append(name)
+                continue
+
+            path = f"{prefix}{name}"
+            children_str = get_field_str(children, f"{path}__")
+            if path in connection_paths:
+                children_str = f"edges {{node {{{children_str}}}}}"
+            field_str = f"{name} {{{children_str}}}"
+            if path in deferred_paths:
+                field_str = f"... @defer {{{field_str}}}"
+            fields_strs.append(field_str)
+        return " ".join(fields_strs)
+
+    return get_field_str(tree, "")
+
+
+def explode_node(
+    node: Dict[str, Any],
+    column_names: Sequence[str],
+    list_paths: Mapping[str, bool],
+) -> List[Dict[str, Any]]:
+    """Flatten a node into rows of the requested columns.
+
+    There is a row per element of each list (or connection) child used by the
+    columns, crossed when there are several; an empty child gives one row with
+    nulls for its columns.
+    """
+    # The outermost list children that the columns reach into
+    outer_paths = [
+        p
+        for p in list_paths
+        if any(c.startswith(f"{p}__") for c in column_names)
+        and not any(p.startswith(f"{q}__") for q in list_paths)
+    ]
+    if not outer_paths:
+        return [{c: extract_flattened_value(node, c) for c in column_names}]
+
+    rows = [
+        {
+            c: extract_flattened_value(node, c)
+            for c in column_names
+            if not any(c.startswith(f"{p}__") for p in outer_paths)
+        }
+    ]
+    for path in outer_paths:
+        prefix = f"{path}__"
+        # Rows are keyed by the given names, so all the rows of a scan share them
+        names = {c[len(prefix) :]: c for c in column_names if c.startswith(prefix)}
+        child_columns = list(names)
+        child_list_paths = {
+            p[len(prefix) :]: v for p, v in list_paths.items() if p.startswith(prefix)
+        }
 
-    mappings: Dict[Optional[str], List[str]] = defaultdict(list)
-    for field in [x.split("__", 1) for x in column_names]:
-        if len(field) == 1:
-            mappings[None].append(field[-1])
-        else:
-            mappings[field[0]].append(field[-1])
+        children = extract_flattened_value(node, path)
+        if list_paths[path]:
+            children = [
+                (edge or {}).get("node") for edge in (children or {}).get("edges") or []
+            ]
 
-    fields_str = " ".join(
-        get_field_str(fields, root=root) for root, fields in mappings.items()
-    )
-    return fields_str
+        child_rows = [
+            {names[c]: v for c, v in child_row.items()}
+            for child in children or []
+            if child is not None
+            for child_row in explode_node(child, child_columns, child_list_paths)
+        ]
+        if not child_rows:
+            child_rows = [dict.fromkeys(names.values())]
+
+        rows = [{**row, **child_row} for row in rows for child_row in child_rows]
+    return rows
 
 
 def _parse_query_arg(k: str, v: List[str]) -> Tuple[str, str]:
@@ -247,22 +421,398 @@ def _parse_query_args(query: Dict[str, List[str]]) -> Dict[str, QueryArg]:
     return dict(str_args, **int_args)
 
 
-def _format_arg(arg: QueryArg) -> str:
-    if isinstance(arg, str):
-        return f'"{arg}"'
+class EnumValue(str):
+    """A GraphQL enum value, which is written without quotes."""
+
+
+def _format_arg(arg: Any) -> str:
+    if isinstance(arg, EnumValue):
+        return str(arg)
+    elif isinstance(arg, str):
+        # JSON string escaping is a valid GraphQL string literal
+        return json.dumps(arg)
+    elif isinstance(arg, bool):
+        return "true" if arg else "false"
+    elif arg is None:
+        return "null"
+    elif isinstance(arg, dict):
+        return f"{{{_get_variable_argument_str(arg)}}}"
+    elif isinstance(arg, (list, tuple)):
+        return f"[{' '.join(_format_arg(x) for x in arg)}]"
     return str(arg)
 
 
-def _get_variable_argument_str(args: Dict[str, QueryArg]) -> str:
+def _get_variable_argument_str(args: Dict[str, Any]) -> str:
     return " ".join(f"{k}: {_format_arg(v)}" for k, v in args.items())
 
 
+# Hasura-style comparison operators used in aggregate ``where`` arguments
+HASURA_OPERATORS = {
+    "=": "_eq",
+    "!=": "_neq",
+    "<": "_lt",
+    "<=": "_lte",
+    ">": "_gt",
+    ">=": "_gte",
+    "IN": "_in",
+}
+
+
+def _get_hasura_condition(predicate: Predicate) -> Dict[str, Any]:
+    if predicate.operator == "IS NULL":
+        condition: Dict[str, Any] = {"_is_null": True}
+    elif predicate.operator == "IS NOT NULL":
+        condition = {"_is_null": False}
+    else:
+        condition = {HASURA_OPERATORS[predicate.operator]: predicate.value}
+    return {predicate.column: condition}
+
+
+def _get_aggregate_selection(aggregate: Aggregate) -> str:
+    if aggregate.function == "COUNT":
+        if aggregate.column is None:
+            return "count"
+        distinct_str = " distinct: true" if aggregate.distinct else ""
+        return f"count(columns: [{aggregate.column}]{distinct_str})"
+    return f"{aggregate.function.lower()} {{{aggregate.column}}}"
+
+
+COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+# Column types whose values compare (and sort) the same in Python as in SQLite
+NUMERIC_FIELDS = (Integer, Float, Boolean)
+COMPARABLE_FIELDS = (String, *NUMERIC_FIELDS)
+
+
+def _get_predicate_check(
+    field: Field, predicate: Predicate
+) -> Optional[Callable[[Any], bool]]:
+    """Build a check for a parsed value that matches SQLite's semantics.
+
+    Returns None where the semantics would differ (e.g. type coercion).
+    """
+    if predicate.operator == "IS NULL":
+        return lambda value: value is None
+    elif predicate.operator == "IS NOT NULL":
+        return lambda value: value is not None
+
+    literals = predicate.value if predicate.operator == "IN" else [predicate.value]
+    if isinstance(field, NUMERIC_FIELDS):
+        if not all(
+            isinstance(x, (int, float)) and not isinstance(x, bool) for x in literals
+        ) and not all(isinstance(x, bool) for x in literals):
+            return None
+        # SQLite stores booleans as integers
+        literals = [int(x) if isinstance(x, bool) else x for x in literals]
+    elif isinstance(field, String):
+        if not all(isinstance(x, str) for x in literals):
+            return None
+    else:
+        return None
+
+    if predicate.operator == "IN":
+        allowed = set(literals)
+        return lambda value: value is not None and value in allowed
+
+    compare = COMPARISONS[predicate.operator]
+    literal = literals[0]
+    return lambda value: value is not None and compare(value, literal)
+
+
+def _resolve_alias(
+    key: Union[str, Aggregate], items: Sequence[SelectItem]
+) -> Union[str, Aggregate, None]:
+    # As in SQLite, an ORDER BY name refers to a result column alias first
+    for item in items:
+        if item.alias is not None and item.alias == key:
+            return item.expression
+    return key
+
+
+class ScanState:
+    """The state of one scan, kept apart from the (shared) table plan."""
+
+    def __init__(self) -> None:
+        # The last ``endCursor`` seen while paginating
+        self.end_cursor: Optional[str] = None
+
+
+class CompiledSelect(NamedTuple):
+    """A simple statement, resolved against the table's columns."""
+
+    # The columns of each result row
+    output: List[str]
+    result_columns: List[Tuple[str, Field]]
+    # The predicates, evaluated while streaming
+    checks: List[Tuple[str, Callable[[Any], bool]]]
+    # Ids to fetch with lookups rather than a scan
+    ids: Optional[List[str]]
+    order_keys: List[Tuple[str, bool]]
+    # The columns fetched
+    needed: List[str]
+    offset: int
+    end: Optional[int]
+    # The limit the fetch can stop at (when no rows are dropped locally)
+    limit: Optional[int]
+
+
+class CompiledAggregate(NamedTuple):
+    """An aggregate statement, resolved against the aggregate field."""
+
+    result_columns: List[Tuple[str, Field]]
+    # (index into the result row, descending) pairs
+    order_keys: List[Tuple[int, bool]]
+    referenced: List[str]
+    # Hasura ``where`` conditions of the predicates
+    conditions: List[Dict[str, Any]]
+    aggregate_str: str
+
+
+# -----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _get_fields_str(
+    columns: Tuple[str, ...],
+    connection_paths: FrozenSet[str],
+    deferred_paths: FrozenSet[str],
+) -> str:
+    return get_gql_fields(columns, connection_paths, deferred_paths)
+
+
+class TablePlan(NamedTuple):
+    """What an adapter needs to know about its table, resolved from the schema.
+
+    Plans are immutable (the mappings are never modified once built), so one
+    plan is shared by the adapters of every connection of an engine.
+    """
+
+    node_type_name: str
+    # The arguments accepted by the query field, e.g. ``first``
+    table_args: FrozenSet[str]
+    columns: Dict[str, Field]
+    # Included list (and connection) children, which are exploded into rows
+    list_paths: Dict[str, bool]
+    connection_paths: FrozenSet[str]
+    # A singular root field (e.g. ``person(id:)`` or ``node(id:)``) serving
+    # id-equality constraints without scanning the whole table, and the type
+    # of its inline fragment
+    lookup_field: Optional[str]
+    lookup_fragment: Optional[str]
+
+    def get_fields_str(
+        self, columns: Sequence[str], deferred_paths: FrozenSet[str] = frozenset()
+    ) -> str:
+        """The selection set of ``columns``, built once per set of columns."""
+        return _get_fields_str(tuple(columns), self.connection_paths, deferred_paths)
+
+
+def build_table_plan(
+    schema: Schema,
+    table: str,
+    include: Collection[str],
+    *,
+    is_connection: bool,
+    lookup: bool = True,
+) -> TablePlan:
+    """Resolve the plan of the query field ``table``.
+
+    Id lookups are only planned with ``lookup``, as they are not equivalent to
+    scanning a table narrowed by query args.
+    """
+    # find the matching query (a field on the query object)
+    table_field = schema.query_fields.get(table)
+    if table_field is None:
+        raise ValueError(f"Unable to resolve type_entry for {table}")
+
+    # Connections are the type itself, lists are assumed to be NonNull of
+    # List of NonNull of the item
+    query_return_type_name = table_field.type.named_type
+    if query_return_type_name is None:
+        raise ValueError(f"Unable to resolve query_return_type_name for {table}")
+
+    if is_connection:
+        # we are assuming a top level connection
+        if schema.get_fields(query_return_type_name) is None:
+            raise ValueError("No fields found on query")
+
+        node_type_name = get_connection_node_type_name(
+            query_return_type_name, schema=schema
+        )
+        if node_type_name is None:
+            raise ValueError("Unable to resolve node_type_name")
+    else:
+        node_type_name = query_return_type_name
+
+    node_fields = schema.get_fields(node_type_name)
+    if node_fields is None:
+        raise ValueError("No fields found on node")
+
+    columns: Dict[str, Field] = {}
+    list_paths: Dict[str, bool] = {}
+    for node_field in node_fields.values():
+        columns.update(
+            get_type_entries(
+                node_field, schema=schema, include=include, list_paths=list_paths
+            )
+        )
+
+    lookup_field: Optional[str] = None
+    lookup_fragment: Optional[str] = None
+    if ID_COLUMN in columns and lookup:
+        lookup_match = find_lookup_field(node_type_name, schema=schema)
+        if lookup_match is not None:
+            lookup_field, lookup_fragment = lookup_match
+            columns[ID_COLUMN] = type(columns[ID_COLUMN])(filters=[Equal], exact=True)
+
+    return TablePlan(
+        node_type_name,
+        frozenset(table_field.args),
+        columns,
+        list_paths,
+        frozenset(p for p, is_conn in list_paths.items() if is_conn),
+        lookup_field,
+        lookup_fragment,
+    )
+
+
+class TablePlans:
+    """The table plans of an engine, built once and shared by its connections.
+
+    Safe to use from many threads: a plan is built by the first adapter asking
+    for it, while the others wait for it. Plans are rebuilt after ``ttl``
+    seconds, if given, otherwise they are kept until ``clear``.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        # Adapter kwargs are serialized, so adapters find the plans by this id
+        self.id = uuid.uuid4().hex
+        # Plans by key, and the schema they are built from
+        self._plans: Dict[Hashable, Tuple[float, Any]] = {}
+        self._building: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        _table_plans[self.id] = self
+
+    def _get_fresh(self, key: Hashable) -> Any:
+        cached = self._plans.get(key)
+        if cached is None:
+            return None
+        if self.ttl is not None and time.monotonic() - cached[0] >= self.ttl:
+            return None
+        return cached[1]
+
+    def _get(self, key: Hashable, build: Callable[[], T]) -> T:
+        with self._lock:
+            value = self._get_fresh(key)
+            if value is not None:
+                return value
+            building = self._building.setdefault(key, threading.Lock())
+
+        # Only one thread builds (and introspects for) a given plan
+        with building:
+            with self._lock:
+                value = self._get_fresh(key)
+            if value is None:
+                value = build()
+                with self._lock:
+                    self._plans[key] = (time.monotonic(), value)
+                    self._building.pop(key, None)
+        return value
+
+    def get(self, key: Hashable, build: Callable[[], TablePlan]) -> TablePlan:
+        return self._get(key, build)
+
+    def get_schema(self, fetch: Callable[[], Schema]) -> Schema:
+        """The schema of the engine's API, fetched once for all its tables."""
+        return self._get(_SCHEMA_KEY, fetch)
+
+    def clear(self) -> None:
+        """Forget the plans, e.g. after the schema changed."""
+        with self._lock:
+            self._plans.clear()
+
+
+_SCHEMA_KEY = ("__schema__",)
+
+# The plans of each (live) engine, by id
+_table_plans: weakref.WeakValueDictionary[
+    str, TablePlans
+] = weakref.WeakValueDictionary()
+
+
+def get_table_plans(plans_id: Optional[str]) -> Optional[TablePlans]:
+    return None if plans_id is None else _table_plans.get(plans_id)
+
+
+def get_table_plan(
+    table: str,
+    include: Collection[str],
+    query_args: Dict[str, QueryArg],
+    *,
+    is_connection: bool,
+    pagination_relay: bool,
+    fetch_schema: Callable[[], Schema],
+    plans: Optional[TablePlans] = None,
+) -> TablePlan:
+    """The plan of a table, kept in (and built from the schema of) ``plans``."""
+
+    def build_plan() -> TablePlan:
+        schema = fetch_schema() if plans is None else plans.get_schema(fetch_schema)
+        return build_table_plan(
+            schema,
+            table,
+            include,
+            is_connection=is_connection,
+            lookup=not query_args and (pagination_relay or not is_connection),
+        )
+
+    if plans is None:
+        return build_plan()
+    key = (
+        table,
+        frozenset(include),
+        tuple(sorted(query_args.items())),
+        is_connection,
+        pagination_relay,
+    )
+    return plans.get(key, build_plan)
+
+
+def resolve_is_connection(
+    table: str, is_connection: Optional[bool], list_queries: Optional[List[str]]
+) -> bool:
+    """Unless given, tables are connections unless configured as lists."""
+    if is_connection is not None:
+        return is_connection
+    return list_queries is None or table not in list_queries
+
+
 # -----------------------------------------------------------------------------
 
 
 class GraphQLAdapter(Adapter):
+    """A table backed by a query field.
+
+    An adapter belongs to one connection (or, when executed directly, one
+    statement) and is not meant to be used from several threads at once. What
+    it knows about its table is an immutable ``TablePlan``, shared by the
+    adapters of an engine through ``table_plans``; the state of a scan is kept
+    per scan.
+    """
+
     safe = True
 
+    supports_limit = True
+    supports_requested_columns = True
+
     is_connection: bool
 
     def __init__(
@@ -275,6 +825,19 @@ class GraphQLAdapter(Adapter):
         bearer_token: Optional[str] = None,
         pagination_relay: Optional[bool] = None,
         list_queries: Optional[List[str]] = None,
+        aggregate_queries: Optional[Dict[str, str]] = None,
+        snapshots: Optional[Dict[str, SnapshotConfig]] = None,
+        checkpoint_path: Optional[str] = None,
+        schema_ttl: Optional[float] = None,
+        table_plans: Optional[str] = None,
+        endpoints: Optional[List[str]] = None,
+        load_balancing: str = ROUND_ROBIN,
+        incremental_delivery: bool = False,
+        transport: str = HTTP1,
+        max_streams: int = MAX_STREAMS,
+        dictionary_encoding: bool = False,
+        pacing: bool = True,
+        cost_parsers: Optional[List[str]] = None,
     ):
         super().__init__()
 
@@ -284,161 +847,88 @@ class GraphQLAdapter(Adapter):
         self.include = set(include)
         self.query_args = query_args
 
-        if is_connection is not None:
-            self.is_connection = is_connection
-        else:
-            self.is_connection = list_queries is None or table not in list_queries
+        self.is_connection = resolve_is_connection(table, is_connection, list_queries)
 
         self.graphql_api = graphql_api
         self.bearer_token = bearer_token
+        # Requests are spread over the other endpoints (replicas) of the API too
+        self.pool = (
+            get_pool(get_endpoints(graphql_api, endpoints), load_balancing)
+            if endpoints
+            else None
+        )
+        # What requests are sent with, e.g. multiplexed over HTTP/2
+        self.session = get_session(transport, max_streams)
+        # The query cost budget the API reports, shared by the scans using it
+        self.budget = (
+            get_budget(graphql_api, bearer_token, cost_parsers) if pacing else None
+        )
+
+        # Whether scans use ``@stream`` / ``@defer``, yielding rows as they arrive
+        self.incremental_delivery = incremental_delivery
+        # Whether scans share the repeated values of string columns
+        self.dictionary_encoding = dictionary_encoding
+
+        # The (Hasura-style) aggregate field for this table, if configured
+        self.aggregate_field = (aggregate_queries or {}).get(table)
 
         if pagination_relay is True and self.is_connection is False:
             raise ValueError("pagination_relay True and is_connection False")
         # For now, default this to True. In the future, we can perhaps guess
         self.pagination_relay = True if pagination_relay is None else pagination_relay
 
-        if self.is_connection:
-            query_type_and_types_query = """{
-  __schema {
-    queryType {
-      fields {
-        name
-        type {
-          name
-        }
-      }
-    }
-    types {
-      name
-      kind
-      fields {
-        name
-        type {
-          name
-          kind
-          ofType {
-            name
-          }
-        }
-      }
-    }
-  }
-}"""
-        else:
-            query_type_and_types_query = """{
-  __schema {
-    queryType {
-      fields {
-        name
-        type {
-          name
-          kind
-          ofType {
-            name
-            kind
-            ofType {
-              kind
-              name
-              ofType {
-                name
-              }
-            }
-          }
-        }
-      }
-    }
-    types {
-      name
-      kind
-      fields {
-        name
-        type {
-          name
-          kind
-          ofType {
-            name
-          }
-        }
-      }
-    }
-  }
-}"""
-
-        query_type_and_types = self.run_query(query=query_type_and_types_query)
-        query_type_and_types_schema = query_type_and_types["__schema"]
-        queries_return_fields: List[FieldInfo] = query_type_and_types_schema[
-            "queryType"
-        ]["fields"]
-
-        # find the matching query (a field on the query object)
-        # TODO(cancan101): handle missing
-        type_entry = find_type_by_name(self.table, types=queries_return_fields)
-        if type_entry is None:
-            raise ValueError(f"Unable to resolve type_entry for {self.table}")
-
-        data_types_list: List[TypeInfoWithFields] = query_type_and_types_schema["types"]
-        data_types: Dict[str, TypeInfoWithFields] = {
-            t["name"]: t for t in data_types_list if t["name"] is not None
-        }
+        # Where scans record their progress, so they can be resumed
+        self.checkpoints = (
+            CheckpointStore(checkpoint_path) if checkpoint_path is not None else None
+        )
 
-        if self.is_connection:
-            query_return_type_name = type_entry["name"]
-            if query_return_type_name is None:
+        # The columns etc. of the table, which may be shared with the adapters
+        # of other connections of the same engine (see ``TablePlans``)
+        self.table_plan = get_table_plan(
+            self.table,
+            self.include,
+            self.query_args,
+            is_connection=self.is_connection,
+            pagination_relay=self.pagination_relay,
+            # The schema may be shared with other adapters (see ``schema_ttl``)
+            fetch_schema=lambda: get_schema(
+                self.graphql_api,
+                self.bearer_token,
+                ttl=schema_ttl,
+                table=self.table,
+                pool=self.pool,
+                session=self.session,
+            ),
+            plans=get_table_plans(table_plans),
+        )
+        # Shared, so never modified
+        self.table_args = self.table_plan.table_args
+        self.columns = self.table_plan.columns
+        self.list_paths = self.table_plan.list_paths
+        self.connection_paths = self.table_plan.connection_paths
+        self.lookup_field = self.table_plan.lookup_field
+        self.lookup_fragment = self.table_plan.lookup_fragment
+
+        # A local copy of the table that queries are served from. The copy is
+        # of the whole table, so it is not used when narrowed by query args.
+        self.snapshot_config: Optional[SnapshotConfig] = None
+        self.snapshot: Optional[Snapshot] = None
+        if snapshots and table in snapshots and not self.query_args:
+            self.snapshot_config = snapshots[table]
+            # Rows are unique by id unless list children are exploded
+            key = (
+                ID_COLUMN if ID_COLUMN in self.columns and not self.list_paths else None
+            )
+            if "updated_arg" in self.snapshot_config and (
+                key is None
+                or self.snapshot_config.get("updated_column") not in self.columns
+            ):
                 raise ValueError(
-                    f"Unable to resolve query_return_type_name for {self.table}"
-                )
-
-            query_return_fields = data_types[query_return_type_name]["fields"]
-            if query_return_fields is None:
-                raise ValueError("No fields found on query")
-
-            # we are assuming a top level connection
-            edges_type_name = get_edges_type_name(query_return_fields)
-            if edges_type_name is None:
-                raise ValueError("Unable to resolve edges_type_name")
-
-            edges_fields = data_types[edges_type_name]["fields"]
-            if edges_fields is None:
-                raise ValueError("No fields found on edge")
-
-            node_type_name = get_node_type_name(edges_fields)
-            if node_type_name is None:
-                raise ValueError("Unable to resolve node_type_name")
-
-        else:
-            # We are assuming it is NonNull of List of NonNull of item
-            list_type = type_entry["ofType"]
-            if list_type is None:
-                raise ValueError("Unable to resolve list_type")
-
-            # TODO(cancan101): put this info into type system
-            list_type = cast(TypeInfo, list_type)
-
-            item_container_type = list_type["ofType"]
-            if item_container_type is None:
-                raise ValueError("Unable to resolve item_container_type")
-
-            # TODO(cancan101): put this info into type system
-            item_container_type = cast(TypeInfo, item_container_type)
-
-            node_type = item_container_type["ofType"]
-            if node_type is None:
-                raise ValueError("Unable to resolve node_type")
-
-            node_type_name = node_type["name"]
-            if node_type_name is None:
-                raise ValueError("Unable to resolve node_type_name")
-
-        node_fields = data_types[node_type_name]["fields"]
-        if node_fields is None:
-            raise ValueError("No fields found on node")
-
-        self.columns: Dict[str, Field] = {}
-        for node_field in node_fields:
-            self.columns.update(
-                get_type_entries(
-                    node_field, data_types=data_types, include=self.include
+                    f"Incremental snapshot of {self.table} needs unique {ID_COLUMN} "
+                    "and updated_column columns"
                 )
+            self.snapshot = Snapshot(
+                self.snapshot_config["path"], list(self.columns.keys()), key=key
             )
 
     @staticmethod
@@ -475,40 +965,224 @@ class GraphQLAdapter(Adapter):
     def get_columns(self) -> Dict[str, Field]:
         return self.columns
 
-    def run_query(self, query: str) -> Dict[str, Any]:
-        return run_query(self.graphql_api, query=query, bearer_token=self.bearer_token)
-
-    def get_data_connection(
+    def get_cost(
         self,
-        bounds: Dict[str, Filter],
+        filtered_columns: List[Tuple[str, Operator]],
         order: List[Tuple[str, RequestedOrder]],
-        **kwargs: Any,
-    ) -> Iterator[Dict[str, Any]]:
-        fields_str = get_gql_fields(list(self.columns.keys()))
-        query_args_user = dict(self.query_args)
+    ) -> float:
+        if (ID_COLUMN, Operator.EQ) in filtered_columns:
+            return LOOKUP_COST
+        return FIXED_COST
+
+    def run_query(
+        self, query: str, cost_key: Optional[Hashable] = None
+    ) -> Dict[str, Any]:
+        if self.pool is not None:
+            return self.pool.run_query(
+                query=query,
+                bearer_token=self.bearer_token,
+                session=self.session,
+                budget=self.budget,
+                cost_key=cost_key,
+            )
+        return run_query(
+            self.graphql_api,
+            query=query,
+            bearer_token=self.bearer_token,
+            session=self.session,
+            budget=self.budget,
+            cost_key=cost_key,
+        )
 
-        after = query_args_user.pop("after", None)
+    def run_query_incremental(
+        self, query: str, cost_key: Optional[Hashable] = None
+    ) -> Generator[Dict[str, Any], None, None]:
+        if self.pool is not None:
+            return self.pool.run_query_incremental(
+                query=query,
+                bearer_token=self.bearer_token,
+                session=self.session,
+                budget=self.budget,
+                cost_key=cost_key,
+            )
+        return run_query_incremental(
+            self.graphql_api,
+            query=query,
+            bearer_token=self.bearer_token,
+            session=self.session,
+            budget=self.budget,
+            cost_key=cost_key,
+        )
 
-        # We loop for each page in the pagination
-        while True:
-            args = dict(query_args_user)
-            if after is not None:
-                args["after"] = after
+    # -------------------------------------------------------------------------
 
-            if args:
-                variable_str = f"({_get_variable_argument_str(args)})"
-            else:
-                # Don't generate the () for empty list of args
-                variable_str = ""
+    # Incremental delivery
 
-            if self.pagination_relay:
-                page_info_str = "pageInfo {endCursor hasNextPage}"
-            else:
-                page_info_str = ""
+    def _get_deferred_paths(self, columns: Sequence[str]) -> FrozenSet[str]:
+        """The (outermost) list and connection children to ``@defer``."""
+        if not self.incremental_delivery:
+            return frozenset()
+        return frozenset(
+            p
+            for p in self.list_paths
+            if any(c.startswith(f"{p}__") for c in columns)
+            and not any(p.startswith(f"{q}__") for q in self.list_paths)
+        )
+
+    def _get_fields_str(self, columns: Sequence[str]) -> str:
+        return self.table_plan.get_fields_str(
+            columns, self._get_deferred_paths(columns)
+        )
+
+    def _get_stream_directive(self, limit: Optional[int]) -> str:
+        if not self.incremental_delivery:
+            return ""
+        # Enough rows for a small LIMIT come with the initial payload
+        initial_count = 0 if limit is None else min(limit, MAX_LIMIT_PAGE_SIZE)
+        return f" @stream(initialCount: {initial_count})"
+
+    def _stream_nodes(
+        self,
+        query: str,
+        columns: Sequence[str],
+        result: IncrementalResult,
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """Run ``query`` with incremental delivery, yielding nodes as they arrive.
+
+        A node is yielded (in order) once its deferred children have arrived
+        too. The whole result is assembled in ``result``, e.g. for the page info
+        of a connection.
+        """
+        deferred = [p.split("__") for p in self._get_deferred_paths(columns)]
+
+        def is_complete(node: Dict[str, Any]) -> bool:
+            for parts in deferred:
+                value: Any = node
+                for part in parts[:-1]:
+                    value = value.get(part)
+                    if value is None:
+                        # Nothing is deferred under a null
+                        break
+                else:
+                    if parts[-1] not in value:
+                        return False
+            return True
+
+        def get_nodes() -> List[Dict[str, Any]]:
+            items = result.data[self.table]
+            if self.is_connection:
+                return [edge["node"] for edge in items["edges"]]
+            return items
+
+        done = 0
+        payloads = self.run_query_incremental(query)
+        try:
+            while result.has_next:
+                with events.span(events.PAGE, self.table) as event:
+                    payload = next(payloads, None)
+                    if payload is None:
+                        break
+                    result.apply(payload)
+
+                    nodes = get_nodes()
+                    end = done
+                    while end < len(nodes) and (
+                        not result.has_next or is_complete(nodes[end])
+                    ):
+                        end += 1
+                    if event is not None:
+                        event.rows = end - done
+                if end > done:
+                    yield nodes[done:end]
+                    done = end
+        finally:
+            # Stop receiving the rest, e.g. once the consumer has enough rows
+            payloads.close()
+
+        if result.data and done < len(get_nodes()):
+            yield get_nodes()[done:]
+
+    def _get_requested_columns(
+        self, requested_columns: Optional[Collection[str]]
+    ) -> List[str]:
+        if requested_columns is None:
+            return list(self.columns.keys())
+
+        columns = [c for c in self.columns.keys() if c in requested_columns]
+        if not columns:
+            # e.g. ``COUNT(*)``: we still need to select something per row
+            columns = [
+                ID_COLUMN if ID_COLUMN in self.columns else next(iter(self.columns))
+            ]
+        return columns
+
+    def get_encoder(self, columns: Sequence[str]) -> Optional[DictionaryEncoder]:
+        """The dictionary encoder of a scan, None unless enabled."""
+        if not self.dictionary_encoding:
+            return None
+        return DictionaryEncoder(
+            c for c in columns if isinstance(self.columns[c], String)
+        )
+
+    def get_rows_from_nodes(
+        self,
+        nodes: Iterable[Dict[str, Any]],
+        columns: Sequence[str],
+        encoder: Optional[DictionaryEncoder] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Flatten nodes into rows, exploding included list children."""
+        if not events.has_listeners():
+            for node in nodes:
+                rows = explode_node(node, columns, self.list_paths)
+                yield from rows if encoder is None else map(encoder.encode, rows)
+            return
+
+        with events.span(events.ROWS, self.table) as event:
+            rows = [
+                row if encoder is None else encoder.encode(row)
+                for node in nodes
+                for row in explode_node(node, columns, self.list_paths)
+            ]
+            if event is not None:
+                event.rows = len(rows)
+        yield from rows
+
+    def _get_page_args(
+        self,
+        query_args: Dict[str, QueryArg],
+        after: Optional[QueryArg],
+        remaining: Optional[int],
+        page_size: Optional[int],
+        set_first: bool,
+    ) -> Dict[str, QueryArg]:
+        args = dict(query_args)
+        if after is not None:
+            args["after"] = after
+        if set_first:
+            # Only ask for as many rows as we need
+            if remaining is not None and remaining <= MAX_LIMIT_PAGE_SIZE:
+                args["first"] = min(remaining, page_size or remaining)
+            elif page_size is not None:
+                args["first"] = page_size
+        return args
+
+    def _get_connection_query(
+        self, fields_str: str, args: Dict[str, QueryArg], stream: str = ""
+    ) -> str:
+        if args:
+            variable_str = f"({_get_variable_argument_str(args)})"
+        else:
+            # Don't generate the () for empty list of args
+            variable_str = ""
 
-            query = f"""query {{
+        if self.pagination_relay:
+            page_info_str = "pageInfo {endCursor hasNextPage}"
+        else:
+            page_info_str = ""
+
+        return f"""query {{
     {self.table}{variable_str}{{
-        edges{{
+        edges{stream}{{
         node{{
             {fields_str}
         }}
@@ -516,24 +1190,277 @@ class GraphQLAdapter(Adapter):
         {page_info_str}
     }}
     }}"""
+
+    def get_pages_connection(
+        self,
+        columns: Sequence[str],
+        limit: Optional[int] = None,
+        page_size: Optional[int] = None,
+        extra_args: Optional[Dict[str, QueryArg]] = None,
+        checkpoint: bool = False,
+        state: Optional[ScanState] = None,
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """Yield the nodes of each page of the connection.
+
+        The progress of the scan is recorded in ``state``, if given.
+
+        With ``checkpoint`` (and a checkpoint store configured), the
+        ``endCursor`` of each page is recorded once the next page is asked for,
+        and a scan of the same table, args and columns starts from there. The
+        checkpoint is removed when the scan completes, or when it is closed
+        before then (its consumer stopped early), so only a scan that failed
+        is resumed. Scans with a ``limit`` are never checkpointed.
+        """
+        fields_str = self._get_fields_str(columns)
+        query_args_user = {**self.query_args, **(extra_args or {})}
+
+        checkpoints = self.checkpoints
+        if not checkpoint or not self.pagination_relay or limit is not None:
+            checkpoints = None
+        checkpoint_key = get_checkpoint_key(
+            self.graphql_api, self.table, query_args_user, columns
+        )
+
+        after = query_args_user.pop("after", None)
+        if checkpoints is not None:
+            after = checkpoints.get(checkpoint_key) or after
+
+        # We can only pick the page size when the connection allows it
+        set_first = "first" in self.table_args and "first" not in query_args_user
+
+        count = 0
+        try:
+            # We loop for each page in the pagination
+            while limit is None or count < limit:
+                args = self._get_page_args(
+                    query_args_user,
+                    after,
+                    None if limit is None else limit - count,
+                    # Smaller pages once a page costs too much of the API's budget
+                    (
+                        self.budget.get_page_size(self.table, page_size)
+                        if self.budget is not None and set_first
+                        else page_size
+                    ),
+                    set_first,
+                )
+                remaining = None if limit is None else limit - count
+                query = self._get_connection_query(
+                    fields_str, args, self._get_stream_directive(remaining)
+                )
+                if self.incremental_delivery:
+                    result = IncrementalResult()
+                    pages = self._stream_nodes(query, columns, result)
+                    try:
+                        for nodes in pages:
+                            if limit is not None:
+                                nodes = nodes[: limit - count]
+                            yield nodes
+                            count += len(nodes)
+                            if limit is not None and count >= limit:
+                                return
+                    finally:
+                        # Stops receiving the rest of the response
+                        pages.close()
+                    query_data_connection = result.data[self.table]
+                else:
+                    with events.span(events.PAGE, self.table) as event:
+                        query_data = self.run_query(query=query, cost_key=self.table)
+                        query_data_connection = query_data[self.table]
+
+                        edges = query_data_connection["edges"]
+                        if self.budget is not None:
+                            self.budget.set_rows(self.table, len(edges))
+                        if event is not None:
+                            event.rows = len(edges)
+                            event.cursor = None if after is None else str(after)
+
+                    yield [edge["node"] for edge in edges]
+                    count += len(edges)
+
+                if self.pagination_relay:
+                    page_info = query_data_connection["pageInfo"]
+                    if page_info["endCursor"] is not None and state is not None:
+                        state.end_cursor = page_info["endCursor"]
+                    if not page_info["hasNextPage"]:
+                        if checkpoints is not None:
+                            checkpoints.clear(checkpoint_key)
+                        break
+                    after = end_cursor = page_info["endCursor"]
+                    if checkpoints is not None:
+                        # The consumer asked for more, so the page is committed
+                        checkpoints.set(checkpoint_key, end_cursor)
+                else:
+                    # If there is no pagination being used, break immediately
+                    break
+        except GeneratorExit:
+            # The consumer stopped early (e.g. SQLite applying a LIMIT that
+            # wasn't pushed down), so there is nothing to resume
+            if checkpoints is not None:
+                checkpoints.clear(checkpoint_key)
+            raise
+
+    def _get_list_query(
+        self, fields_str: str, query_args: Dict[str, QueryArg], stream: str = ""
+    ) -> str:
+        if query_args:
+            variable_str = f"({_get_variable_argument_str(query_args)})"
+        else:
+            # Don't generate the () for empty list of query_args
+            variable_str = ""
+
+        return f"""query {{
+{self.table}{variable_str}{stream}{{
+    {fields_str}
+}}
+}}"""
+
+    def get_pages_list(
+        self,
+        columns: Sequence[str],
+        limit: Optional[int] = None,
+        extra_args: Optional[Dict[str, QueryArg]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the nodes of the list.
+
+        This is a single page, unless the list is delivered incrementally.
+        """
+        query = self._get_list_query(
+            self._get_fields_str(columns),
+            {**self.query_args, **(extra_args or {})},
+            self._get_stream_directive(limit),
+        )
+        if self.incremental_delivery:
+            count = 0
+            for batch in self._stream_nodes(query, columns, IncrementalResult()):
+                if limit is not None:
+                    batch = batch[: limit - count]
+                yield batch
+                count += len(batch)
+                if limit is not None and count >= limit:
+                    return
+            return
+
+        with events.span(events.PAGE, self.table) as event:
             query_data = self.run_query(query=query)
-            query_data_connection = query_data[self.table]
+            nodes: List[Dict[str, Any]] = query_data[self.table]
+            if event is not None:
+                event.rows = len(nodes)
 
-            edges = query_data_connection["edges"]
+        yield nodes[:limit]
 
-            for edge in edges:
-                node: Dict[str, Any] = edge["node"]
+    def get_pages(
+        self,
+        requested_columns: Optional[Collection[str]] = None,
+        limit: Optional[int] = None,
+        page_size: Optional[int] = None,
+        extra_args: Optional[Dict[str, QueryArg]] = None,
+        state: Optional[ScanState] = None,
+        checkpoint: bool = False,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield the raw nodes of the table a page at a time.
+
+        This is the building block for bulk (e.g. columnar) consumers that
+        don't need a dict per row. ``page_size`` is only a hint, applied when
+        the connection accepts a ``first`` argument. ``extra_args`` are added to
+        the query args for this call. With ``checkpoint``, an interrupted scan
+        of a connection is resumed (see ``get_pages_connection``).
+        """
+        columns = self._get_requested_columns(requested_columns)
+        if self.is_connection:
+            return self.get_pages_connection(
+                columns,
+                limit,
+                page_size,
+                extra_args,
+                checkpoint=checkpoint,
+                state=state,
+            )
+        else:
+            return self.get_pages_list(columns, limit, extra_args)
 
-                yield {c: extract_flattened_value(node, c) for c in self.columns.keys()}
+    def _get_incremental_args(self) -> Optional[Dict[str, QueryArg]]:
+        """The extra query args that fetch only new or changed rows.
 
-            if self.pagination_relay:
-                page_info = query_data_connection["pageInfo"]
-                if not page_info["hasNextPage"]:
-                    break
-                after = page_info["endCursor"]
-            else:
-                # If there is no pagination being used, break immediately
-                break
+        Returns None when the whole table has to be fetched.
+        """
+        if self.snapshot is None or self.snapshot_config is None:
+            return None
+        if not self.snapshot.is_populated():
+            return None
+
+        config = self.snapshot_config
+        if "updated_arg" in config:
+            since = self.snapshot.get_max(config["updated_column"])
+            return {} if since is None else {config["updated_arg"]: since}
+        elif config.get("resume_cursor") and self.is_connection:
+            cursor = self.snapshot.get_meta().get("cursor")
+            return {} if cursor is None else {"after": cursor}
+        return None
+
+    def refresh_snapshot(self, full: bool = False) -> None:
+        """Bring the local copy of the table up to date.
+
+        Unless ``full`` is set (or there is no usable copy yet), only new or
+        changed rows are fetched when the snapshot is configured with an
+        ``updated_arg`` (rows are upserted on ``id``) or ``resume_cursor``
+        (pagination resumes from the stored ``endCursor``). Otherwise the
+        whole table is fetched again.
+        """
+        if self.snapshot is None or self.snapshot_config is None:
+            raise ValueError(f"No snapshot configured for {self.table}")
+
+        extra_args = None if full else self._get_incremental_args()
+        columns = list(self.columns.keys())
+        state = ScanState()
+        encoder = self.get_encoder(columns)
+        with self.snapshot.write(replace=extra_args is None) as writer:
+            for nodes in self.get_pages(columns, extra_args=extra_args, state=state):
+                writer.insert(self.get_rows_from_nodes(nodes, columns, encoder))
+            if state.end_cursor is not None:
+                writer.cursor = state.end_cursor
+
+    def get_data_snapshot(
+        self,
+        requested_columns: Optional[Collection[str]] = None,
+        ids: Optional[Sequence[Any]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Read rows from the local copy, refreshing it first if stale."""
+        if self.snapshot is None or self.snapshot_config is None:
+            raise ValueError(f"No snapshot configured for {self.table}")
+
+        if self.snapshot.is_stale(self.snapshot_config.get("ttl")):
+            self.refresh_snapshot()
+        else:
+            events.emit(events.CACHE_HIT, self.table)
+
+        columns = self._get_requested_columns(requested_columns)
+        rows = self.snapshot.get_data(columns, ids, limit)
+        encoder = self.get_encoder(columns)
+        return rows if encoder is None else map(encoder.encode, rows)
+
+    def get_data_connection(
+        self,
+        bounds: Dict[str, Filter],
+        order: List[Tuple[str, RequestedOrder]],
+        **kwargs: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        columns = self._get_requested_columns(kwargs.get("requested_columns"))
+        encoder = self.get_encoder(columns)
+        # Only statements that opted in (see ``GraphQLCursor.checkpoint``)
+        scope = get_current_scope()
+        pages = self.get_pages_connection(
+            columns,
+            kwargs.get("limit"),
+            checkpoint=scope is not None and scope.checkpoint,
+        )
+        try:
+            for nodes in pages:
+                yield from self.get_rows_from_nodes(nodes, columns, encoder)
+        finally:
+            # Closed now rather than when collected, if abandoned
+            pages.close()
 
     def get_data_list(
         self,
@@ -541,32 +1468,678 @@ class GraphQLAdapter(Adapter):
         order: List[Tuple[str, RequestedOrder]],
         **kwargs: Any,
     ) -> Iterator[Dict[str, Any]]:
-        fields_str = get_gql_fields(list(self.columns.keys()))
+        columns = self._get_requested_columns(kwargs.get("requested_columns"))
+        encoder = self.get_encoder(columns)
+        for nodes in self.get_pages_list(columns, kwargs.get("limit")):
+            yield from self.get_rows_from_nodes(nodes, columns, encoder)
+
+    def _get_lookup_query(self, columns: Sequence[str], ids: Sequence[Any]) -> str:
+        fields_str = self.table_plan.get_fields_str(columns)
+        if self.lookup_fragment is not None:
+            fields_str = f"... on {self.lookup_fragment} {{{fields_str}}}"
+
+        lookups_str = " ".join(
+            f"n{i}: {self.lookup_field}({ID_COLUMN}: {_format_arg(node_id)})"
+            f"{{{fields_str}}}"
+            for i, node_id in enumerate(ids)
+        )
+        return f"query {{{lookups_str}}}"
 
-        if self.query_args:
-            variable_str = f"({_get_variable_argument_str(self.query_args)})"
-        else:
-            # Don't generate the () for empty list of query_args
-            variable_str = ""
+    def get_data_lookup(
+        self,
+        ids: Sequence[str],
+        requested_columns: Optional[Collection[str]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Fetch nodes by id using the singular root field.
 
-        query = f"""query {{
-{self.table}{variable_str}{{
-    {fields_str}
+        Lookups are batched as aliased fields, ``LOOKUP_BATCH_SIZE`` per request.
+        Ids that do not resolve to a node are skipped.
+        """
+        if self.lookup_field is None:
+            raise ValueError(f"No singular lookup field found for {self.table}")
+
+        columns = self._get_requested_columns(requested_columns)
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE):
+            batch = ids[start : start + LOOKUP_BATCH_SIZE]
+            with events.span(events.LOOKUP, self.table) as event:
+                query_data = self.run_query(
+                    query=self._get_lookup_query(columns, batch)
+                )
+                # node(id:) returns an empty object for other types
+                nodes: List[Dict[str, Any]] = [
+                    query_data[f"n{i}"]
+                    for i in range(len(batch))
+                    if query_data[f"n{i}"]
+                ]
+                if event is not None:
+                    event.rows = len(nodes)
+
+            yield from self.get_rows_from_nodes(nodes, columns)
+
+    def _compile_aggregate(self, statement: Select) -> Optional[CompiledAggregate]:
+        if self.aggregate_field is None or self.query_args:
+            return None
+        if self.snapshot is not None:
+            # Aggregating the local copy is cheaper than asking the server
+            return None
+
+        group_by = statement.group_by
+        if group_by and self.is_connection:
+            # ``distinct_on`` is only available on list fields
+            return None
+
+        referenced = set(group_by) | {p.column for p in statement.where}
+        result_columns: List[Tuple[str, Field]] = []
+        for item in statement.items:
+            expression = item.expression
+            if isinstance(expression, Aggregate):
+                if expression.distinct and expression.function != "COUNT":
+                    return None
+                if expression.function == "COUNT":
+                    field: Field = Integer()
+                elif expression.function == "AVG":
+                    field = Float()
+                else:
+                    field = self.columns.get(cast(str, expression.column), String())
+                if expression.column is not None:
+                    referenced.add(expression.column)
+            elif expression is None or expression not in group_by:
+                return None
+            else:
+                field = self.columns.get(expression, String())
+            result_columns.append((item.name, field))
+
+        if any(c not in self.columns or "__" in c for c in referenced):
+            return None
+
+        order_keys: List[Tuple[int, bool]] = []
+        for order_by in statement.order_by:
+            for i, item in enumerate(statement.items):
+                if order_by.key in (item.alias, item.expression):
+                    order_keys.append((i, order_by.descending))
+                    break
+            else:
+                return None
+
+        conditions = [_get_hasura_condition(p) for p in statement.where]
+        aggregate_str = " ".join(
+            f"a{i}: {_get_aggregate_selection(item.expression)}"
+            for i, item in enumerate(statement.items)
+            if isinstance(item.expression, Aggregate)
+        )
+        return CompiledAggregate(
+            result_columns,
+            order_keys,
+            [c for c in self.columns.keys() if c in referenced],
+            conditions,
+            aggregate_str,
+        )
+
+    def _get_keys_query(
+        self, group_by: Sequence[str], conditions: List[Dict[str, Any]]
+    ) -> str:
+        args: Dict[str, Any] = {"distinct_on": [EnumValue(c) for c in group_by]}
+        if conditions:
+            args["where"] = {"_and": conditions}
+        return f"""query {{
+{self.table}({_get_variable_argument_str(args)}){{
+    {" ".join(group_by)}
 }}
 }}"""
-        query_data = self.run_query(query=query)
-        nodes: List[Dict[str, Any]] = query_data[self.table]
 
-        for node in nodes:
-            yield {c: extract_flattened_value(node, c) for c in self.columns.keys()}
+    def _get_aggregate_query(
+        self,
+        groups: Sequence[Dict[str, Any]],
+        conditions: List[Dict[str, Any]],
+        aggregate_str: str,
+    ) -> str:
+        fields_strs = []
+        for i, group in enumerate(groups):
+            group_conditions = conditions + [
+                {c: {"_is_null": True} if v is None else {"_eq": v}}
+                for c, v in group.items()
+            ]
+            if group_conditions:
+                where_str = f"(where: {_format_arg({'_and': group_conditions})})"
+            else:
+                where_str = ""
+            fields_strs.append(
+                f"g{i}: {self.aggregate_field}{where_str}"
+                f"{{aggregate {{{aggregate_str}}}}}"
+            )
+        return f"query {{{' '.join(fields_strs)}}}"
+
+    def get_data_aggregate(self, statement: Select) -> Optional[DirectResult]:
+        """Answer an aggregate statement with the server-side aggregate field.
+
+        This expects a Hasura-style ``<table>_aggregate`` field. Without
+        ``GROUP BY`` the statement costs a single request. Groups are resolved
+        with a ``distinct_on`` request on the table, then aggregated with one
+        aliased field per group, ``AGGREGATE_BATCH_SIZE`` groups per request.
+        Returns the result columns and rows, or None if the statement can't be
+        expressed this way.
+        """
+        compiled = self._compile_aggregate(statement)
+        if compiled is None:
+            return None
+        result_columns, order_keys, _, conditions, aggregate_str = compiled
+
+        groups: List[Dict[str, Any]] = [{}]
+        if statement.group_by:
+            keys_query = self._get_keys_query(statement.group_by, conditions)
+            with events.span(events.AGGREGATE, self.table):
+                groups = self.run_query(query=keys_query)[self.table]
+
+        aggregates: List[Dict[str, Any]] = []
+        for start in range(0, len(groups), AGGREGATE_BATCH_SIZE):
+            batch = groups[start : start + AGGREGATE_BATCH_SIZE]
+            query = self._get_aggregate_query(batch, conditions, aggregate_str)
+            with events.span(events.AGGREGATE, self.table) as event:
+                query_data = self.run_query(query=query)
+                if event is not None:
+                    event.rows = len(batch)
+            aggregates.extend(
+                query_data[f"g{i}"]["aggregate"] for i in range(len(batch))
+            )
+        rows: List[Tuple[Any, ...]] = []
+        for group, aggregate in zip(groups, aggregates):
+            row = []
+            for i, (item, (_, field)) in enumerate(
+                zip(statement.items, result_columns)
+            ):
+                expression = item.expression
+                if isinstance(expression, Aggregate):
+                    value = aggregate[f"a{i}"]
+                    if expression.function != "COUNT":
+                        value = None if value is None else value[expression.column]
+                else:
+                    value = group[cast(str, expression)]
+                row.append(get_parser(field)(value))
+            rows.append(tuple(row))
+
+        rows = sort_rows(rows, order_keys)
+        start = statement.offset or 0
+        end = None if statement.limit is None else start + statement.limit
+        return result_columns, rows[start:end]
+
+    def _compile_select(self, statement: Select) -> Optional[CompiledSelect]:
+        if statement.is_aggregate:
+            return None
+
+        output: List[str] = []
+        result_columns: List[Tuple[str, Field]] = []
+        for item in statement.items:
+            if item.expression is None:
+                output.extend(self.columns.keys())
+                result_columns.extend(self.columns.items())
+            elif isinstance(item.expression, str) and item.expression in self.columns:
+                output.append(item.expression)
+                result_columns.append((item.name, self.columns[item.expression]))
+            else:
+                return None
+
+        checks: List[Tuple[str, Callable[[Any], bool]]] = []
+        ids: Optional[List[str]] = None
+        for predicate in statement.where:
+            field = self.columns.get(predicate.column)
+            if field is None:
+                return None
+            check = _get_predicate_check(field, predicate)
+            if check is None:
+                return None
+            checks.append((predicate.column, check))
+
+            if (
+                ids is None
+                and self.lookup_field is not None
+                and predicate.column == ID_COLUMN
+                and predicate.operator in ("=", "IN")
+            ):
+                ids = list(
+                    predicate.value if predicate.operator == "IN" else [predicate.value]
+                )
+
+        order_keys: List[Tuple[str, bool]] = []
+        for order_by in statement.order_by:
+            key = _resolve_alias(order_by.key, statement.items)
+            if (
+                not isinstance(key, str)
+                or key not in self.columns
+                or not isinstance(self.columns[key], COMPARABLE_FIELDS)
+            ):
+                return None
+            order_keys.append((key, order_by.descending))
+
+        referenced = set(output) | {c for c, _ in checks} | {c for c, _ in order_keys}
+        needed = [c for c in self.columns.keys() if c in referenced]
+
+        offset = statement.offset or 0
+        end = None if statement.limit is None else offset + statement.limit
+        # Rows are only dropped locally when there are predicates or sorting
+        limit = end if not checks and not order_keys else None
+        return CompiledSelect(
+            output, result_columns, checks, ids, order_keys, needed, offset, end, limit
+        )
+
+    def get_data_direct(self, statement: Select) -> Optional[DirectResult]:
+        """Compile a simple (non-aggregate) statement straight into requests.
+
+        Only the referenced columns are fetched, ``id`` constraints use batched
+        lookups and a bare ``LIMIT`` stops pagination early. Other predicates
+        and ``ORDER BY`` are evaluated while streaming, skipping the per-cell
+        round trip through the SQLite virtual table.
+        Returns the result columns and rows, or None if the statement can't be
+        expressed this way.
+        """
+        compiled = self._compile_select(statement)
+        if compiled is None:
+            return None
+        output, checks, order_keys, needed = (
+            compiled.output,
+            compiled.checks,
+            compiled.order_keys,
+            compiled.needed,
+        )
+
+        if self.snapshot is not None:
+            data = self.get_data_snapshot(needed, compiled.ids, compiled.limit)
+        elif compiled.ids is not None:
+            data = self.get_data_lookup(compiled.ids, needed)
+        else:
+            # A single scan, so there's nothing to replay
+            data = self.get_data_scan(
+                {}, [], requested_columns=needed, limit=compiled.limit
+            )
+
+        parsers = {c: get_parser(self.columns[c]) for c in needed}
+        width = len(output)
+
+        def get_rows() -> Iterator[Tuple[Any, ...]]:
+            for data_row in data:
+                row = {c: parsers[c](data_row.get(c)) for c in needed}
+                if all(check(row[c]) for c, check in checks):
+                    # keep the sort keys at the end of the row until sorted
+                    yield tuple(row[c] for c in output) + tuple(
+                        row[c] for c, _ in order_keys
+                    )
+
+        rows = get_rows()
+        if order_keys:
+            rows = iter(
+                sort_rows(
+                    list(rows),
+                    [(width + i, desc) for i, (_, desc) in enumerate(order_keys)],
+                )
+            )
+
+        return compiled.result_columns, (
+            row[:width] for row in itertools.islice(rows, compiled.offset, compiled.end)
+        )
+
+    def get_rows(
+        self,
+        bounds: Dict[str, Filter],
+        order: List[Tuple[str, RequestedOrder]],
+        **kwargs: Any,
+    ) -> Iterator[Row]:
+        """Yield rows as native Python types, parsing date/time values fast."""
+        parsers = {c: get_parser(field) for c, field in self.columns.items()}
+        for row in self.get_data(bounds, order, **kwargs):
+            yield {c: parsers[c](value) for c, value in row.items() if c in parsers}
+
+    # Dry runs -----------------------------------------------------------------
+
+    def explain(self, statement: Select, direct: bool = True) -> QueryPlan:
+        """Describe how ``statement`` would be executed, without running it.
+
+        No data is requested (building the adapter does introspect the
+        schema). ``direct`` is whether the statement would be executed
+        directly; if not, or if it can't be, this describes the fetches the
+        SQLite virtual table makes, where constraints other than ``id``
+        lookups are always evaluated locally.
+        """
+        if direct and statement.is_aggregate:
+            compiled_aggregate = self._compile_aggregate(statement)
+            if compiled_aggregate is not None:
+                return self._explain_aggregate(statement, compiled_aggregate)
+        elif direct:
+            compiled = self._compile_select(statement)
+            if compiled is not None:
+                return self._explain_select(statement, compiled)
+        return self._explain_sqlite(statement)
+
+    def _explain_select(self, statement: Select, compiled: CompiledSelect) -> QueryPlan:
+        pushed_down: List[str] = []
+        local: List[str] = []
+        id_predicate: Optional[Predicate] = None
+        for predicate in statement.where:
+            if (
+                compiled.ids is not None
+                and id_predicate is None
+                and predicate.column == ID_COLUMN
+                and predicate.operator in ("=", "IN")
+            ):
+                id_predicate = predicate
+                pushed_down.append(describe_predicate(predicate))
+            else:
+                local.append(describe_predicate(predicate))
+        if compiled.order_keys:
+            local.append(describe_order_by(compiled.order_keys))
+        if compiled.limit is not None:
+            pushed_down.append(f"LIMIT {compiled.limit}")
+        elif statement.limit is not None:
+            local.append(f"LIMIT {statement.limit}")
+        if compiled.offset:
+            local.append(f"OFFSET {compiled.offset}")
+
+        return self._explain_fetch(
+            compiled.needed, compiled.ids, compiled.limit, pushed_down, local
+        )
+
+    def _explain_sqlite(self, statement: Select) -> QueryPlan:
+        referenced = {p.column for p in statement.where} | set(statement.group_by)
+        for item in statement.items:
+            if item.expression is None:
+                referenced.update(self.columns.keys())
+            elif isinstance(item.expression, Aggregate):
+                if item.expression.column is not None:
+                    referenced.add(item.expression.column)
+            else:
+                referenced.add(item.expression)
+        for order_by in statement.order_by:
+            key = _resolve_alias(order_by.key, statement.items)
+            if isinstance(key, str):
+                referenced.add(key)
+        columns = [c for c in self.columns.keys() if c in referenced]
+
+        # SQLite only hands us ``id`` equality, one value at a time
+        ids: Optional[List[Any]] = None
+        pushed_down: List[str] = []
+        local: List[str] = []
+        for predicate in statement.where:
+            if (
+                ids is None
+                and self.lookup_field is not None
+                and predicate.column == ID_COLUMN
+                and predicate.operator in ("=", "IN")
+            ):
+                ids = list(
+                    predicate.value if predicate.operator == "IN" else [predicate.value]
+                )
+                pushed_down.append(describe_predicate(predicate))
+            else:
+                local.append(describe_predicate(predicate))
+        if statement.group_by:
+            local.append(f"GROUP BY {', '.join(statement.group_by)}")
+        local.extend(
+            SelectItem(item.expression).name
+            for item in statement.items
+            if isinstance(item.expression, Aggregate)
+        )
+        if statement.order_by:
+            local.append(
+                describe_order_by(
+                    [
+                        (
+                            SelectItem(order_by.key).name,
+                            order_by.descending,
+                        )
+                        for order_by in statement.order_by
+                    ]
+                )
+            )
+        if statement.limit is not None:
+            local.append(f"LIMIT {statement.limit}")
+        if statement.offset:
+            local.append(f"OFFSET {statement.offset}")
+
+        fetch = self._explain_fetch(
+            columns, ids, None, pushed_down, local, lookup_batch_size=1
+        )
+        return fetch._replace(direct=False)
+
+    def _explain_aggregate(
+        self, statement: Select, compiled: CompiledAggregate
+    ) -> QueryPlan:
+        pushed_down = [describe_predicate(p) for p in statement.where]
+        if statement.group_by:
+            pushed_down.append(f"GROUP BY {', '.join(statement.group_by)}")
+        pushed_down.extend(
+            SelectItem(item.expression).name
+            for item in statement.items
+            if isinstance(item.expression, Aggregate)
+        )
+
+        local: List[str] = []
+        if compiled.order_keys:
+            local.append(
+                describe_order_by(
+                    [(statement.items[i].name, desc) for i, desc in compiled.order_keys]
+                )
+            )
+        if statement.limit is not None:
+            local.append(f"LIMIT {statement.limit}")
+        if statement.offset:
+            local.append(f"OFFSET {statement.offset}")
+
+        if statement.group_by:
+            # The aggregates are then requested for each group found
+            documents = [self._get_keys_query(statement.group_by, compiled.conditions)]
+            estimated_requests = None
+            estimated_rows = None
+        else:
+            documents = [
+                self._get_aggregate_query(
+                    [{}], compiled.conditions, compiled.aggregate_str
+                )
+            ]
+            estimated_requests = 1
+            estimated_rows = 1
+
+        return QueryPlan(
+            self.table,
+            plan.AGGREGATE,
+            compiled.referenced,
+            documents,
+            pushed_down,
+            local,
+            estimated_requests=estimated_requests,
+            estimated_rows=estimated_rows,
+        )
+
+    def _explain_fetch(
+        self,
+        requested_columns: Collection[str],
+        ids: Optional[Sequence[Any]],
+        limit: Optional[int],
+        pushed_down: List[str],
+        local: List[str],
+        lookup_batch_size: int = LOOKUP_BATCH_SIZE,
+    ) -> QueryPlan:
+        """Describe fetching rows as ``get_data`` would."""
+        columns = self._get_requested_columns(requested_columns)
+        if self.query_args:
+            pushed_down = [
+                _get_variable_argument_str(self.query_args),
+                *pushed_down,
+            ]
+
+        if self.snapshot is not None and self.snapshot_config is not None:
+            fresh = not self.snapshot.is_stale(self.snapshot_config.get("ttl"))
+            return QueryPlan(
+                self.table,
+                plan.SNAPSHOT,
+                columns,
+                [],
+                pushed_down,
+                local,
+                estimated_requests=0 if fresh else None,
+                estimated_rows=limit,
+                # A refresh may be incremental
+                full_scan=not fresh and self._get_incremental_args() is None,
+            )
+
+        if ids is not None:
+            return QueryPlan(
+                self.table,
+                plan.LOOKUP,
+                columns,
+                [
+                    self._get_lookup_query(
+                        columns, ids[start : start + lookup_batch_size]
+                    )
+                    for start in range(0, len(ids), lookup_batch_size)
+                ],
+                pushed_down,
+                local,
+                estimated_requests=-(-len(ids) // lookup_batch_size),
+                estimated_rows=len(ids),
+            )
+
+        fields_str = self._get_fields_str(columns)
+        if not self.is_connection:
+            return QueryPlan(
+                self.table,
+                plan.LIST,
+                columns,
+                [
+                    self._get_list_query(
+                        fields_str, self.query_args, self._get_stream_directive(limit)
+                    )
+                ],
+                pushed_down,
+                local,
+                estimated_requests=1,
+                estimated_rows=limit,
+                # Lists aren't paginated, so a LIMIT is applied locally
+                full_scan=True,
+            )
+
+        query_args = dict(self.query_args)
+        after = query_args.pop("after", None)
+        scope = get_current_scope()
+        if (
+            self.checkpoints is not None
+            and scope is not None
+            and scope.checkpoint
+            and self.pagination_relay
+            and limit is None
+        ):
+            checkpoint_key = get_checkpoint_key(
+                self.graphql_api, self.table, self.query_args, columns
+            )
+            after = self.checkpoints.get(checkpoint_key) or after
+        set_first = "first" in self.table_args and "first" not in query_args
+        args = self._get_page_args(query_args, after, limit, None, set_first)
+        page_size = cast(Optional[int], args.get("first"))
+
+        if not self.pagination_relay:
+            estimated_requests: Optional[int] = 1
+        elif limit is not None and page_size is not None:
+            estimated_requests = -(-limit // page_size)
+        else:
+            # Depends on the server's page size or the size of the table
+            estimated_requests = None
+
+        return QueryPlan(
+            self.table,
+            plan.CONNECTION,
+            columns,
+            [
+                self._get_connection_query(
+                    fields_str, args, self._get_stream_directive(limit)
+                )
+            ],
+            pushed_down,
+            local,
+            page_size=page_size,
+            estimated_requests=estimated_requests,
+            estimated_rows=limit,
+            full_scan=limit is None,
+        )
+
+    # -------------------------------------------------------------------------
 
     def get_data(
         self,
         bounds: Dict[str, Filter],
         order: List[Tuple[str, RequestedOrder]],
         **kwargs: Any,
+    ) -> Iterator[Dict[str, Any]]:
+        id_bound = bounds.get(ID_COLUMN)
+        if self.snapshot is not None:
+            return self.get_data_snapshot(
+                kwargs.get("requested_columns"),
+                [id_bound.value] if isinstance(id_bound, Equal) else None,
+                kwargs.get("limit"),
+            )
+        if isinstance(id_bound, Equal):
+            # SQLite also hands us ``id IN (...)`` one value at a time here
+            return self.get_data_lookup(
+                [id_bound.value], kwargs.get("requested_columns")
+            )
+
+        # SQLite scans the inner table of a join once per outer row
+        scope = get_current_scope()
+        if scope is None or scope.buffers is None:
+            return self.get_data_scan(bounds, order, **kwargs)
+        columns = self._get_requested_columns(kwargs.get("requested_columns"))
+        return scope.buffers.scan(
+            self._get_scan_key(bounds, order, kwargs.get("limit")),
+            frozenset(columns),
+            lambda: self.get_data_scan(bounds, order, **kwargs),
+            self.table,
+        )
+
+    def get_data_scan(
+        self,
+        bounds: Dict[str, Filter],
+        order: List[Tuple[str, RequestedOrder]],
+        **kwargs: Any,
     ) -> Iterator[Dict[str, Any]]:
         if self.is_connection:
             return self.get_data_connection(bounds=bounds, order=order, **kwargs)
         else:
             return self.get_data_list(bounds=bounds, order=order, **kwargs)
+
+    def _get_scan_key(
+        self,
+        bounds: Dict[str, Filter],
+        order: List[Tuple[str, RequestedOrder]],
+        limit: Optional[int],
+    ) -> Hashable:
+        return (
+            self.table,
+            frozenset(self.include),
+            tuple(sorted(self.query_args.items())),
+            self.is_connection,
+            repr(sorted(bounds.items())),
+            repr(order),
+            limit,
+        )
+
+    def prefetch(self, requested_columns: Optional[Collection[str]] = None) -> bool:
+        """Start scanning the table for the current statement, in a thread.
+
+        The rows are read by the statement's first scan of the table (by
+        SQLite), if it asks for no other columns. Tables with a local copy, and
+        columns of list children (which change the rows), aren't prefetched.
+        """
+        scope = get_current_scope()
+        if scope is None or scope.buffers is None or self.snapshot is not None:
+            return False
+        columns = self._get_requested_columns(requested_columns)
+        if any(c.startswith(f"{p}__") for c in columns for p in self.list_paths):
+            return False
+        if ID_COLUMN in self.columns and ID_COLUMN not in columns:
+            # What is scanned for e.g. ``COUNT(*)``
+            columns.append(ID_COLUMN)
+
+        bounds: Dict[str, Filter] = {}
+        order: List[Tuple[str, RequestedOrder]] = []
+        scope.buffers.prefetch(
+            self._get_scan_key(bounds, order, None),
+            frozenset(columns),
+            lambda: self.get_data_scan(bounds, order, requested_columns=set(columns)),
+        )
+        return True
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import getpass
+import os
+import tempfile
+import time
+import uuid
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Iterator, Optional, TypeVar
+from weakref import WeakValueDictionary
+
+from shillelagh.exceptions import OperationalError
+
+from .rescan import RESCAN_BUFFER_SIZE, ScanBuffers
+
+T = TypeVar("T")
+
+# -----------------------------------------------------------------------------
+
+
+def get_default_cancel_dir() -> str:
+    """The directory for cancelling statements across processes, per user."""
+    return os.path.join(tempfile.gettempdir(), f"graphqldb-cancel-{getpass.getuser()}")
+
+
+def _make_cancel_dir(path: str) -> None:
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    # Anyone who can list it could cancel the statements of others
+    if hasattr(os, "getuid"):
+        if os.stat(path).st_uid != os.getuid():
+            raise PermissionError(f"Cancel directory of another user: {path}")
+        os.chmod(path, 0o700)
+
+
+def _remove_files(paths: Iterable[str]) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------------------------------------------------------------
+
+
+class QueryCancelled(OperationalError):
+    """The statement was cancelled or ran past its deadline."""
+
+
+class CancelToken:
+    """Cancels the statement running under one id (e.g. of one cursor).
+
+    Running statements are registered in this process. With a ``cancel_dir``,
+    they are also registered there (and cancellations signalled with a marker
+    file), so they can be cancelled from another process on the same host,
+    e.g. Superset's web server cancelling a query running in a worker of the
+    same machine.
+    """
+
+    def __init__(
+        self, cancel_id: Optional[str] = None, cancel_dir: Optional[str] = None
+    ):
+        self.cancel_id = cancel_id or uuid.uuid4().hex
+        self.cancel_dir = cancel_dir
+        self.cancelled = False
+        # The marker of the running statement, and what removes its files
+        # (also if the statement is never stopped)
+        self._marker_path: Optional[str] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def start(self) -> None:
+        """Register a statement starting, which can be cancelled until ``stop``."""
+        self.stop()
+        self.cancelled = False
+        _tokens[self.cancel_id] = self
+        if self.cancel_dir is not None:
+            _make_cancel_dir(self.cancel_dir)
+            self._marker_path = os.path.join(self.cancel_dir, self.cancel_id)
+            running_path = f"{self._marker_path}.running"
+            with open(running_path, "w"):
+                pass
+            self._finalizer = weakref.finalize(
+                self, _remove_files, [running_path, self._marker_path]
+            )
+
+    def stop(self) -> None:
+        if _tokens.get(self.cancel_id) is self:
+            del _tokens[self.cancel_id]
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._marker_path = None
+
+    def is_cancelled(self) -> bool:
+        if (
+            not self.cancelled
+            and self._marker_path is not None
+            and os.path.exists(self._marker_path)
+        ):
+            self.cancelled = True
+        return self.cancelled
+
+
+_tokens: WeakValueDictionary[str, CancelToken] = WeakValueDictionary()
+
+
+def cancel_query(cancel_id: str, cancel_dir: Optional[str] = None) -> bool:
+    """Cancel the statement running under ``cancel_id``, if any.
+
+    The statement stops before its next GraphQL request, or the next chunk of
+    a streamed response; a request already sent isn't aborted, but is bounded
+    by the statement's deadline. Statements of other processes are found in
+    ``cancel_dir``, if they use the same one (on the same host).
+    """
+    token = _tokens.get(cancel_id)
+    if token is not None:
+        token.cancelled = True
+        return True
+    if cancel_dir is None:
+        return False
+
+    # It may be running in another process
+    marker_path = os.path.join(cancel_dir, os.path.basename(cancel_id))
+    if not os.path.exists(f"{marker_path}.running"):
+        return False
+    with open(marker_path, "w"):
+        pass
+    return True
+
+
+# -----------------------------------------------------------------------------
+
+
+class StatementScope:
+    """The cancellation token, deadline and scan buffers of a statement."""
+
+    def __init__(
+        self,
+        token: CancelToken,
+        timeout: Optional[float] = None,
+        rescan_buffer_size: Optional[int] = RESCAN_BUFFER_SIZE,
+        checkpoint: bool = False,
+    ):
+        self.token = token
+        token.start()
+        self.deadline = None if timeout is None else time.monotonic() + timeout
+        # Repeated scans of a table are replayed, unless disabled (None)
+        self.buffers = (
+            None if rescan_buffer_size is None else ScanBuffers(rescan_buffer_size)
+        )
+        # Whether its connection scans record checkpoints, see ``checkpoint``
+        self.checkpoint = checkpoint
+
+    def check(self) -> None:
+        if self.token.is_cancelled():
+            raise QueryCancelled("Query was cancelled")
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise QueryCancelled("Query exceeded its deadline")
+
+    def get_timeout(self) -> Optional[float]:
+        """The time left for a request, raising if there is none."""
+        self.check()
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def iter_checked(self, items: Iterable[T]) -> Iterator[T]:
+        """Check the scope before each item, e.g. chunk of a response."""
+        for item in items:
+            self.check()
+            yield item
+
+    def iter_within(self, items: Iterator[T]) -> Iterator[T]:
+        """Pull from a (lazy) iterator with this scope active."""
+        while True:
+            with activate(self):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    self.close()
+                    return
+            yield item
+
+    def close(self) -> None:
+        """End the statement, dropping its scan buffers."""
+        self.token.stop()
+        if self.buffers is not None:
+            self.buffers.close()
+
+
+_current_scope: ContextVar[Optional[StatementScope]] = ContextVar(
+    "graphqldb_statement_scope", default=None
+)
+
+
+def get_current_scope() -> Optional[StatementScope]:
+    return _current_scope.get()
+
+
+@contextmanager
+def activate(scope: StatementScope) -> Iterator[StatementScope]:
+    reset_token = _current_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_scope.reset(reset_token)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from typing import Any, Collection, Mapping, Optional
+
+# -----------------------------------------------------------------------------
+
+CHECKPOINT_TABLE = "checkpoints"
+
+# -----------------------------------------------------------------------------
+
+
+def get_checkpoint_key(
+    graphql_api: str,
+    table: str,
+    query_args: Mapping[str, Any],
+    columns: Collection[str],
+) -> str:
+    """Identify a scan by endpoint, table, args and projection."""
+    return json.dumps(
+        [graphql_api, table, sorted(query_args.items()), sorted(columns)],
+        separators=(",", ":"),
+    )
+
+
+class CheckpointStore:
+    """The last committed ``endCursor`` of each running scan, in a SQLite file.
+
+    Every call opens its own short transaction, so several processes can share
+    one file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} "
+                "(key TEXT PRIMARY KEY, cursor TEXT, updated_at REAL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with closing(sqlite3.connect(self.path)) as connection:
+            row = connection.execute(
+                f"SELECT cursor FROM {CHECKPOINT_TABLE} WHERE key = ?",  # noqa: S608
+                (key,),
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set(self, key: str, cursor: str) -> None:
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {CHECKPOINT_TABLE} VALUES (?, ?, ?)",
+                (key, cursor, time.time()),
+            )
+
+    def clear(self, key: str) -> None:
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            connection.execute(
+                f"DELETE FROM {CHECKPOINT_TABLE} WHERE key = ?",  # noqa: S608
+                (key,),
+            )
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from shillelagh.fields import (
+    Boolean,
+    Field,
+    Float,
+    Integer,
+    ISODate,
+    ISODateTime,
+    ISOTime,
+)
+
+from .adapter import GraphQLAdapter, QueryArg, extract_flattened_value
+from .dialect import get_adapter
+from .parsing import parse_column
+
+if TYPE_CHECKING:
+    import numpy
+    import pyarrow
+    from sqlalchemy.engine import Engine
+
+# -----------------------------------------------------------------------------
+
+# Rows per batch; this is also used as the page size when the API allows it
+DEFAULT_BATCH_SIZE = 1000
+
+# -----------------------------------------------------------------------------
+
+
+def _import_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as ex:  # pragma: no cover
+        raise ImportError(
+            "pyarrow is required; install sqlalchemy-graphqlapi[arrow]"
+        ) from ex
+    return pyarrow
+
+
+def _import_numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as ex:  # pragma: no cover
+        raise ImportError(
+            "numpy is required; install sqlalchemy-graphqlapi[numpy]"
+        ) from ex
+    return numpy
+
+
+def _get_columns(
+    adapter: GraphQLAdapter, columns: Optional[Sequence[str]]
+) -> List[str]:
+    if columns is None:
+        return list(adapter.columns.keys())
+
+    missing = [c for c in columns if c not in adapter.columns]
+    if missing:
+        raise ValueError(f"Unknown columns for {adapter.table}: {missing}")
+    return list(columns)
+
+
+def iter_column_batches(
+    adapter: GraphQLAdapter,
+    columns: Sequence[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[Dict[str, List[Any]]]:
+    """Yield parsed values per column, ``batch_size`` rows at a time.
+
+    Values are appended column by column from each page of nodes, so no
+    per-row objects are built (unless list children have to be exploded).
+    """
+    if batch_size <= 0:
+        raise ValueError("batch_size must be positive")
+
+    buffer: Dict[str, List[Any]] = {c: [] for c in columns}
+    size = 0
+    encoder = adapter.get_encoder(columns)
+    for nodes in adapter.get_pages(columns, page_size=batch_size):
+        get_value: Callable[[Dict[str, Any], str], Any] = extract_flattened_value
+        if adapter.list_paths:
+            # Nodes with list children span several rows
+            nodes = list(adapter.get_rows_from_nodes(nodes, columns, encoder))
+            get_value = dict.get
+
+        for column in columns:
+            values = [get_value(node, column) for node in nodes]
+            if encoder is not None and not adapter.list_paths:
+                values = encoder.encode_column(column, values)
+            buffer[column].extend(parse_column(adapter.columns[column], values))
+        size += len(nodes)
+
+        while size >= batch_size:
+            yield {c: values[:batch_size] for c, values in buffer.items()}
+            buffer = {c: values[batch_size:] for c, values in buffer.items()}
+            size -= batch_size
+
+    if size:
+        yield buffer
+
+
+# -----------------------------------------------------------------------------
+
+
+def get_arrow_type(field: Field) -> pyarrow.DataType:
+    pa = _import_pyarrow()
+    if isinstance(field, Boolean):
+        return pa.bool_()
+    elif isinstance(field, Integer):
+        return pa.int64()
+    elif isinstance(field, Float):
+        return pa.float64()
+    elif isinstance(field, ISODateTime):
+        # Parsed timestamps with an offset are normalized to UTC
+        return pa.timestamp("us", tz="UTC")
+    elif isinstance(field, ISODate):
+        return pa.date32()
+    elif isinstance(field, ISOTime):
+        return pa.time64("us")
+    return pa.string()
+
+
+def _iter_arrow_batches(
+    adapter: GraphQLAdapter, columns: Sequence[str], batch_size: int
+) -> Iterator[pyarrow.RecordBatch]:
+    pa = _import_pyarrow()
+    schema = pa.schema([(c, get_arrow_type(adapter.columns[c])) for c in columns])
+
+    for batch in iter_column_batches(adapter, columns, batch_size):
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(batch[field.name], type=field.type) for field in schema],
+            schema=schema,
+        )
+
+
+def iter_arrow_batches(
+    engine: Engine,
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **query_args: QueryArg,
+) -> Iterator[pyarrow.RecordBatch]:
+    """Yield a GraphQL table as Arrow record batches of up to ``batch_size`` rows.
+
+    Only one batch is held in memory at a time.
+    """
+    adapter = get_adapter(engine, table, **query_args)
+    return _iter_arrow_batches(adapter, _get_columns(adapter, columns), batch_size)
+
+
+def fetch_arrow(
+    engine: Engine,
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **query_args: QueryArg,
+) -> pyarrow.Table:
+    """Fetch a GraphQL table as an Arrow table.
+
+    Use ``fetch_arrow(...).to_pandas()`` to get a DataFrame.
+    """
+    pa = _import_pyarrow()
+    adapter = get_adapter(engine, table, **query_args)
+    column_names = _get_columns(adapter, columns)
+    schema = pa.schema([(c, get_arrow_type(adapter.columns[c])) for c in column_names])
+    return pa.Table.from_batches(
+        list(_iter_arrow_batches(adapter, column_names, batch_size)), schema=schema
+    )
+
+
+# -----------------------------------------------------------------------------
+
+
+def get_numpy_dtype(field: Field) -> str:
+    if isinstance(field, Boolean):
+        return "bool"
+    elif isinstance(field, Integer):
+        return "int64"
+    elif isinstance(field, Float):
+        return "float64"
+    elif isinstance(field, ISODateTime):
+        return "datetime64[us]"
+    elif isinstance(field, ISODate):
+        return "datetime64[D]"
+    return "object"
+
+
+def _to_masked_array(values: List[Any], dtype: str) -> numpy.ma.MaskedArray:
+    np = _import_numpy()
+    mask = [value is None for value in values]
+    if dtype == "object":
+        data = np.array(values, dtype=object)
+    else:
+        if dtype.startswith("datetime64"):
+            # numpy has no time zones; parsed timestamps are already in UTC
+            values = [
+                None if value is None else value.replace(tzinfo=None)
+                for value in values
+            ]
+        fill = np.zeros(1, dtype=dtype)[0]
+        data = np.array([fill if v is None else v for v in values], dtype=dtype)
+    return np.ma.masked_array(data, mask=mask)
+
+
+def _iter_numpy_batches(
+    adapter: GraphQLAdapter, columns: Sequence[str], batch_size: int
+) -> Iterator[Dict[str, numpy.ma.MaskedArray]]:
+    dtypes = {c: get_numpy_dtype(adapter.columns[c]) for c in columns}
+
+    for batch in iter_column_batches(adapter, columns, batch_size):
+        yield {c: _to_masked_array(batch[c], dtypes[c]) for c in columns}
+
+
+def iter_numpy_batches(
+    engine: Engine,
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **query_args: QueryArg,
+) -> Iterator[Dict[str, numpy.ma.MaskedArray]]:
+    """Yield a GraphQL table as typed NumPy masked arrays, batch by batch.
+
+    Nulls are masked.
+    """
+    adapter = get_adapter(engine, table, **query_args)
+    return _iter_numpy_batches(adapter, _get_columns(adapter, columns), batch_size)
+
+
+def fetch_numpy(
+    engine: Engine,
+    table: str,
+    columns: Optional[Sequence[str]] = None,
+    *,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    **query_args: QueryArg,
+) -> Dict[str, numpy.ma.MaskedArray]:
+    """Fetch a GraphQL table as a dict of typed NumPy masked arrays."""
+    np = _import_numpy()
+    adapter = get_adapter(engine, table, **query_args)
+    column_names = _get_columns(adapter, columns)
+
+    batches = list(_iter_numpy_batches(adapter, column_names, batch_size))
+    if not batches:
+        return {
+            c: _to_masked_array([], get_numpy_dtype(adapter.columns[c]))
+            for c in column_names
+        }
+    return {c: np.ma.concatenate([b[c] for b in batches]) for c in column_names}
@@ -0,0 +1,315 @@
+"""Pacing requests by the query cost an API reports.
+
+Some APIs limit clients by the cost of their queries rather than by their
+number, and report it with each response: Shopify (and others modelled on it)
+in ``extensions.cost``, as a bucket of points restored at a given rate; GitHub
+in ``X-RateLimit-*`` headers, as points left until a reset time. A parser turns
+a response into a ``CostStatus``; the ``CostBudget`` of an API (and token),
+shared by all its scans, then holds requests back just long enough for the
+budget to afford them, and tells scans to lower their page size when a page
+costs too much of it.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from .cancel import QueryCancelled, get_current_scope
+
+# -----------------------------------------------------------------------------
+
+# The most of the budget a single query should cost; pages are made smaller
+MAX_QUERY_COST_SHARE = 0.5
+
+# Times a throttled request is retried, once the budget allows
+MAX_THROTTLED_RETRIES = 3
+
+# Seconds before retrying a throttled request, when neither the response nor
+# the budget tells how long to wait; doubled with each retry
+THROTTLED_BACKOFF = 1.0
+
+# Seconds between checks for cancellation while waiting
+WAIT_INTERVAL = 0.5
+
+# -----------------------------------------------------------------------------
+
+
+class CostStatus(NamedTuple):
+    # Points the query cost, if reported
+    cost: Optional[float] = None
+    # Points left, and at most
+    remaining: Optional[float] = None
+    maximum: Optional[float] = None
+    # Points restored per second...
+    restore_rate: Optional[float] = None
+    # ...or all at once at this (epoch) time
+    reset_at: Optional[float] = None
+
+
+# Reads the status from a response's ``extensions`` and headers, if it's there
+CostParser = Callable[[Mapping[str, Any], Mapping[str, str]], Optional[CostStatus]]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_cost_extension(
+    extensions: Mapping[str, Any], headers: Mapping[str, str]
+) -> Optional[CostStatus]:
+    """``extensions.cost``, as reported by Shopify."""
+    cost = extensions.get("cost")
+    if not isinstance(cost, Mapping):
+        return None
+    throttle_status = cost.get("throttleStatus") or {}
+    return CostStatus(
+        cost=_to_float(cost.get("actualQueryCost", cost.get("requestedQueryCost"))),
+        remaining=_to_float(throttle_status.get("currentlyAvailable")),
+        maximum=_to_float(throttle_status.get("maximumAvailable")),
+        restore_rate=_to_float(throttle_status.get("restoreRate")),
+    )
+
+
+def parse_rate_limit_headers(
+    extensions: Mapping[str, Any], headers: Mapping[str, str]
+) -> Optional[CostStatus]:
+    """``X-RateLimit-*`` headers, as sent by GitHub."""
+    remaining = _to_float(headers.get("X-RateLimit-Remaining"))
+    if remaining is None:
+        return None
+    return CostStatus(
+        remaining=remaining,
+        maximum=_to_float(headers.get("X-RateLimit-Limit")),
+        reset_at=_to_float(headers.get("X-RateLimit-Reset")),
+    )
+
+
+# Parsers by name, tried in order
+COST_PARSERS: Dict[str, CostParser] = {
+    "extensions": parse_cost_extension,
+    "headers": parse_rate_limit_headers,
+}
+
+
+def register_cost_parser(name: str, parser: CostParser) -> None:
+    """Make ``parser`` available (by ``name``) to the ``cost_parsers`` option."""
+    COST_PARSERS[name] = parser
+
+
+def get_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """The seconds a throttled response asks to wait (in ``Retry-After``)."""
+    return _to_float(headers.get("Retry-After"))
+
+
+def is_throttled(status_code: int, errors: Optional[List[Any]]) -> bool:
+    """Whether a response says the query was throttled (rather than failed)."""
+    if status_code == 429:
+        return True
+    return any(
+        isinstance(error, Mapping)
+        and (error.get("extensions") or {}).get("code") == "THROTTLED"
+        for error in errors or []
+    )
+
+
+# -----------------------------------------------------------------------------
+
+
+class CostBudget:
+    """The cost budget of an API, as last reported, less the queries since."""
+
+    def __init__(self, parsers: Sequence[CostParser]):
+        self.parsers = parsers
+        self.lock = threading.Lock()
+
+        # Projected from the last status, at ``observed_at``
+        self.available: Optional[float] = None
+        self.observed_at = 0.0
+        self.maximum: Optional[float] = None
+        self.restore_rate: Optional[float] = None
+        self.reset_at: Optional[float] = None
+
+        # The last cost (and rows) of each kind of query, e.g. a table's pages
+        self.last_cost: Optional[float] = None
+        self.costs: Dict[Hashable, float] = {}
+        self.rows: Dict[Hashable, int] = {}
+        # Kinds of query whose pages were found to cost too much
+        self.lowered: Set[Hashable] = set()
+
+    def parse(
+        self, extensions: Mapping[str, Any], headers: Mapping[str, str]
+    ) -> Optional[CostStatus]:
+        for parser in self.parsers:
+            status = parser(extensions, headers)
+            if status is not None:
+                return status
+        return None
+
+    def update(
+        self,
+        extensions: Optional[Mapping[str, Any]],
+        headers: Mapping[str, str],
+        key: Optional[Hashable] = None,
+    ) -> None:
+        """Record the status reported with the response to a query of ``key``."""
+        status = self.parse(extensions or {}, headers)
+        if status is None:
+            return
+        with self.lock:
+            if status.remaining is not None:
+                self.available = status.remaining
+                self.observed_at = time.monotonic()
+            self.maximum = status.maximum
+            self.restore_rate = status.restore_rate
+            self.reset_at = status.reset_at
+            if status.cost is not None:
+                self.last_cost = status.cost
+                if key is not None:
+                    self.costs[key] = status.cost
+
+    def set_rows(self, key: Hashable, rows: int) -> None:
+        """Record the rows of the last query of ``key``, e.g. of a page."""
+        with self.lock:
+            self.rows[key] = rows
+
+    def _get_available(self, now: float) -> Optional[float]:
+        if self.available is None:
+            return None
+        if self.reset_at is not None and time.time() >= self.reset_at:
+            self.available = self.maximum
+            self.reset_at = None
+        elif self.restore_rate:
+            restored = self.available + self.restore_rate * (now - self.observed_at)
+            self.available = (
+                restored if self.maximum is None else min(restored, self.maximum)
+            )
+        self.observed_at = now
+        return self.available
+
+    def reserve(self, key: Optional[Hashable] = None) -> float:
+        """Seconds until a query of ``key`` is affordable, which is reserved."""
+        with self.lock:
+            available = self._get_available(time.monotonic())
+            if available is None:
+                return 0.0
+
+            cost = self.costs.get(key, self.last_cost or 1.0)
+            wait = 0.0
+            if available < cost:
+                if self.restore_rate:
+                    wait = (cost - available) / self.restore_rate
+                elif self.reset_at is not None:
+                    wait = max(0.0, self.reset_at - time.time())
+            # Concurrent queries wait their turn
+            self.available = available - cost
+            return wait
+
+    def get_page_size(self, key: Hashable, page_size: Optional[int]) -> Optional[int]:
+        """``page_size``, lowered once a page of ``key`` costs too much."""
+        with self.lock:
+            cost = self.costs.get(key)
+            rows = self.rows.get(key)
+            if cost is None or not rows or self.maximum is None:
+                return page_size
+            max_cost = self.maximum * MAX_QUERY_COST_SHARE
+            if key not in self.lowered:
+                if cost <= max_cost:
+                    return page_size
+                self.lowered.add(key)
+
+        fitting = max(1, int(max_cost * rows / cost)) if cost > 0 else None
+        if fitting is None or page_size is not None and page_size <= fitting:
+            return page_size
+        return fitting
+
+    def get_retry_wait(self, headers: Mapping[str, str], attempt: int) -> float:
+        """Seconds to wait before retrying a throttled query (from ``attempt`` 0).
+
+        That is what the response asks for (in ``Retry-After``), else nothing
+        once the budget is known (the retry is paced by it), else an
+        exponential backoff.
+        """
+        retry_after = get_retry_after(headers)
+        if retry_after is not None:
+            return retry_after
+        with self.lock:
+            if self.available is not None:
+                return 0.0
+        return THROTTLED_BACKOFF * 2**attempt
+
+    def pace(self, key: Optional[Hashable] = None) -> None:
+        """Wait until a query of ``key`` is affordable.
+
+        Nothing is waited for until a response has reported the budget.
+        Raises ``QueryCancelled`` rather than wait past the statement's
+        deadline, or once the statement is cancelled.
+        """
+        wait = self.reserve(key)
+        if wait <= 0:
+            return
+        wait_for(wait)
+
+
+def wait_for(seconds: float) -> None:
+    """Sleep, within the current statement's deadline."""
+    scope = get_current_scope()
+    until = time.monotonic() + seconds
+    if scope is not None and scope.deadline is not None and until > scope.deadline:
+        raise QueryCancelled("Query would exceed its deadline waiting for the API")
+    while True:
+        left = until - time.monotonic()
+        if left <= 0:
+            return
+        if scope is not None:
+            scope.check()
+        time.sleep(min(left, WAIT_INTERVAL))
+
+
+# -----------------------------------------------------------------------------
+
+_budgets: Dict[Tuple[str, Optional[str], Tuple[str, ...]], CostBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def get_budget(
+    graphql_api: str,
+    bearer_token: Optional[str] = None,
+    parsers: Optional[Sequence[str]] = None,
+) -> CostBudget:
+    """The budget of an API and token, shared by all the scans using them.
+
+    ``parsers`` are the names of the ``COST_PARSERS`` to use, by default all.
+    """
+    names = tuple(COST_PARSERS if parsers is None else parsers)
+    unknown = [name for name in names if name not in COST_PARSERS]
+    if unknown:
+        raise ValueError(f"Unknown cost parsers: {unknown}")
+
+    key = (graphql_api, bearer_token, names)
+    with _budgets_lock:
+        budget = _budgets.get(key)
+        if budget is None:
+            budget = _budgets[key] = CostBudget([COST_PARSERS[n] for n in names])
+        return budget
+
+
+def clear_budgets() -> None:
+    """Forget the budgets of the APIs."""
+    with _budgets_lock:
+        _budgets.clear()
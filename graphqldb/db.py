@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from shillelagh.adapters.base import Adapter
+from shillelagh.adapters.registry import registry
+from shillelagh.backends.apsw.db import (
+    BINARY,
+    DATETIME,
+    NUMBER,
+    ROWID,
+    STRING,
+    APSWConnection,
+    APSWCursor,
+    Binary,
+    DatabaseError,
+    DataError,
+    Date,
+    DateFromTicks,
+    Error,
+    IntegrityError,
+    InterfaceError,
+    InternalError,
+    NotSupportedError,
+    OperationalError,
+    ProgrammingError,
+    Time,
+    TimeFromTicks,
+    Timestamp,
+    TimestampFromTicks,
+    Warning,
+    apilevel,
+    paramstyle,
+    sqlite_version_info,
+    threadsafety,
+)
+from shillelagh.db import DEFAULT_SCHEMA, check_closed
+from shillelagh.fields import String
+from shillelagh.lib import find_adapter
+
+from .adapter import GraphQLAdapter
+from .cancel import CancelToken, StatementScope, activate
+from .plan import EXPLAIN_COLUMNS, QueryPlan
+from .rescan import RESCAN_BUFFER_SIZE
+from .sql import Select, UnsupportedStatement, find_tables, parse_select, strip_explain
+
+# -----------------------------------------------------------------------------
+
+# DB API 2.0 module for the dialect; this wraps the shillelagh APSW module
+__all__ = [
+    "DatabaseError",
+    "DataError",
+    "Error",
+    "IntegrityError",
+    "InterfaceError",
+    "InternalError",
+    "OperationalError",
+    "NotSupportedError",
+    "ProgrammingError",
+    "BINARY",
+    "DATETIME",
+    "NUMBER",
+    "ROWID",
+    "STRING",
+    "Binary",
+    "Date",
+    "DateFromTicks",
+    "Time",
+    "TimeFromTicks",
+    "Timestamp",
+    "TimestampFromTicks",
+    "Warning",
+    "apilevel",
+    "threadsafety",
+    "paramstyle",
+    "sqlite_version_info",
+    "connect",
+]
+
+# -----------------------------------------------------------------------------
+
+
+def _may_rescan(operation: str) -> bool:
+    """Whether SQLite may scan a table of the statement more than once.
+
+    That takes reading a table more than once (e.g. a join or subquery), so
+    statements reading a single table don't keep their rows to replay.
+    """
+    try:
+        references, _ = find_tables(operation)
+    except UnsupportedStatement:
+        return True
+    return len(references) > 1
+
+
+class GraphQLCursor(APSWCursor):
+    """A cursor that answers some statements directly with GraphQL requests.
+
+    Simple single-table statements are compiled into GraphQL requests and the
+    rows streamed back as tuples. Statements that can't be executed directly go
+    through SQLite as usual.
+    """
+
+    def __init__(
+        self,
+        cursor: Any,
+        adapters: List[Type[Adapter]],
+        adapter_kwargs: Dict[str, Dict[str, Any]],
+        isolation_level: Optional[str] = None,
+        schema: str = DEFAULT_SCHEMA,
+        direct_execution: bool = True,
+        statement_timeout: Optional[float] = None,
+        rescan_buffer_size: Optional[int] = RESCAN_BUFFER_SIZE,
+        prefetch: bool = False,
+        cancel_dir: Optional[str] = None,
+    ):
+        super().__init__(cursor, adapters, adapter_kwargs, isolation_level, schema)
+
+        self.direct_execution = direct_execution
+
+        # Seconds each statement (including fetching its rows) may take
+        self.statement_timeout = statement_timeout
+        # Bytes of repeated scans kept in memory per statement, see ``rescan``
+        self.rescan_buffer_size = rescan_buffer_size
+        # Whether the tables of a statement going through SQLite are scanned
+        # concurrently, see ``_prefetch``
+        self.prefetch = prefetch
+        # Whether scans of the next statement record checkpoints to resume
+        # from, if it fails (with a ``checkpoint_path``); set with the
+        # ``checkpoint`` execution option
+        self.checkpoint = False
+        # Cancels the running statement of this cursor, see ``cancel.cancel_query``;
+        # from other processes too, with a ``cancel_dir``
+        self.cancel_token = CancelToken(cancel_dir=cancel_dir)
+        # The scope of the last statement, until its rows are all fetched
+        self.scope: Optional[StatementScope] = None
+
+    @property
+    def cancel_id(self) -> str:
+        return self.cancel_token.cancel_id
+
+    @property
+    def cancel_dir(self) -> Optional[str]:
+        return self.cancel_token.cancel_dir
+
+    @check_closed
+    def execute(
+        self,
+        operation: str,
+        parameters: Optional[Tuple[Any, ...]] = None,
+    ) -> GraphQLCursor:
+        if self.scope is not None:
+            self.scope.close()
+        scope = self.scope = StatementScope(
+            self.cancel_token,
+            self.statement_timeout,
+            (
+                self.rescan_buffer_size
+                if self.rescan_buffer_size is not None and _may_rescan(operation)
+                else None
+            ),
+            checkpoint=self.checkpoint,
+        )
+        with activate(scope):
+            if not self._execute_explain(
+                operation, parameters
+            ) and not self._execute_direct(operation, parameters):
+                if self.prefetch:
+                    self._prefetch(operation)
+                super().execute(operation, parameters)
+
+        # Rows are fetched lazily, so the scope applies to those calls as well
+        if self._results is not None:
+            self._results = scope.iter_within(self._results)
+        return self
+
+    def close(self) -> None:
+        super().close()
+        if self.scope is not None:
+            self.scope.close()
+
+    def _get_direct_adapter(
+        self, statement: Select, explain: bool = False
+    ) -> Optional[GraphQLAdapter]:
+        prefix = self.schema + "."
+        uri = statement.table
+        if uri.startswith(prefix):
+            uri = uri[len(prefix) :]
+
+        adapter, args, kwargs = find_adapter(uri, self._adapter_kwargs, self._adapters)
+        if not issubclass(adapter, GraphQLAdapter):
+            return None
+
+        # Don't pay for an introspection unless the table opted in
+        table = args[0]
+        if (
+            not explain
+            and statement.is_aggregate
+            and table not in (kwargs.get("aggregate_queries") or {})
+        ):
+            return None
+
+        try:
+            return adapter(*args, **kwargs)
+        except ValueError:
+            # Not a table of the API (e.g. ``sqlite_master``, a temporary table
+            # or a CTE); left to SQLite
+            return None
+
+    def _prefetch(self, operation: str) -> None:
+        """Start scanning the GraphQL tables of a statement, all at once.
+
+        SQLite would otherwise scan them one after another. Statements with a
+        ``LIMIT`` (which may not need whole tables) and tables that may be
+        looked up by id aren't prefetched.
+        """
+        try:
+            references, has_limit = find_tables(operation)
+        except UnsupportedStatement:
+            return
+        if has_limit:
+            return
+
+        # The columns of each table, None for all
+        tables: Dict[str, Optional[Set[str]]] = {}
+        for reference in references:
+            columns = tables.setdefault(reference.table, set())
+            if columns is None or reference.columns is None:
+                tables[reference.table] = None
+            else:
+                columns.update(name.lower() for name in reference.columns)
+        for reference in references:
+            if reference.id_compared:
+                tables.pop(reference.table, None)
+        if len(tables) < 2:
+            # Nothing to overlap
+            return
+
+        prefix = self.schema + "."
+        for uri, names in tables.items():
+            if uri.startswith(prefix):
+                uri = uri[len(prefix) :]
+            adapter, args, kwargs = find_adapter(
+                uri, self._adapter_kwargs, self._adapters
+            )
+            if not issubclass(adapter, GraphQLAdapter):
+                continue
+            try:
+                instance = adapter(*args, **kwargs)
+            except ValueError:
+                # Not a table of the API (e.g. a CTE); left to SQLite
+                continue
+            instance.prefetch(
+                None
+                if names is None
+                else [c for c in instance.get_columns() if c.lower() in names]
+            )
+
+    def get_plan(
+        self,
+        operation: str,
+        parameters: Optional[Tuple[Any, ...]] = None,
+    ) -> QueryPlan:
+        """Describe how ``operation`` would be executed, without requesting data.
+
+        Raises ``UnsupportedStatement`` for statements that aren't a simple
+        ``SELECT`` from a GraphQL table, including tables the API doesn't have
+        (e.g. ``sqlite_master``), which ``EXPLAIN`` leaves to SQLite.
+        """
+        statement = parse_select(operation, parameters)
+        adapter = self._get_direct_adapter(statement, explain=True)
+        if adapter is None:
+            raise UnsupportedStatement(f"Not a GraphQL table: {statement.table}")
+        return adapter.explain(statement, direct=self.direct_execution)
+
+    def _execute_explain(
+        self,
+        operation: str,
+        parameters: Optional[Tuple[Any, ...]],
+    ) -> bool:
+        explained = strip_explain(operation)
+        if explained is None:
+            return False
+
+        try:
+            plan = self.get_plan(explained, parameters)
+        except UnsupportedStatement:
+            # Leave it to SQLite
+            return False
+
+        self.operation = operation
+        self.description = [
+            (name, String, None, None, None, None, True) for name in EXPLAIN_COLUMNS
+        ]
+        self._rowcount = -1
+        self._results = iter(plan.get_rows())
+        return True
+
+    def _execute_direct(
+        self,
+        operation: str,
+        parameters: Optional[Tuple[Any, ...]],
+    ) -> bool:
+        if not self.direct_execution:
+            return False
+
+        try:
+            statement = parse_select(operation, parameters)
+        except UnsupportedStatement:
+            return False
+
+        adapter = self._get_direct_adapter(statement)
+        if adapter is None:
+            return False
+
+        if statement.is_aggregate:
+            result = adapter.get_data_aggregate(statement)
+        else:
+            result = adapter.get_data_direct(statement)
+        if result is None:
+            return False
+
+        columns, rows = result
+        self.operation = operation
+        self.description = [
+            (name, type(field), None, None, None, None, True) for name, field in columns
+        ]
+        self._rowcount = -1
+        self._results = iter(rows)
+        return True
+
+
+class GraphQLConnection(APSWConnection):
+    def __init__(
+        self,
+        path: str,
+        adapters: List[Type[Adapter]],
+        adapter_kwargs: Dict[str, Dict[str, Any]],
+        isolation_level: Optional[str] = None,
+        apsw_connection_kwargs: Optional[Dict[str, Any]] = None,
+        schema: str = DEFAULT_SCHEMA,
+        safe: bool = False,
+        direct_execution: bool = True,
+        statement_timeout: Optional[float] = None,
+        rescan_buffer_size: Optional[int] = RESCAN_BUFFER_SIZE,
+        prefetch: bool = False,
+        cancel_dir: Optional[str] = None,
+    ):
+        super().__init__(
+            path,
+            adapters,
+            adapter_kwargs,
+            isolation_level,
+            apsw_connection_kwargs,
+            schema,
+            safe,
+        )
+
+        self.direct_execution = direct_execution
+        self.statement_timeout = statement_timeout
+        self.rescan_buffer_size = rescan_buffer_size
+        self.prefetch = prefetch
+        self.cancel_dir = cancel_dir
+
+    def cursor(self) -> GraphQLCursor:
+        cursor = GraphQLCursor(
+            self._connection.cursor(),
+            self._adapters,
+            self._adapter_kwargs,
+            self.isolation_level,
+            self.schema,
+            self.direct_execution,
+            self.statement_timeout,
+            self.rescan_buffer_size,
+            self.prefetch,
+            self.cancel_dir,
+        )
+        self.cursors.append(cursor)
+
+        return cursor
+
+
+# -----------------------------------------------------------------------------
+
+
+# Adapted from: shillelagh.backends.apsw.db.connect
+def connect(
+    path: str,
+    adapters: Optional[List[str]] = None,
+    adapter_kwargs: Optional[Dict[str, Dict[str, Any]]] = None,
+    safe: bool = False,
+    isolation_level: Optional[str] = None,
+    apsw_connection_kwargs: Optional[Dict[str, Any]] = None,
+    schema: str = DEFAULT_SCHEMA,
+    direct_execution: bool = True,
+    statement_timeout: Optional[float] = None,
+    rescan_buffer_size: Optional[int] = RESCAN_BUFFER_SIZE,
+    prefetch: bool = False,
+    cancel_dir: Optional[str] = None,
+) -> GraphQLConnection:
+    adapter_kwargs = adapter_kwargs or {}
+    enabled_adapters = registry.load_all(adapters, safe)
+
+    # replace entry point names with class names
+    mapping = {
+        name: adapter.__name__.lower() for name, adapter in enabled_adapters.items()
+    }
+    adapter_kwargs = {mapping[k]: v for k, v in adapter_kwargs.items() if k in mapping}
+
+    return GraphQLConnection(
+        path,
+        list(enabled_adapters.values()),
+        adapter_kwargs,
+        isolation_level,
+        apsw_connection_kwargs,
+        schema,
+        safe,
+        direct_execution,
+        statement_timeout,
+        rescan_buffer_size,
+        prefetch,
+        cancel_dir,
+    )
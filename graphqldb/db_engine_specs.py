@@ -1,6 +1,15 @@
 # Taken from: https://github.com/apache/superset/blob/master/superset/db_engine_specs/gsheets.py  # noqa: E501
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional
+
 from superset.db_engine_specs.sqlite import SqliteEngineSpec
 
+from .cancel import cancel_query
+
+if TYPE_CHECKING:
+    from superset.models.sql_lab import Query
+
 
 class GraphQLEngineSpec(SqliteEngineSpec):
     """Engine for GraphQL API tables"""
@@ -15,3 +24,15 @@ class GraphQLEngineSpec(SqliteEngineSpec):
 
     # TODO(cancan101): figure out what other spec items make sense here
     # See: https://preset.io/blog/building-database-connector/
+
+    has_query_id_before_execute = True
+
+    @classmethod
+    def get_cancel_query_id(cls, cursor: Any, query: Query) -> Optional[str]:
+        return getattr(cursor, "cancel_id", None)
+
+    @classmethod
+    def cancel_query(cls, cursor: Any, query: Query, cancel_query_id: str) -> bool:
+        # The statement stops before its next GraphQL request; a request already
+        # sent runs on, within the statement's deadline
+        return cancel_query(cancel_query_id, getattr(cursor, "cancel_dir", None))
@@ -1,14 +1,44 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
 
+import sqlalchemy.types
 from shillelagh.backends.apsw.dialects.base import APSWDialect
+from sqlalchemy.exc import NoSuchTableError
 
 if TYPE_CHECKING:
-    from sqlalchemy.engine import Connection
+    from sqlalchemy.engine import Connection, Engine
+    from sqlalchemy.engine.interfaces import ExecutionContext
     from sqlalchemy.engine.url import URL
 
-from .lib import extract_query, get_last_query, run_query
+from . import db
+from .adapter import (
+    GraphQLAdapter,
+    QueryArg,
+    TablePlans,
+    get_table_plan,
+    is_table_field,
+    resolve_is_connection,
+)
+from .cancel import get_default_cancel_dir
+from .cost import COST_PARSERS
+from .endpoints import ROUND_ROBIN, STRATEGIES, get_endpoints, get_pool
+from .lib import extract_query, get_last_query
+from .plan import QueryPlan
+from .rescan import RESCAN_BUFFER_SIZE
+from .schema import Schema, get_schema
+from .snapshot import SnapshotConfig
+from .transport import HTTP1, MAX_STREAMS, TRANSPORTS, get_session
 
 # -----------------------------------------------------------------------------
 
@@ -18,17 +48,156 @@ ADAPTER_NAME = "graphql"
 
 
 class APSWGraphQLDialect(APSWDialect):
+    """The dialect of an engine over a GraphQL API.
+
+    An engine may be used from many threads (e.g. a threaded web server). Each
+    connection has its own SQLite database and adapters, while the table plans
+    (columns, selection sets, lookups) are built once and shared by all the
+    connections of the engine. Reflection (table names, columns) is planned
+    from the same schema, introspected once for all the tables.
+    """
+
     supports_statement_cache = True
 
+    @classmethod
+    def dbapi(cls):  # type: ignore[override]
+        return db
+
+    @classmethod
+    def import_dbapi(cls):  # type: ignore[override]
+        return db
+
     def __init__(
         self,
         list_queries: Optional[List[str]] = None,
+        aggregate_queries: Optional[Dict[str, str]] = None,
+        snapshots: Optional[Dict[str, SnapshotConfig]] = None,
+        checkpoint_path: Optional[str] = None,
+        direct_execution: bool = True,
+        statement_timeout: Optional[float] = None,
+        schema_ttl: Optional[float] = None,
+        endpoints: Optional[List[str]] = None,
+        load_balancing: str = ROUND_ROBIN,
+        incremental_delivery: bool = False,
+        transport: str = HTTP1,
+        max_streams: int = MAX_STREAMS,
+        rescan_buffer_size: Optional[int] = RESCAN_BUFFER_SIZE,
+        prefetch: bool = False,
+        dictionary_encoding: bool = False,
+        pacing: bool = True,
+        cost_parsers: Optional[List[str]] = None,
+        cross_process_cancel: bool = False,
+        cancel_dir: Optional[str] = None,
         **kwargs: Any,
     ):
         # We tell Shillelagh that this dialect supports just one adapter
         super().__init__(safe=True, adapters=[ADAPTER_NAME], **kwargs)
 
         self.list_queries = list_queries
+        self.aggregate_queries = aggregate_queries
+        # Tables served from a local copy
+        self.snapshots = snapshots
+        # A SQLite file recording scan progress, to resume interrupted scans
+        self.checkpoint_path = checkpoint_path
+        # Whether simple statements may bypass SQLite
+        self.direct_execution = direct_execution
+        # Default seconds a statement may take; per execution, this can be set
+        # with the ``statement_timeout`` execution option
+        self.statement_timeout = statement_timeout
+        # Seconds an introspected schema is shared by the engines of an API, and
+        # the plans of the tables are kept
+        self.schema_ttl = schema_ttl
+        # The plans of the tables (and the schema), shared by the connections.
+        # Without ``schema_ttl`` they are kept for the life of the engine: the
+        # API is introspected once, and changes to its schema are only seen
+        # after ``table_plans.clear()`` (or by a new engine)
+        self.table_plans = TablePlans(ttl=schema_ttl)
+        # Other endpoints (replicas) of the URL's API, and how requests are
+        # spread over them all
+        if load_balancing not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy: {load_balancing}")
+        self.endpoints = endpoints
+        self.load_balancing = load_balancing
+        # Whether scans ask for rows to be streamed (the server must support
+        # ``@stream`` and ``@defer``)
+        self.incremental_delivery = incremental_delivery
+        # What requests are sent with, which the URL's ``transport`` and
+        # ``max_streams`` override
+        if transport not in TRANSPORTS:
+            raise ValueError(f"Unknown transport: {transport}")
+        self.transport = transport
+        self.max_streams = max_streams
+        # Bytes of rows kept in memory per statement to replay tables scanned
+        # again (e.g. the inner side of a join); None to always scan remotely
+        self.rescan_buffer_size = rescan_buffer_size
+        # Whether the tables of a statement (e.g. of a join) are scanned
+        # concurrently rather than one after another
+        self.prefetch = prefetch
+        # Whether scans share the repeated values of string columns, for less
+        # memory in large buffered scans
+        self.dictionary_encoding = dictionary_encoding
+        # Whether requests are paced by the query cost the API reports (as
+        # read by the named ``COST_PARSERS``, by default all)
+        unknown = [p for p in cost_parsers or [] if p not in COST_PARSERS]
+        if unknown:
+            raise ValueError(f"Unknown cost parsers: {unknown}")
+        self.pacing = pacing
+        self.cost_parsers = cost_parsers
+        # Where running statements are registered, so other processes (on the
+        # same host) can cancel them; by default they can't
+        self.cancel_dir = (
+            (cancel_dir or get_default_cancel_dir()) if cross_process_cancel else None
+        )
+
+    def _set_execution_options(
+        self, cursor: Any, context: Optional[ExecutionContext]
+    ) -> None:
+        if context is None:
+            return
+        # Only defined by the default implementation of the interface
+        options: Mapping[str, Any] = getattr(context, "execution_options", {})
+        timeout = options.get("statement_timeout")
+        if timeout is not None:
+            cursor.statement_timeout = timeout
+        cursor.checkpoint = bool(options.get("checkpoint"))
+
+    def do_execute(
+        self,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Optional[ExecutionContext] = None,
+    ) -> None:
+        self._set_execution_options(cursor, context)
+        cursor.execute(statement, parameters)
+
+    def do_execute_no_params(
+        self,
+        cursor: Any,
+        statement: str,
+        context: Optional[ExecutionContext] = None,
+    ) -> None:
+        self._set_execution_options(cursor, context)
+        cursor.execute(statement)
+
+    def _get_schema(self, connection: Connection) -> Schema:
+        """The schema of the engine's API, shared with its table plans."""
+        url = connection.engine.url
+        graphql_api = self.db_url_to_graphql_api(url)
+        pool = (
+            get_pool(get_endpoints(graphql_api, self.endpoints), self.load_balancing)
+            if self.endpoints
+            else None
+        )
+        return self.table_plans.get_schema(
+            lambda: get_schema(
+                graphql_api,
+                self.db_url_to_graphql_bearer(url),
+                ttl=self.schema_ttl,
+                pool=pool,
+                session=get_session(*self.db_url_to_transport(url)),
+            )
+        )
 
     def get_table_names(
         self,
@@ -37,24 +206,60 @@ class APSWGraphQLDialect(APSWDialect):
         sqlite_include_internal: bool = False,
         **kwargs: Any,
     ) -> List[str]:
-        url = connection.engine.url
-        graphql_api = self.db_url_to_graphql_api(url)
+        """The query fields returning a connection or a list."""
+        graphql_schema = self._get_schema(connection)
+        return [
+            name
+            for name, field in graphql_schema.query_fields.items()
+            if is_table_field(field, schema=graphql_schema)
+        ]
 
-        query = """{
-  __schema {
-    queryType {
-      fields {
-        name
-      }
-    }
-  }
-}"""
-        bearer_token = self.db_url_to_graphql_bearer(url)
-        data = run_query(graphql_api, query=query, bearer_token=bearer_token)
+    def has_table(  # type: ignore[override]
+        self,
+        connection: Connection,
+        table_name: str,
+        schema: Optional[str] = None,
+        **kwargs: Any,
+    ) -> bool:
+        table, *_ = GraphQLAdapter.parse_uri(table_name)
+        return table in self._get_schema(connection).query_fields
+
+    def get_columns(  # type: ignore[override]
+        self,
+        connection: Connection,
+        table_name: str,
+        schema: Optional[str] = None,
+        **kwargs: Any,
+    ) -> List[Dict[str, Any]]:
+        """The columns of a table, planned from the engine's shared schema."""
+        table, include, query_args, is_connection = GraphQLAdapter.parse_uri(table_name)
+        graphql_schema = self._get_schema(connection)
+        if table not in graphql_schema.query_fields:
+            raise NoSuchTableError(table_name)
 
-        # TODO(cancan101): filter out "non-Array" returns
-        # This is tricky as Connections are non-Array
-        return [field["name"] for field in data["__schema"]["queryType"]["fields"]]
+        pagination_relay = self.db_url_to_pagination_relay(connection.engine.url)
+        table_plan = get_table_plan(
+            table,
+            include,
+            query_args,
+            is_connection=resolve_is_connection(
+                table, is_connection, self.list_queries
+            ),
+            pagination_relay=True if pagination_relay is None else pagination_relay,
+            fetch_schema=lambda: graphql_schema,
+            plans=self.table_plans,
+        )
+        return [
+            {
+                "name": column_name,
+                "type": getattr(sqlalchemy.types, field.type)(),
+                "nullable": True,
+                "default": None,
+                "autoincrement": "auto",
+                "primary_key": 0,
+            }
+            for column_name, field in table_plan.columns.items()
+        ]
 
     def db_url_to_graphql_api(self, url: URL) -> str:
         query = extract_query(url)
@@ -67,6 +272,41 @@ class APSWGraphQLDialect(APSWDialect):
     def db_url_to_graphql_bearer(self, url: URL) -> Optional[str]:
         return str(url.password) if url.password else None
 
+    def db_url_to_pagination_relay(self, url: URL) -> Optional[bool]:
+        pagination_relay_param = extract_query(url).get("is_relay")
+        if pagination_relay_param is None:
+            return None
+        return get_last_query(pagination_relay_param) != "0"
+
+    def db_url_to_transport(self, url: URL) -> Tuple[str, int]:
+        query = extract_query(url)
+        transport = self.transport
+        if "transport" in query:
+            transport = get_last_query(query["transport"])
+        max_streams = self.max_streams
+        if "max_streams" in query:
+            max_streams = int(get_last_query(query["max_streams"]))
+        return transport, max_streams
+
+    def create_adapter(
+        self, url: URL, table: str, **query_args: QueryArg
+    ) -> GraphQLAdapter:
+        """Build the adapter for a table (named as in SQL) outside of SQLite.
+
+        Any ``query_args`` are added to those given in the table name.
+        """
+        _, kwargs = self.create_connect_args(url)
+        table_name, include, table_query_args, is_connection = GraphQLAdapter.parse_uri(
+            table
+        )
+        return GraphQLAdapter(
+            table_name,
+            include,
+            {**table_query_args, **query_args},
+            is_connection,
+            **kwargs["adapter_kwargs"][ADAPTER_NAME],
+        )
+
     def create_connect_args(
         self,
         url: URL,
@@ -81,22 +321,69 @@ class APSWGraphQLDialect(APSWDialect):
         graphql_api = self.db_url_to_graphql_api(url)
         bearer_token = self.db_url_to_graphql_bearer(url)
 
-        query = extract_query(url)
-        pagination_relay_param = query.get("is_relay")
-        pagination_relay = (
-            get_last_query(pagination_relay_param) != "0"
-            if pagination_relay_param is not None
-            else None
-        )
+        pagination_relay = self.db_url_to_pagination_relay(url)
 
+        transport, max_streams = self.db_url_to_transport(url)
         adapter_kwargs = {
             ADAPTER_NAME: {
                 "graphql_api": graphql_api,
                 "bearer_token": bearer_token,
                 "pagination_relay": pagination_relay,
                 "list_queries": self.list_queries,
+                "aggregate_queries": self.aggregate_queries,
+                "snapshots": self.snapshots,
+                "checkpoint_path": self.checkpoint_path,
+                "schema_ttl": self.schema_ttl,
+                "table_plans": self.table_plans.id,
+                "endpoints": self.endpoints,
+                "load_balancing": self.load_balancing,
+                "incremental_delivery": self.incremental_delivery,
+                "dictionary_encoding": self.dictionary_encoding,
+                "pacing": self.pacing,
+                "cost_parsers": self.cost_parsers,
+                "transport": transport,
+                "max_streams": max_streams,
             }
         }
 
         # this seems gross, esp the path override. unclear why memory has to be set here
-        return args, {**kwargs, "path": ":memory:", "adapter_kwargs": adapter_kwargs}
+        return args, {
+            **kwargs,
+            "path": ":memory:",
+            "adapter_kwargs": adapter_kwargs,
+            "direct_execution": self.direct_execution,
+            "statement_timeout": self.statement_timeout,
+            "rescan_buffer_size": self.rescan_buffer_size,
+            "prefetch": self.prefetch,
+            "cancel_dir": self.cancel_dir,
+        }
+
+
+# -----------------------------------------------------------------------------
+
+
+def get_adapter(engine: Engine, table: str, **query_args: QueryArg) -> GraphQLAdapter:
+    dialect = engine.dialect
+    if not isinstance(dialect, APSWGraphQLDialect):
+        raise ValueError(f"Not a GraphQL engine: {engine.url}")
+    return dialect.create_adapter(engine.url, table, **query_args)
+
+
+def refresh_snapshot(engine: Engine, table: str, *, full: bool = False) -> None:
+    """Refresh the local copy of a table configured in ``snapshots``."""
+    get_adapter(engine, table).refresh_snapshot(full=full)
+
+
+def explain(
+    engine: Engine, sql: str, parameters: Optional[Sequence[Any]] = None
+) -> QueryPlan:
+    """Describe how a statement would be executed, without requesting any data.
+
+    The same is available in SQL as ``EXPLAIN <statement>``.
+    """
+    connection = engine.raw_connection()
+    try:
+        cursor = cast(db.GraphQLCursor, connection.cursor())
+        return cursor.get_plan(sql, None if parameters is None else tuple(parameters))
+    finally:
+        connection.close()
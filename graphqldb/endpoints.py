@@ -0,0 +1,239 @@
+"""Spreading the requests for an API over several endpoints (replicas).
+
+Endpoints that keep failing are ejected for a while, then admitted again on
+trial. Every request made is a query (never a mutation), so a request that
+fails on one endpoint is safely retried on the next.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+import requests
+
+from . import events
+from .cost import CostBudget
+from .lib import run_query, run_query_incremental
+
+T = TypeVar("T")
+
+# -----------------------------------------------------------------------------
+
+# Load balancing strategies
+ROUND_ROBIN = "round_robin"
+LEAST_OUTSTANDING = "least_outstanding"
+STRATEGIES = (ROUND_ROBIN, LEAST_OUTSTANDING)
+
+# Consecutive failures after which an endpoint is ejected
+MAX_FAILURES = 3
+
+# Seconds an ejected endpoint is left out before it is tried again
+EJECTION_TIME = 30.0
+
+# -----------------------------------------------------------------------------
+
+
+def is_endpoint_failure(ex: BaseException) -> bool:
+    """Whether a request failed because of the endpoint (not the query)."""
+    if isinstance(ex, requests.HTTPError):
+        return ex.response is not None and ex.response.status_code >= 500
+    return isinstance(ex, (requests.ConnectionError, requests.Timeout))
+
+
+class Endpoint:
+    __slots__ = ("url", "outstanding", "failures", "ejected_until")
+
+    def __init__(self, url: str):
+        self.url = url
+        # Requests in flight
+        self.outstanding = 0
+        # Consecutive failures
+        self.failures = 0
+        self.ejected_until: Optional[float] = None
+
+    def is_admitted(self, now: float) -> bool:
+        return self.ejected_until is None or now >= self.ejected_until
+
+
+class EndpointPool:
+    """The endpoints of one API, and their health.
+
+    Safe to use from many threads.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        strategy: str = ROUND_ROBIN,
+        max_failures: int = MAX_FAILURES,
+        ejection_time: float = EJECTION_TIME,
+    ):
+        if not urls:
+            raise ValueError("No endpoints given")
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown load balancing strategy: {strategy}")
+
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, tried: Set[str]) -> Endpoint:
+        """Pick the endpoint for a request, skipping the ``tried`` ones."""
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.endpoints)
+            rotated = self.endpoints[start:] + self.endpoints[:start]
+            candidates = [e for e in rotated if e.url not in tried]
+            if not candidates:
+                raise ValueError("Every endpoint has been tried")
+
+            now = time.monotonic()
+            admitted = [e for e in candidates if e.is_admitted(now)]
+            if not admitted:
+                # Rather than failing outright, try the one back the soonest
+                endpoint = min(candidates, key=lambda e: e.ejected_until or now)
+            elif self.strategy == LEAST_OUTSTANDING:
+                # Ties go round-robin
+                endpoint = min(admitted, key=lambda e: e.outstanding)
+            else:
+                endpoint = admitted[0]
+
+            endpoint.outstanding += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, ok: Optional[bool]) -> None:
+        """Record the outcome of a request, if it tells whether ``ok``."""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                endpoint.failures = 0
+                endpoint.ejected_until = None
+                return
+
+            endpoint.failures += 1
+            # An endpoint on trial is ejected again by one failure
+            if endpoint.failures >= self.max_failures:
+                endpoint.ejected_until = time.monotonic() + self.ejection_time
+
+    def _call(self, call: Callable[[str], T]) -> Tuple[Endpoint, T]:
+        """Call ``call`` with the URL of an endpoint, failing over to the others.
+
+        The endpoint it succeeded with is returned still acquired.
+        """
+        tried: Set[str] = set()
+        while True:
+            endpoint = self.acquire(tried)
+            tried.add(endpoint.url)
+            try:
+                return endpoint, call(endpoint.url)
+            except BaseException as ex:
+                # e.g. GraphQL errors or a cancelled statement say nothing of
+                # the endpoint's health
+                failure = is_endpoint_failure(ex)
+                self.release(endpoint, False if failure else None)
+                if not failure or len(tried) == len(self.endpoints):
+                    raise
+                events.emit(events.RETRY, error=ex)
+
+    def run_query(
+        self,
+        *,
+        query: str,
+        bearer_token: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        budget: Optional[CostBudget] = None,
+        cost_key: Optional[Hashable] = None,
+    ) -> Dict[str, Any]:
+        """Run ``query`` on an endpoint, failing over to the others."""
+        endpoint, data = self._call(
+            lambda url: run_query(
+                url,
+                query=query,
+                bearer_token=bearer_token,
+                session=session,
+                budget=budget,
+                cost_key=cost_key,
+            )
+        )
+        self.release(endpoint, ok=True)
+        return data
+
+    def run_query_incremental(
+        self,
+        *,
+        query: str,
+        bearer_token: Optional[str] = None,
+        session: Optional[requests.Session] = None,
+        budget: Optional[CostBudget] = None,
+        cost_key: Optional[Hashable] = None,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """As ``run_query_incremental``, failing over until the first payload."""
+
+        def start(url: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+            payloads = run_query_incremental(
+                url,
+                query=query,
+                bearer_token=bearer_token,
+                session=session,
+                budget=budget,
+                cost_key=cost_key,
+            )
+            return next(payloads, {}), payloads
+
+        endpoint, (first, payloads) = self._call(start)
+        ok: Optional[bool] = None
+        try:
+            yield first
+            yield from payloads
+            ok = True
+        except BaseException as ex:
+            ok = False if is_endpoint_failure(ex) else None
+            raise
+        finally:
+            self.release(endpoint, ok)
+
+
+# -----------------------------------------------------------------------------
+
+_pools: Dict[Tuple[Tuple[str, ...], str], EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(urls: Sequence[str], strategy: str = ROUND_ROBIN) -> EndpointPool:
+    """The pool of ``urls``, shared so that their health is tracked once."""
+    key = (tuple(urls), strategy)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = EndpointPool(urls, strategy)
+        return pool
+
+
+def clear_pools() -> None:
+    """Forget the pools, and so the health of their endpoints."""
+    with _pools_lock:
+        _pools.clear()
+
+
+def get_endpoints(graphql_api: str, endpoints: Optional[List[str]]) -> List[str]:
+    """The URL's own API followed by the other endpoints, without repeats."""
+    return list(dict.fromkeys([graphql_api, *(endpoints or [])]))
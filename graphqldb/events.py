@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional
+
+# -----------------------------------------------------------------------------
+
+# Event names
+INTROSPECTION = "introspection"
+PAGE = "page"
+LOOKUP = "lookup"
+AGGREGATE = "aggregate"
+# Flattening a page of nodes into rows
+ROWS = "rows"
+# A request made outside of any of the above
+REQUEST = "request"
+RETRY = "retry"
+# Data served from a local copy rather than the server
+CACHE_HIT = "cache_hit"
+
+# -----------------------------------------------------------------------------
+
+
+class QueryEvent:
+    """Timings and sizes of one step of a query.
+
+    ``duration`` covers the whole step; for steps that make a request,
+    ``request_duration`` is the HTTP round trip and ``decode_duration`` the time
+    spent parsing the JSON response.
+    """
+
+    __slots__ = (
+        "name",
+        "table",
+        "start_time_ns",
+        "duration",
+        "request_duration",
+        "decode_duration",
+        "request_bytes",
+        "response_bytes",
+        "rows",
+        "cursor",
+        "error",
+    )
+
+    def __init__(self, name: str, table: Optional[str] = None):
+        self.name = name
+        self.table = table
+        # Wall clock, e.g. for tracing
+        self.start_time_ns = time.time_ns()
+        self.duration = 0.0
+        self.request_duration = 0.0
+        self.decode_duration = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rows: Optional[int] = None
+        self.cursor: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}"
+            for name in self.__slots__
+            if name != "start_time_ns"
+        )
+        return f"QueryEvent({fields})"
+
+
+Listener = Callable[[QueryEvent], None]
+
+_listeners: List[Listener] = []
+
+_current_event: ContextVar[Optional[QueryEvent]] = ContextVar(
+    "graphqldb_current_event", default=None
+)
+
+
+def add_listener(listener: Listener) -> None:
+    """Call ``listener`` with each ``QueryEvent`` once it completes."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Listener) -> None:
+    _listeners.remove(listener)
+
+
+def has_listeners() -> bool:
+    return bool(_listeners)
+
+
+def get_current_event() -> Optional[QueryEvent]:
+    return _current_event.get()
+
+
+def _emit(event: QueryEvent) -> None:
+    for listener in list(_listeners):
+        listener(event)
+
+
+def emit(name: str, table: Optional[str] = None, **values: Any) -> None:
+    """Emit an instantaneous event (e.g. a cache hit)."""
+    if not _listeners:
+        return
+    event = QueryEvent(name, table)
+    for key, value in values.items():
+        setattr(event, key, value)
+    _emit(event)
+
+
+@contextmanager
+def span(name: str, table: Optional[str] = None) -> Iterator[Optional[QueryEvent]]:
+    """Time a step, emitting its event on exit.
+
+    Yields None (and records nothing) when there are no listeners. Requests
+    made within the step add their timings and sizes to its event.
+    """
+    if not _listeners:
+        yield None
+        return
+
+    event = QueryEvent(name, table)
+    reset_token = _current_event.set(event)
+    start = time.perf_counter()
+    try:
+        yield event
+    except BaseException as ex:
+        event.error = ex
+        raise
+    finally:
+        event.duration = time.perf_counter() - start
+        _current_event.reset(reset_token)
+        _emit(event)
+
+
+@contextmanager
+def request_span() -> Iterator[Optional[QueryEvent]]:
+    """The event a request should be recorded on.
+
+    This is the enclosing step's event, or a new ``request`` event if there is
+    none.
+    """
+    event = _current_event.get()
+    if event is not None:
+        yield event
+        return
+
+    with span(REQUEST) as event:
+        yield event
+
+
+# -----------------------------------------------------------------------------
+
+
+def enable_opentelemetry(tracer_provider: Any = None) -> Listener:
+    """Record each event as an OpenTelemetry span.
+
+    Spans are parented to the span current when the event completes. Returns
+    the listener, so it can be removed again.
+    """
+    from opentelemetry import trace
+
+    tracer = trace.get_tracer("graphqldb", tracer_provider=tracer_provider)
+
+    def listener(event: QueryEvent) -> None:
+        otel_span = tracer.start_span(
+            f"graphql.{event.name}", start_time=event.start_time_ns
+        )
+        attributes = {
+            "graphql.table": event.table,
+            "graphql.request_duration": event.request_duration,
+            "graphql.decode_duration": event.decode_duration,
+            "graphql.request_bytes": event.request_bytes,
+            "graphql.response_bytes": event.response_bytes,
+            "graphql.rows": event.rows,
+            "graphql.cursor": event.cursor,
+        }
+        otel_span.set_attributes({k: v for k, v in attributes.items() if v is not None})
+        if event.error is not None:
+            otel_span.record_exception(event.error)
+            otel_span.set_status(trace.Status(trace.StatusCode.ERROR))
+        otel_span.end(end_time=event.start_time_ns + int(event.duration * 1e9))
+
+    add_listener(listener)
+    return listener
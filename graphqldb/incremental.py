@@ -0,0 +1,123 @@
+"""Incremental delivery (``@defer`` / ``@stream``) of a query's result.
+
+The server answers with a ``multipart/mixed`` response, a JSON payload per
+part: the initial result, then increments adding the streamed items of a list
+or the deferred fields of an object at a path. Both the current format
+(increments under ``incremental``) and the earlier one (a single increment per
+payload, with its ``path`` at the top level) are understood.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+# -----------------------------------------------------------------------------
+
+# What a client accepting incremental delivery asks for
+ACCEPT = "multipart/mixed; deferSpec=20220824, application/json"
+
+# The boundary when the content type doesn't give one
+DEFAULT_BOUNDARY = "-"
+
+# -----------------------------------------------------------------------------
+
+
+def get_boundary(content_type: str) -> Optional[str]:
+    """The boundary of a ``multipart/mixed`` content type, else None."""
+    media_type, *params = content_type.split(";")
+    if media_type.strip().lower() != "multipart/mixed":
+        return None
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "boundary":
+            return value.strip().strip('"')
+    return DEFAULT_BOUNDARY
+
+
+def _get_body(part: bytes) -> bytes:
+    # The headers of a part end with an empty line
+    _, separator, body = part.partition(b"\r\n\r\n")
+    return (body if separator else part).strip()
+
+
+def iter_parts(chunks: Iterable[bytes], boundary: str) -> Iterator[bytes]:
+    """Yield the body of each part of a multipart response as it is complete."""
+    delimiter = f"--{boundary}".encode()
+    buffer = b""
+    started = False
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if not started:
+                # Skip the preamble
+                index = buffer.find(delimiter)
+                if index < 0:
+                    break
+                buffer = buffer[index + len(delimiter) :]
+                started = True
+            if len(buffer) < 2:
+                break
+            if buffer.startswith(b"--"):
+                # The close delimiter
+                return
+
+            index = buffer.find(b"\r\n" + delimiter)
+            if index < 0:
+                break
+            body = _get_body(buffer[:index])
+            buffer = buffer[index + 2 + len(delimiter) :]
+            if body:
+                yield body
+
+
+# -----------------------------------------------------------------------------
+
+Path = Sequence[Union[str, int]]
+
+
+def _merge(target: Dict[str, Any], data: Dict[str, Any]) -> None:
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = value
+
+
+class IncrementalResult:
+    """The result of a query, assembled from its payloads."""
+
+    def __init__(self) -> None:
+        self.data: Dict[str, Any] = {}
+        self.has_next = True
+
+    def get(self, path: Path) -> Any:
+        value: Any = self.data
+        for key in path:
+            value = value[key]
+        return value
+
+    def apply(self, payload: Dict[str, Any]) -> None:
+        if payload.get("errors"):
+            raise ValueError(payload["errors"])
+
+        increments: List[Dict[str, Any]]
+        if "path" in payload:
+            increments = [payload]
+        else:
+            if "data" in payload:
+                self.data = payload["data"] or {}
+            increments = payload.get("incremental") or []
+
+        for increment in increments:
+            if increment.get("errors"):
+                raise ValueError(increment["errors"])
+            path = increment["path"]
+            if "items" in increment:
+                # The path is that of the first item
+                items = self.get(path[:-1])
+                start = path[-1]
+                items[start : start + len(increment["items"])] = increment["items"]
+            elif increment.get("data") is not None:
+                _merge(self.get(path), increment["data"])
+
+        # A plain (not incremental) result is complete
+        self.has_next = bool(payload.get("hasNext", False))
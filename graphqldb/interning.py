@@ -0,0 +1,50 @@
+"""Dictionary encoding of the repeated values of a scan.
+
+Every value decoded from a response is a new object, so a low-cardinality
+column (a status, a type, the name of an included relation) holds the same
+string over and over in the rows kept by buffers, caches and columnar batches.
+An encoder, used for one scan, makes equal strings of a column the same object.
+Columns with more distinct values than the cap stop growing their dictionary
+and keep the rest of their values as they are.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List
+
+# -----------------------------------------------------------------------------
+
+# Distinct values interned per column, by default
+MAX_DISTINCT_VALUES = 10_000
+
+# -----------------------------------------------------------------------------
+
+
+class DictionaryEncoder:
+    """Interns the values of the given (string) columns of a scan."""
+
+    def __init__(self, columns: Iterable[str], max_distinct: int = MAX_DISTINCT_VALUES):
+        self.max_distinct = max_distinct
+        self.dictionaries: Dict[str, Dict[str, str]] = {c: {} for c in columns}
+
+    def encode_value(self, column: str, value: Any) -> Any:
+        dictionary = self.dictionaries.get(column)
+        if dictionary is None or not isinstance(value, str):
+            return value
+        interned = dictionary.get(value)
+        if interned is not None:
+            return interned
+        if len(dictionary) < self.max_distinct:
+            dictionary[value] = value
+        return value
+
+    def encode(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Intern the values of a (newly built) row, in place."""
+        for column in self.dictionaries:
+            if column in row:
+                row[column] = self.encode_value(column, row[column])
+        return row
+
+    def encode_column(self, column: str, values: List[Any]) -> List[Any]:
+        if column not in self.dictionaries:
+            return values
+        return [self.encode_value(column, value) for value in values]
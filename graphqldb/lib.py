@@ -1,10 +1,28 @@
 from __future__ import annotations
 
+import json
+import time
 import urllib.parse
-from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    Hashable,
+    Iterator,
+    Optional,
+    Sequence,
+    Union,
+)
 
 import requests
 
+from . import events
+from .cancel import QueryCancelled, get_current_scope
+from .cost import MAX_THROTTLED_RETRIES, CostBudget, is_throttled, wait_for
+from .events import request_span
+from .incremental import ACCEPT, get_boundary, iter_parts
+
 if TYPE_CHECKING:
     from sqlalchemy.engine.url import URL
 
@@ -36,31 +54,145 @@ def get_last_query(entry: Union[str, Sequence[str]]) -> str:
 # -----------------------------------------------------------------------------
 
 
+def _raise_for_status(resp: requests.Response) -> None:
+    try:
+        resp.raise_for_status()
+    except requests.HTTPError as ex:
+        # For now let's assume 400 will have errors
+        # https://github.com/graphql/graphql-over-http/blob/main/spec/GraphQLOverHTTP.md#status-codes
+        if ex.response.status_code != 400:
+            raise
+
+
 def run_query(
     graphql_api: str,
     *,
     query: str,
     bearer_token: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    budget: Optional[CostBudget] = None,
+    cost_key: Optional[Hashable] = None,
 ) -> Dict[str, Any]:
+    """Run a query, sending it with ``session`` if given (see ``transport``).
+
+    With a ``budget`` (see ``cost``), the query waits until the API's budget
+    affords it (by the last cost of a ``cost_key`` query), and is retried if
+    throttled nonetheless.
+    """
     headers: Dict[str, Any] = {}
     if bearer_token:
         headers["Authorization"] = f"Bearer {bearer_token}"
 
-    # TODO(cancan101): figure out timeouts
-    resp = requests.post(  # noqa: S113
-        graphql_api, json={"query": query}, headers=headers
-    )
-    try:
-        resp.raise_for_status()
-    except requests.HTTPError as ex:
-        # For now let's assume 400 will have errors
-        # https://github.com/graphql/graphql-over-http/blob/main/spec/GraphQLOverHTTP.md#status-codes
-        if ex.response.status_code != 400:
-            raise
-
-    resp_data = resp.json()
+    # Requests made while executing a statement stop once it is cancelled and
+    # may not run past its deadline
+    scope = get_current_scope()
+
+    for attempt in range(MAX_THROTTLED_RETRIES + 1):
+        if budget is not None:
+            budget.pace(cost_key)
+        timeout = None if scope is None else scope.get_timeout()
+        retry = budget is not None and attempt < MAX_THROTTLED_RETRIES
+
+        with request_span() as event:
+            start = time.perf_counter()
+            try:
+                resp = (session or requests).post(  # noqa: S113
+                    graphql_api,
+                    json={"query": query},
+                    headers=headers,
+                    timeout=timeout,
+                )
+            except requests.Timeout as ex:
+                if scope is not None and scope.deadline is not None:
+                    raise QueryCancelled("Query exceeded its deadline") from ex
+                raise  # pragma: no cover
+            if event is not None:
+                event.request_duration += time.perf_counter() - start
+                event.request_bytes += len(resp.request.body or b"")
+                event.response_bytes += len(resp.content)
+
+            resp_data: Dict[str, Any] = {}
+            if not (retry and resp.status_code == 429):
+                _raise_for_status(resp)
+
+                start = time.perf_counter()
+                resp_data = resp.json()
+                if event is not None:
+                    event.decode_duration += time.perf_counter() - start
+
+        if budget is not None:
+            budget.update(resp_data.get("extensions"), resp.headers, cost_key)
+            if retry and is_throttled(resp.status_code, resp_data.get("errors")):
+                events.emit(events.RETRY)
+                wait_for(budget.get_retry_wait(resp.headers, attempt))
+                continue
+        break
 
     if "errors" in resp_data:
         raise ValueError(resp_data["errors"])
 
     return resp_data["data"]
+
+
+def run_query_incremental(
+    graphql_api: str,
+    *,
+    query: str,
+    bearer_token: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    budget: Optional[CostBudget] = None,
+    cost_key: Optional[Hashable] = None,
+) -> Generator[Dict[str, Any], None, None]:
+    """Run a query using ``@defer`` / ``@stream``, yielding each payload.
+
+    Payloads are yielded as they arrive; a server answering with plain JSON
+    gives a single payload. Closing the iterator closes the response. The
+    query is paced by ``budget`` as with ``run_query``, but not retried.
+    """
+    headers: Dict[str, Any] = {"Accept": ACCEPT}
+    if bearer_token:
+        headers["Authorization"] = f"Bearer {bearer_token}"
+
+    scope = get_current_scope()
+    if budget is not None:
+        budget.pace(cost_key)
+    timeout = None if scope is None else scope.get_timeout()
+
+    with request_span() as event:
+        start = time.perf_counter()
+        try:
+            resp = (session or requests).post(  # noqa: S113
+                graphql_api,
+                json={"query": query},
+                headers=headers,
+                timeout=timeout,
+                stream=True,
+            )
+        except requests.Timeout as ex:
+            if scope is not None and scope.deadline is not None:
+                raise QueryCancelled("Query exceeded its deadline") from ex
+            raise  # pragma: no cover
+        if event is not None:
+            # Until the response headers; the parts arrive as they are consumed
+            event.request_duration += time.perf_counter() - start
+            event.request_bytes += len(resp.request.body or b"")
+
+    with resp:
+        _raise_for_status(resp)
+
+        boundary = get_boundary(resp.headers.get("Content-Type", ""))
+        if boundary is None:
+            payloads: Iterator[Dict[str, Any]] = iter([resp.json()])
+        else:
+            chunks: Iterator[bytes] = resp.iter_content(chunk_size=None)
+            if scope is not None:
+                # The timeout bounds each read, so a response trickling in is
+                # stopped between its chunks once the statement is cancelled
+                # or past its deadline
+                chunks = scope.iter_checked(chunks)
+            payloads = (json.loads(part) for part in iter_parts(chunks, boundary))
+
+        for payload in payloads:
+            if budget is not None and ("extensions" in payload or not boundary):
+                budget.update(payload.get("extensions"), resp.headers, cost_key)
+            yield payload
@@ -0,0 +1,91 @@
+"""Fast parsing of the values of date/time columns.
+
+shillelagh's ``ISODateTime`` goes through ``dateutil`` for every value. Here
+values are parsed with the C ``fromisoformat`` (falling back to the field's own
+parser for anything it rejects) and memoized, as event tables tend to repeat
+dates and timestamps.
+"""
+from __future__ import annotations
+
+import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from shillelagh.fields import Field, ISODate, ISODateTime, ISOTime
+
+# -----------------------------------------------------------------------------
+
+# Distinct values remembered per temporal type
+CACHE_SIZE = 4096
+
+# -----------------------------------------------------------------------------
+
+_iso_datetime = ISODateTime()
+_iso_date = ISODate()
+_iso_time = ISOTime()
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_datetime(value: str) -> Optional[datetime.datetime]:
+    # ``Z`` is only accepted from Python 3.11
+    iso_value = value[:-1] + "+00:00" if value.endswith("Z") else value
+    try:
+        timestamp = datetime.datetime.fromisoformat(iso_value)
+    except ValueError:
+        # e.g. week dates, or fractions of other than 3 or 6 digits
+        return _iso_datetime.parse(value)
+
+    # As with ISODateTime, timestamps with an offset are normalized to UTC
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(datetime.timezone.utc)
+    return timestamp
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_date(value: str) -> Optional[datetime.date]:
+    return _iso_date.parse(value)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse_time(value: str) -> Optional[datetime.time]:
+    return _iso_time.parse(value)
+
+
+def _memoized(
+    parse: Callable[[str], Any], field: Field
+) -> Callable[[Optional[Any]], Any]:
+    def parse_value(value: Optional[Any]) -> Any:
+        if isinstance(value, str):
+            return parse(value)
+        return field.parse(value)
+
+    return parse_value
+
+
+# By exact type, as subclasses may parse differently
+_FAST_PARSERS: Dict[Type[Field], Callable[[Optional[Any]], Any]] = {
+    ISODateTime: _memoized(_parse_datetime, _iso_datetime),
+    ISODate: _memoized(_parse_date, _iso_date),
+    ISOTime: _memoized(_parse_time, _iso_time),
+}
+
+# -----------------------------------------------------------------------------
+
+
+def get_parser(field: Field) -> Callable[[Optional[Any]], Any]:
+    """The function parsing values of ``field``; fast for date/time fields."""
+    return _FAST_PARSERS.get(type(field), field.parse)
+
+
+def parse_column(field: Field, values: Iterable[Any]) -> List[Any]:
+    """Parse a page of values of one column.
+
+    Values repeated within the page are parsed once.
+    """
+    parse = get_parser(field)
+    if type(field) not in _FAST_PARSERS:
+        return [parse(value) for value in values]
+
+    values = list(values)
+    parsed = {value: parse(value) for value in set(values)}
+    return [parsed[value] for value in values]
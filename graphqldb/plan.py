@@ -0,0 +1,82 @@
+"""Dry-run descriptions of how a statement would be executed."""
+from __future__ import annotations
+
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from .sql import Predicate
+
+# -----------------------------------------------------------------------------
+
+# Strategies
+CONNECTION = "connection"
+LIST = "list"
+LOOKUP = "lookup"
+AGGREGATE = "aggregate"
+SNAPSHOT = "snapshot"
+
+# The columns of the result of ``EXPLAIN <statement>``
+EXPLAIN_COLUMNS = ["key", "value"]
+
+# -----------------------------------------------------------------------------
+
+
+class QueryPlan(NamedTuple):
+    # The GraphQL query field
+    table: str
+    # One of the strategies above
+    strategy: str
+    # The columns selected from the server
+    columns: List[str]
+    # The documents that would be sent; for a paginated scan, the first page's
+    documents: List[str]
+    # Constraints answered by the server (or the local copy) ...
+    pushed_down: List[str]
+    # ... and those evaluated locally, while streaming the rows
+    local: List[str]
+    # The ``first`` sent with each page, if any
+    page_size: Optional[int] = None
+    # None when this depends on the size of the table
+    estimated_requests: Optional[int] = None
+    # An upper bound, None when unknown
+    estimated_rows: Optional[int] = None
+    # Every row of the table is fetched
+    full_scan: bool = False
+    # Executed directly, rather than through the SQLite virtual table
+    direct: bool = True
+
+    def get_rows(self) -> List[Tuple[str, Optional[str]]]:
+        """The plan as (key, value) rows, as returned by ``EXPLAIN``."""
+        rows: List[Tuple[str, Any]] = [
+            ("table", self.table),
+            ("strategy", self.strategy),
+            ("direct", self.direct),
+            ("columns", ", ".join(self.columns)),
+        ]
+        rows.extend(("document", document) for document in self.documents)
+        rows.extend(("pushed_down", constraint) for constraint in self.pushed_down)
+        rows.extend(("local", constraint) for constraint in self.local)
+        rows.extend(
+            [
+                ("page_size", self.page_size),
+                ("estimated_requests", self.estimated_requests),
+                ("estimated_rows", self.estimated_rows),
+                ("full_scan", self.full_scan),
+            ]
+        )
+        return [(key, None if value is None else str(value)) for key, value in rows]
+
+
+def describe_predicate(predicate: Predicate) -> str:
+    if predicate.operator in ("IS NULL", "IS NOT NULL"):
+        return f"{predicate.column} {predicate.operator}"
+    if predicate.operator == "IN":
+        values = ", ".join(repr(v) for v in predicate.value)
+        return f"{predicate.column} IN ({values})"
+    return f"{predicate.column} {predicate.operator} {predicate.value!r}"
+
+
+def describe_order_by(keys: Sequence[Tuple[str, bool]]) -> str:
+    keys_str = ", ".join(
+        f"{key}{' DESC' if descending else ''}" for key, descending in keys
+    )
+    return f"ORDER BY {keys_str}"
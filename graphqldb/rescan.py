@@ -0,0 +1,267 @@
+"""Statement-scoped buffers replaying repeated scans of a table.
+
+SQLite scans the inner table of a join (and the table of a correlated
+subquery) once per outer row. The first complete scan of a table (by its
+columns and pushed-down constraints) is kept for the rest of the statement and
+later scans are replayed from it. Rows are kept in memory up to a byte budget,
+shared by the buffers of the statement; beyond that, a table that is scanned
+again is spilled to a temporary file.
+
+The tables of a statement can also be prefetched: their scans start at once,
+each in a thread, and the rows wait for the first scan SQLite makes of the table
+(with the same or fewer columns).
+"""
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections import deque
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Generator,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from . import events
+
+# -----------------------------------------------------------------------------
+
+# Bytes of rows kept in memory per statement, by default
+RESCAN_BUFFER_SIZE = 64 * 1024 * 1024
+
+# -----------------------------------------------------------------------------
+
+
+def _get_size(row: Dict[str, Any]) -> int:
+    # Rough, but cheap: the values are JSON scalars (or small lists)
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values())
+
+
+class ScanBuffer:
+    """The rows of one scan, in memory and then (if allowed) in a file."""
+
+    def __init__(self, buffers: ScanBuffers, spill: bool):
+        self.buffers = buffers
+        self.spill = spill
+        self.rows: List[Dict[str, Any]] = []
+        self.size = 0
+        self.path: Optional[str] = None
+        self._file: Any = None
+
+    def append(self, row: Dict[str, Any]) -> bool:
+        """Keep a row, False if it doesn't fit (and the buffer was released)."""
+        if self._file is not None:
+            self._file.write(json.dumps(row) + "\n")
+            return True
+
+        size = _get_size(row)
+        if self.buffers.reserve(size):
+            self.rows.append(row)
+            self.size += size
+            return True
+        if not self.spill:
+            self.close()
+            return False
+
+        fd, self.path = tempfile.mkstemp(prefix="graphqldb-rescan-", suffix=".jsonl")
+        self._file = os.fdopen(fd, "w")
+        for kept in self.rows:
+            self._file.write(json.dumps(kept) + "\n")
+        self._file.write(json.dumps(row) + "\n")
+        self._release_memory()
+        return True
+
+    def finish(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        if self.path is None:
+            yield from self.rows
+            return
+        with open(self.path) as file:
+            for line in file:
+                yield json.loads(line)
+
+    def _release_memory(self) -> None:
+        self.buffers.release(self.size)
+        self.rows = []
+        self.size = 0
+
+    def close(self) -> None:
+        self._release_memory()
+        self.finish()
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+class Prefetch:
+    """A scan running in a thread, its rows kept until they are read."""
+
+    def __init__(
+        self, columns: FrozenSet[str], get_rows: Callable[[], Iterator[Dict[str, Any]]]
+    ):
+        self.columns = columns
+        self.get_rows = get_rows
+        self.rows: Deque[Dict[str, Any]] = deque()
+        self.done = False
+        self.stopped = False
+        self.error: Optional[Exception] = None
+        self.condition = threading.Condition()
+
+        # Run under the statement's scope (deadline, cancellation)
+        context = contextvars.copy_context()
+        self.thread = threading.Thread(
+            target=context.run, args=(self._run,), daemon=True
+        )
+        self.thread.start()
+
+    def _run(self) -> None:
+        rows = self.get_rows()
+        try:
+            for row in rows:
+                with self.condition:
+                    if self.stopped:
+                        break
+                    self.rows.append(row)
+                    self.condition.notify_all()
+        except Exception as ex:
+            self.error = ex
+        finally:
+            close = getattr(rows, "close", None)
+            if close is not None:
+                close()
+            with self.condition:
+                self.done = True
+                self.condition.notify_all()
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """The rows, as they arrive; only one reader is expected."""
+        while True:
+            with self.condition:
+                while not self.rows and not self.done:
+                    self.condition.wait()
+                if not self.rows:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                row = self.rows.popleft()
+            yield row
+
+    def stop(self) -> None:
+        with self.condition:
+            self.stopped = True
+            self.rows.clear()
+
+
+class ScanBuffers:
+    """The scan buffers of a statement."""
+
+    def __init__(self, max_memory: int = RESCAN_BUFFER_SIZE):
+        self.max_memory = max_memory
+        self.memory = 0
+        self.buffers: Dict[Hashable, ScanBuffer] = {}
+        # Scans seen, which are spilled if scanned again
+        self.seen: Set[Hashable] = set()
+        self.prefetches: Dict[Hashable, List[Prefetch]] = {}
+
+    def reserve(self, size: int) -> bool:
+        if self.memory + size > self.max_memory:
+            return False
+        self.memory += size
+        return True
+
+    def release(self, size: int) -> None:
+        self.memory -= size
+
+    def prefetch(
+        self,
+        key: Hashable,
+        columns: FrozenSet[str],
+        get_rows: Callable[[], Iterator[Dict[str, Any]]],
+    ) -> None:
+        """Start a scan, to be read by the first scan of ``key`` it covers."""
+        self.prefetches.setdefault(key, []).append(Prefetch(columns, get_rows))
+
+    def _claim(self, key: Hashable, columns: FrozenSet[str]) -> Optional[Prefetch]:
+        prefetches = self.prefetches.get(key, [])
+        for prefetch in prefetches:
+            if columns <= prefetch.columns:
+                prefetches.remove(prefetch)
+                return prefetch
+        return None
+
+    def scan(
+        self,
+        key: Hashable,
+        columns: FrozenSet[str],
+        get_rows: Callable[[], Iterator[Dict[str, Any]]],
+        table: Optional[str] = None,
+    ) -> Generator[Dict[str, Any], None, None]:
+        """The rows of a scan, replayed if it was already done in full.
+
+        ``key`` identifies the scan but for its ``columns``. Scans stopped
+        early (e.g. by a LIMIT) aren't kept.
+        """
+        scan_key: Tuple[Hashable, FrozenSet[str]] = (key, columns)
+        done = self.buffers.get(scan_key)
+        if done is not None:
+            events.emit(events.CACHE_HIT, table)
+            yield from done.replay()
+            return
+
+        prefetch = self._claim(key, columns)
+        if prefetch is not None:
+            events.emit(events.CACHE_HIT, table)
+            get_rows = prefetch.read
+
+        # Only a table scanned more than once is worth a file
+        buffer: Optional[ScanBuffer] = ScanBuffer(self, spill=scan_key in self.seen)
+        self.seen.add(scan_key)
+        try:
+            for row in get_rows():
+                if buffer is not None and not buffer.append(row):
+                    buffer = None
+                yield row
+        except BaseException:
+            if buffer is not None:
+                buffer.close()
+            if prefetch is not None:
+                prefetch.stop()
+            raise
+
+        if buffer is not None:
+            buffer.finish()
+            if scan_key in self.buffers:
+                # Completed by a nested scan meanwhile
+                buffer.close()
+            else:
+                self.buffers[scan_key] = buffer
+
+    def close(self) -> None:
+        for prefetches in self.prefetches.values():
+            for prefetch in prefetches:
+                prefetch.stop()
+        self.prefetches.clear()
+        for buffer in self.buffers.values():
+            buffer.close()
+        self.buffers.clear()
+        self.seen.clear()
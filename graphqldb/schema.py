@@ -0,0 +1,280 @@
+"""A parsed GraphQL schema, indexed by name.
+
+The introspection result is parsed once into immutable records (type
+references are shared between the fields that use them), so it can be shared by
+every adapter and engine talking to the same API.
+"""
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
+import requests
+
+from . import events
+from .endpoints import EndpointPool
+from .lib import run_query
+
+# -----------------------------------------------------------------------------
+
+# The raw introspection result
+
+
+class MaybeNamed(TypedDict):
+    name: Optional[str]
+
+
+class TypeInfo(MaybeNamed):
+    ofType: Optional[Union[TypeInfo, MaybeNamed]]
+    # technically an enum:
+    kind: str
+
+
+class FieldInfo(TypedDict):
+    name: str
+    type: TypeInfo
+
+
+class QueryFieldInfo(FieldInfo):
+    args: List[FieldInfo]
+
+
+class TypeInfoWithFields(TypeInfo):
+    fields: Optional[List[FieldInfo]]
+    interfaces: Optional[List[MaybeNamed]]
+
+
+# -----------------------------------------------------------------------------
+
+# Both Relay connections (``type { name }``) and lists (``NON_NULL`` of
+# ``LIST`` of ``NON_NULL`` of the item) are resolved from the same result
+INTROSPECTION_QUERY = """{
+  __schema {
+    queryType {
+      fields {
+        name
+        type {
+          name
+          kind
+          ofType {
+            name
+            kind
+            ofType {
+              kind
+              name
+              ofType {
+                name
+                kind
+              }
+            }
+          }
+        }
+        args {
+          name
+          type {
+            kind
+          }
+        }
+      }
+    }
+    types {
+      name
+      kind
+      fields {
+        name
+        type {
+          name
+          kind
+          ofType {
+            name
+            kind
+            ofType {
+              name
+              kind
+              ofType {
+                name
+                kind
+              }
+            }
+          }
+        }
+      }
+      interfaces {
+        name
+      }
+    }
+  }
+}"""
+
+# -----------------------------------------------------------------------------
+
+
+class TypeRef(NamedTuple):
+    """A reference to a type, possibly wrapped in ``NON_NULL`` / ``LIST``."""
+
+    kind: str
+    name: Optional[str] = None
+    of_type: Optional[TypeRef] = None
+
+    @property
+    def named_type(self) -> Optional[str]:
+        """The name of the type, looking through wrappers."""
+        ref: Optional[TypeRef] = self
+        while ref is not None and ref.name is None:
+            ref = ref.of_type
+        return None if ref is None else ref.name
+
+
+class FieldDef(NamedTuple):
+    name: str
+    type: TypeRef
+    # Argument name -> type (only its kind is introspected)
+    args: Mapping[str, TypeRef]
+
+
+class TypeDef(NamedTuple):
+    name: str
+    kind: str
+    # By name, in schema order; None for scalars, enums, etc.
+    fields: Optional[Mapping[str, FieldDef]]
+    interfaces: FrozenSet[str]
+
+
+class Schema(NamedTuple):
+    # The fields of the query type, i.e. the tables
+    query_fields: Mapping[str, FieldDef]
+    types: Mapping[str, TypeDef]
+
+    @classmethod
+    def from_introspection(cls, data: Dict[str, Any]) -> Schema:
+        """Parse the result (``data``) of ``INTROSPECTION_QUERY``."""
+        parser = _SchemaParser()
+        schema = data["__schema"]
+        return cls(
+            parser.parse_fields(schema["queryType"]["fields"]),
+            {
+                t["name"]: parser.parse_type(t)
+                for t in schema["types"]
+                if t["name"] is not None
+            },
+        )
+
+    def get_fields(self, type_name: str) -> Optional[Mapping[str, FieldDef]]:
+        type_def = self.types.get(type_name)
+        return None if type_def is None else type_def.fields
+
+
+class _SchemaParser:
+    def __init__(self) -> None:
+        # Equal type references (e.g. to ``String``) are parsed into one object
+        self.refs: Dict[Tuple[Any, ...], TypeRef] = {}
+
+    def parse_ref(self, info: Mapping[str, Any]) -> TypeRef:
+        name = info.get("name")
+        of_type = info.get("ofType")
+        ref = TypeRef(
+            sys.intern(info["kind"]),
+            None if name is None else sys.intern(name),
+            None if of_type is None else self.parse_ref(of_type),
+        )
+        return self.refs.setdefault(ref, ref)
+
+    def parse_fields(self, fields: Optional[List[Any]]) -> Dict[str, FieldDef]:
+        ret = {}
+        for field in fields or []:
+            name = sys.intern(field["name"])
+            ret[name] = FieldDef(
+                name,
+                self.parse_ref(field["type"]),
+                {
+                    sys.intern(arg["name"]): self.parse_ref(arg["type"])
+                    for arg in field.get("args") or []
+                },
+            )
+        return ret
+
+    def parse_type(self, info: TypeInfoWithFields) -> TypeDef:
+        fields = info.get("fields")
+        return TypeDef(
+            sys.intern(info["name"] or ""),
+            sys.intern(info["kind"]),
+            None if fields is None else self.parse_fields(fields),
+            frozenset(
+                x["name"] for x in info.get("interfaces") or [] if x["name"] is not None
+            ),
+        )
+
+
+# -----------------------------------------------------------------------------
+
+_schemas: Dict[Tuple[str, Optional[str]], Tuple[float, Schema]] = {}
+_schemas_lock = threading.Lock()
+
+
+def fetch_schema(
+    graphql_api: str,
+    bearer_token: Optional[str] = None,
+    table: Optional[str] = None,
+    pool: Optional[EndpointPool] = None,
+    session: Optional[requests.Session] = None,
+) -> Schema:
+    """Introspect the schema of an API, through its ``pool`` of endpoints if any."""
+    with events.span(events.INTROSPECTION, table):
+        if pool is not None:
+            data = pool.run_query(
+                query=INTROSPECTION_QUERY, bearer_token=bearer_token, session=session
+            )
+        else:
+            data = run_query(
+                graphql_api,
+                query=INTROSPECTION_QUERY,
+                bearer_token=bearer_token,
+                session=session,
+            )
+    return Schema.from_introspection(data)
+
+
+def get_schema(
+    graphql_api: str,
+    bearer_token: Optional[str] = None,
+    ttl: Optional[float] = None,
+    table: Optional[str] = None,
+    pool: Optional[EndpointPool] = None,
+    session: Optional[requests.Session] = None,
+) -> Schema:
+    """The schema of an API, shared (by API and token) for ``ttl`` seconds.
+
+    Without a ``ttl`` the API is introspected on every call. ``table`` is only
+    used to label the introspection event.
+    """
+    key = (graphql_api, bearer_token)
+    if ttl is not None:
+        with _schemas_lock:
+            cached = _schemas.get(key)
+        if cached is not None and time.monotonic() - cached[0] < ttl:
+            return cached[1]
+
+    schema = fetch_schema(graphql_api, bearer_token, table, pool, session)
+    if ttl is not None:
+        with _schemas_lock:
+            _schemas[key] = (time.monotonic(), schema)
+    return schema
+
+
+def clear_schemas() -> None:
+    """Forget the shared schemas, so they are introspected again."""
+    with _schemas_lock:
+        _schemas.clear()
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TypedDict
+
+# -----------------------------------------------------------------------------
+
+
+class _SnapshotConfigRequired(TypedDict):
+    # The local SQLite file holding the copy
+    path: str
+
+
+class SnapshotConfig(_SnapshotConfigRequired, total=False):
+    # Seconds before the copy is refreshed on read; None means only explicitly
+    ttl: Optional[float]
+    # Incremental refresh: a filter argument (e.g. ``updatedAt_gt``) passed the
+    # largest value of ``updated_column`` seen so far
+    updated_arg: str
+    updated_column: str
+    # Incremental refresh for append-only connections: resume from the stored
+    # ``endCursor``
+    resume_cursor: bool
+
+
+# -----------------------------------------------------------------------------
+
+DATA_TABLE = "data"
+META_TABLE = "meta"
+
+# -----------------------------------------------------------------------------
+
+
+def _quote(name: str) -> str:
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _to_sqlite(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+class SnapshotWriter:
+    """Writes rows into a snapshot within a single transaction."""
+
+    def __init__(
+        self, connection: sqlite3.Connection, columns: Sequence[str], upsert: bool
+    ):
+        self.connection = connection
+        self.columns = columns
+        verb = "INSERT OR REPLACE" if upsert else "INSERT"
+        self.statement = (
+            f"{verb} INTO {DATA_TABLE} ({', '.join(map(_quote, columns))}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+
+        # The pagination cursor to resume from on the next refresh
+        self.cursor: Optional[str] = None
+
+    def insert(self, rows: Iterable[Dict[str, Any]]) -> None:
+        self.connection.executemany(
+            self.statement,
+            (tuple(_to_sqlite(row.get(c)) for c in self.columns) for row in rows),
+        )
+
+
+class Snapshot:
+    """A local copy of a GraphQL table, kept in a SQLite file.
+
+    Rows are stored flattened (one SQLite column per adapter column), next to a
+    small metadata table with the time of the last refresh, the column names and
+    the pagination cursor. A copy made with different columns is treated as
+    empty.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str], key: Optional[str] = None):
+        self.path = path
+        self.columns = list(columns)
+        # The column rows are upserted on, if any
+        self.key = key
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Transactions are managed explicitly, so DDL is covered as well
+        with closing(sqlite3.connect(self.path, isolation_level=None)) as connection:
+            yield connection
+
+    def _get_meta(self, connection: sqlite3.Connection) -> Dict[str, Any]:
+        query = f"SELECT key, value FROM {META_TABLE}"  # noqa: S608
+        try:
+            rows = connection.execute(query)
+        except sqlite3.OperationalError:
+            # Not created yet
+            return {}
+        return {key: json.loads(value) for key, value in rows}
+
+    def get_meta(self) -> Dict[str, Any]:
+        with self._connect() as connection:
+            meta = self._get_meta(connection)
+        if meta.get("columns") != self.columns:
+            return {}
+        return meta
+
+    def is_populated(self) -> bool:
+        return "refreshed_at" in self.get_meta()
+
+    def is_stale(self, ttl: Optional[float]) -> bool:
+        refreshed_at = self.get_meta().get("refreshed_at")
+        if refreshed_at is None:
+            return True
+        return ttl is not None and time.time() - refreshed_at >= ttl
+
+    def get_max(self, column: str) -> Any:
+        with self._connect() as connection:
+            return connection.execute(
+                f"SELECT MAX({_quote(column)}) FROM {DATA_TABLE}"  # noqa: S608
+            ).fetchone()[0]
+
+    @contextmanager
+    def write(self, replace: bool) -> Iterator[SnapshotWriter]:
+        """Write rows (replacing the current copy or upserting into it).
+
+        Nothing is visible to readers until the block exits successfully.
+        """
+        with self._connect() as connection, connection:
+            connection.execute("BEGIN IMMEDIATE")
+            previous = {} if replace else self._get_meta(connection)
+            if replace:
+                connection.execute(f"DROP TABLE IF EXISTS {DATA_TABLE}")
+                columns_str = ", ".join(
+                    _quote(c) + (" PRIMARY KEY" if c == self.key else "")
+                    for c in self.columns
+                )
+                connection.execute(f"CREATE TABLE {DATA_TABLE} ({columns_str})")
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {META_TABLE} "
+                    "(key TEXT PRIMARY KEY, value TEXT)"
+                )
+
+            writer = SnapshotWriter(connection, self.columns, self.key is not None)
+            writer.cursor = previous.get("cursor")
+            yield writer
+
+            meta = {
+                "columns": self.columns,
+                "refreshed_at": time.time(),
+                "cursor": writer.cursor,
+            }
+            connection.executemany(
+                f"INSERT OR REPLACE INTO {META_TABLE} VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in meta.items()],
+            )
+
+    def get_data(
+        self,
+        columns: Sequence[str],
+        ids: Optional[Sequence[Any]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        columns_str = ", ".join(map(_quote, columns))
+        sql = f"SELECT {columns_str} FROM {DATA_TABLE}"  # noqa: S608
+        parameters: List[Any] = []
+        if ids is not None:
+            if self.key is None:
+                raise ValueError("Snapshot has no key column")
+            sql += f" WHERE {_quote(self.key)} IN ({', '.join('?' for _ in ids)})"
+            parameters.extend(ids)
+        if limit is not None:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        with self._connect() as connection:
+            for row in connection.execute(sql, parameters):
+                yield dict(zip(columns, row))
@@ -0,0 +1,582 @@
+"""A deliberately small parser for simple single-table SELECT statements.
+
+This is used to answer some statements directly with GraphQL requests rather
+than going through the SQLite virtual table. Anything outside of the grammar
+below raises ``UnsupportedStatement`` so the caller can fall back to SQLite:
+
+    SELECT item [, item]* FROM table [[AS] alias]
+    [WHERE predicate [AND predicate]*]
+    [GROUP BY column [, column]*]
+    [ORDER BY key [ASC|DESC] [, key [ASC|DESC]]*]
+    [LIMIT n [OFFSET m]]
+
+where an item is ``*``, a column or ``FUNC([DISTINCT] column | *)``, optionally
+aliased, and a predicate compares a column with a literal or bound parameter.
+"""
+from __future__ import annotations
+
+import re
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+# -----------------------------------------------------------------------------
+
+AGGREGATE_FUNCTIONS = frozenset(["COUNT", "SUM", "AVG", "MIN", "MAX"])
+
+COMPARISON_OPERATORS = frozenset(["=", "!=", "<", "<=", ">", ">="])
+
+# Keywords that end an expression list / cannot be used as a bare alias
+RESERVED_WORDS = frozenset(
+    [
+        "AND",
+        "AS",
+        "ASC",
+        "BY",
+        "DESC",
+        "DISTINCT",
+        "FROM",
+        "GROUP",
+        "HAVING",
+        "IN",
+        "IS",
+        "JOIN",
+        "LIMIT",
+        "NOT",
+        "NULL",
+        "OFFSET",
+        "OR",
+        "ORDER",
+        "SELECT",
+        "UNION",
+        "WHERE",
+    ]
+)
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<space>\s+|--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")*"|`(?:[^`]|``)*`|\[[^\]]*\])
+    |(?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+(?:[eE][-+]?\d+)?)
+    |(?P<param>\?)
+    |(?P<op><=|>=|<>|!=|==|[=<>,()*.;-])
+    |(?P<word>[A-Za-z_][A-Za-z_0-9$]*)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+# -----------------------------------------------------------------------------
+
+
+class UnsupportedStatement(ValueError):
+    """The statement is outside of what can be executed directly."""
+
+
+class Token(NamedTuple):
+    kind: str
+    value: str
+
+
+class Aggregate(NamedTuple):
+    # One of AGGREGATE_FUNCTIONS
+    function: str
+    # None for COUNT(*)
+    column: Optional[str]
+    distinct: bool = False
+
+
+class SelectItem(NamedTuple):
+    # None for ``*``
+    expression: Union[str, Aggregate, None]
+    alias: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        """The name of the column in the result set."""
+        if self.alias is not None:
+            return self.alias
+        if isinstance(self.expression, Aggregate):
+            expression = self.expression
+            inner = expression.column if expression.column is not None else "*"
+            distinct = "DISTINCT " if expression.distinct else ""
+            return f"{expression.function.lower()}({distinct}{inner})"
+        if self.expression is None:
+            return "*"
+        return self.expression
+
+
+class Predicate(NamedTuple):
+    column: str
+    # One of COMPARISON_OPERATORS, "IN", "IS NULL" or "IS NOT NULL"
+    operator: str
+    value: Any = None
+
+
+class OrderBy(NamedTuple):
+    # A column, an alias or an aggregate
+    key: Union[str, Aggregate]
+    descending: bool = False
+
+
+class TableReference(NamedTuple):
+    table: str
+    # The column names used with the table (and unqualified), None for ``*``
+    columns: Optional[FrozenSet[str]]
+    # Whether its ``id`` is compared with ``=`` or ``IN``, i.e. it may be
+    # looked up by id rather than scanned
+    id_compared: bool
+
+
+class Select(NamedTuple):
+    items: List[SelectItem]
+    table: str
+    where: List[Predicate]
+    group_by: List[str]
+    order_by: List[OrderBy]
+    limit: Optional[int] = None
+    offset: Optional[int] = None
+
+    @property
+    def is_aggregate(self) -> bool:
+        return bool(self.group_by) or any(
+            isinstance(item.expression, Aggregate) for item in self.items
+        )
+
+
+# -----------------------------------------------------------------------------
+
+
+def tokenize(sql: str) -> Iterator[Token]:
+    pos = 0
+    while pos < len(sql):
+        match = _TOKEN_RE.match(sql, pos)
+        if match is None:
+            raise UnsupportedStatement(f"Unable to tokenize at: {sql[pos:pos + 20]}")
+        pos = match.end()
+        kind = match.lastgroup
+        if kind is None or kind == "space":
+            continue
+        yield Token(kind, match.group())
+
+
+def _unquote(token: Token) -> str:
+    value = token.value
+    if token.kind == "string":
+        return value[1:-1].replace("''", "'")
+    if token.kind == "quoted":
+        if value[0] == "[":
+            return value[1:-1]
+        return value[1:-1].replace(value[0] * 2, value[0])
+    return value
+
+
+class _Parser:
+    def __init__(self, sql: str, parameters: Optional[Sequence[Any]]):
+        self.tokens = list(tokenize(sql))
+        self.pos = 0
+        self.parameters = list(parameters or [])
+        self.parameter_index = 0
+
+    # Token helpers -----------------------------------------------------------
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        pos = self.pos + offset
+        return self.tokens[pos] if pos < len(self.tokens) else None
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise UnsupportedStatement("Unexpected end of statement")
+        self.pos += 1
+        return token
+
+    def is_keyword(self, *keywords: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return (
+            token is not None
+            and token.kind == "word"
+            and token.value.upper() in keywords
+        )
+
+    def accept_keyword(self, *keywords: str) -> bool:
+        if self.is_keyword(*keywords):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_keyword(self, keyword: str) -> None:
+        if not self.accept_keyword(keyword):
+            raise UnsupportedStatement(f"Expected {keyword}")
+
+    def accept_op(self, *ops: str) -> Optional[str]:
+        token = self.peek()
+        if token is not None and token.kind == "op" and token.value in ops:
+            self.pos += 1
+            return token.value
+        return None
+
+    def expect_op(self, op: str) -> None:
+        if self.accept_op(op) is None:
+            raise UnsupportedStatement(f"Expected {op}")
+
+    # Grammar -----------------------------------------------------------------
+
+    def identifier(self) -> str:
+        token = self.next()
+        if token.kind == "quoted" or (
+            token.kind == "word" and token.value.upper() not in RESERVED_WORDS
+        ):
+            return _unquote(token)
+        raise UnsupportedStatement(f"Expected identifier, got {token.value}")
+
+    def column(self) -> str:
+        name = self.identifier()
+        # Drop any table qualifier; there is only the one table
+        if self.accept_op("."):
+            name = self.identifier()
+        return name
+
+    def expression(self) -> Union[str, Aggregate]:
+        token = self.peek()
+        next_token = self.peek(1)
+        if (
+            token is not None
+            and token.kind == "word"
+            and next_token is not None
+            and next_token.value == "("
+        ):
+            function = token.value.upper()
+            if function not in AGGREGATE_FUNCTIONS:
+                raise UnsupportedStatement(f"Unsupported function: {function}")
+            self.pos += 2
+            if function == "COUNT" and self.accept_op("*"):
+                aggregate = Aggregate(function, None)
+            else:
+                distinct = self.accept_keyword("DISTINCT")
+                aggregate = Aggregate(function, self.column(), distinct)
+            self.expect_op(")")
+            return aggregate
+        return self.column()
+
+    def alias(self) -> Optional[str]:
+        if self.accept_keyword("AS"):
+            return self.identifier()
+        token = self.peek()
+        if token is not None and (
+            token.kind == "quoted"
+            or (token.kind == "word" and token.value.upper() not in RESERVED_WORDS)
+        ):
+            return self.identifier()
+        return None
+
+    def select_item(self) -> SelectItem:
+        if self.accept_op("*"):
+            return SelectItem(None)
+        expression = self.expression()
+        return SelectItem(expression, self.alias())
+
+    def table(self) -> str:
+        token = self.next()
+        # SQLite accepts single quoted table names, which shillelagh relies on
+        if token.kind in ("string", "quoted") or (
+            token.kind == "word" and token.value.upper() not in RESERVED_WORDS
+        ):
+            return _unquote(token)
+        raise UnsupportedStatement(f"Expected table, got {token.value}")
+
+    def value(self) -> Any:
+        token = self.next()
+        if token.kind == "param":
+            if self.parameter_index >= len(self.parameters):
+                raise UnsupportedStatement("Not enough parameters")
+            value = self.parameters[self.parameter_index]
+            self.parameter_index += 1
+            return value
+        if token.kind == "string":
+            return _unquote(token)
+        if token.kind == "number":
+            return _parse_number(token.value)
+        if token.kind == "op" and token.value == "-":
+            number = self.next()
+            if number.kind != "number":
+                raise UnsupportedStatement("Expected number")
+            return -_parse_number(number.value)
+        if token.kind == "word" and token.value.upper() in ("TRUE", "FALSE"):
+            return token.value.upper() == "TRUE"
+        raise UnsupportedStatement(f"Unsupported value: {token.value}")
+
+    def predicate(self) -> List[Predicate]:
+        column = self.column()
+        if self.accept_keyword("IS"):
+            negated = self.accept_keyword("NOT")
+            self.expect_keyword("NULL")
+            return [Predicate(column, "IS NOT NULL" if negated else "IS NULL")]
+        if self.accept_keyword("IN"):
+            self.expect_op("(")
+            values = [self.value()]
+            while self.accept_op(","):
+                values.append(self.value())
+            self.expect_op(")")
+            return [Predicate(column, "IN", values)]
+        if self.accept_keyword("BETWEEN"):
+            low = self.value()
+            self.expect_keyword("AND")
+            high = self.value()
+            return [Predicate(column, ">=", low), Predicate(column, "<=", high)]
+
+        op = self.accept_op("=", "==", "!=", "<>", "<", "<=", ">", ">=")
+        if op is None:
+            raise UnsupportedStatement("Unsupported predicate")
+        op = {"==": "=", "<>": "!="}.get(op, op)
+        return [Predicate(column, op, self.value())]
+
+    def where(self) -> List[Predicate]:
+        predicates = self.predicate()
+        while self.accept_keyword("AND"):
+            predicates.extend(self.predicate())
+        return predicates
+
+    def order_by_item(self) -> OrderBy:
+        token = self.peek()
+        if token is not None and token.kind == "number":
+            raise UnsupportedStatement("Positional ORDER BY is not supported")
+        key = self.expression()
+        descending = False
+        if self.accept_keyword("DESC"):
+            descending = True
+        else:
+            self.accept_keyword("ASC")
+        return OrderBy(key, descending)
+
+    def integer(self) -> int:
+        value = self.value()
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise UnsupportedStatement("Expected an integer")
+        return value
+
+    def select(self) -> Select:
+        self.expect_keyword("SELECT")
+        if self.is_keyword("DISTINCT", "ALL"):
+            raise UnsupportedStatement("SELECT DISTINCT is not supported")
+
+        items = [self.select_item()]
+        while self.accept_op(","):
+            items.append(self.select_item())
+
+        self.expect_keyword("FROM")
+        table = self.table()
+        table_alias = self.alias()
+        if table_alias is not None:
+            raise UnsupportedStatement("Table aliases are not supported")
+
+        where: List[Predicate] = []
+        if self.accept_keyword("WHERE"):
+            where = self.where()
+
+        group_by: List[str] = []
+        if self.accept_keyword("GROUP"):
+            self.expect_keyword("BY")
+            group_by.append(self.column())
+            while self.accept_op(","):
+                group_by.append(self.column())
+
+        order_by: List[OrderBy] = []
+        if self.accept_keyword("ORDER"):
+            self.expect_keyword("BY")
+            order_by.append(self.order_by_item())
+            while self.accept_op(","):
+                order_by.append(self.order_by_item())
+
+        limit = offset = None
+        if self.accept_keyword("LIMIT"):
+            limit = self.integer()
+            if self.accept_keyword("OFFSET"):
+                offset = self.integer()
+            elif self.accept_op(","):
+                offset, limit = limit, self.integer()
+            # As in SQLite, a negative LIMIT is no limit, and a negative OFFSET
+            # skips nothing
+            if limit < 0:
+                limit = None
+            if offset is not None and offset < 0:
+                offset = None
+
+        self.accept_op(";")
+        if self.peek() is not None:
+            raise UnsupportedStatement(f"Unsupported clause: {self.next().value}")
+        if self.parameter_index != len(self.parameters):
+            raise UnsupportedStatement("Too many parameters")
+
+        return Select(items, table, where, group_by, order_by, limit, offset)
+
+
+def _parse_number(value: str) -> Union[int, float]:
+    if re.fullmatch(r"\d+", value):
+        return int(value)
+    return float(value)
+
+
+def parse_select(sql: str, parameters: Optional[Sequence[Any]] = None) -> Select:
+    """Parse a simple single-table ``SELECT``.
+
+    Bound (qmark) parameters are substituted into the predicates.
+    Raises ``UnsupportedStatement`` for anything else.
+    """
+    return _Parser(sql, parameters).select()
+
+
+# ``EXPLAIN <statement>``; ``EXPLAIN QUERY PLAN`` is left to SQLite
+_EXPLAIN_RE = re.compile(
+    r"\s*EXPLAIN\s+(?!QUERY\s+PLAN\b)(.*)", re.IGNORECASE | re.DOTALL
+)
+
+
+def strip_explain(sql: str) -> Optional[str]:
+    """The statement being explained, or None if ``sql`` is not an ``EXPLAIN``."""
+    match = _EXPLAIN_RE.fullmatch(sql)
+    return None if match is None else match.group(1)
+
+
+# -----------------------------------------------------------------------------
+
+# Words that can't be the alias of a table in a FROM clause
+_JOIN_WORDS = frozenset(
+    ["CROSS", "FULL", "INNER", "LEFT", "NATURAL", "ON", "OUTER", "RIGHT", "USING"]
+)
+
+_NAME_KINDS = ("word", "quoted")
+
+_EQUALITY_OPERATORS = ("=", "==")
+
+
+def _is_word(token: Optional[Token], *words: str) -> bool:
+    return token is not None and token.kind == "word" and token.value.upper() in words
+
+
+def find_tables(sql: str) -> Tuple[List[TableReference], bool]:
+    """The tables read by any statement, and whether it has a ``LIMIT``.
+
+    Tables (in FROM clauses, including those of subqueries) are found from the
+    tokens alone, as are the columns used with them, which may include columns
+    of other tables. Raises ``UnsupportedStatement`` if it can't be tokenized.
+    """
+    tokens = list(tokenize(sql))
+
+    def get(pos: int) -> Optional[Token]:
+        return tokens[pos] if 0 <= pos < len(tokens) else None
+
+    def is_name(pos: int) -> bool:
+        token = get(pos)
+        return (
+            token is not None
+            and token.kind in _NAME_KINDS
+            and not (
+                token.kind == "word"
+                and token.value.upper() in RESERVED_WORDS | _JOIN_WORDS
+            )
+        )
+
+    # (table, name it is referred to by)
+    tables: List[Tuple[str, str]] = []
+    for pos, token in enumerate(tokens):
+        if not _is_word(token, "FROM", "JOIN"):
+            continue
+        in_from = _is_word(token, "FROM")
+        pos += 1
+        while is_name(pos):
+            table = _unquote(tokens[pos])
+            pos += 1
+            # A schema-qualified table
+            if get(pos) == Token("op", ".") and is_name(pos + 1):
+                table = _unquote(tokens[pos + 1])
+                pos += 2
+            name = table
+            if _is_word(get(pos), "AS") and is_name(pos + 1):
+                name = _unquote(tokens[pos + 1])
+                pos += 2
+            elif is_name(pos):
+                name = _unquote(tokens[pos])
+                pos += 1
+            tables.append((table, name))
+            if not (in_from and get(pos) == Token("op", ",")):
+                break
+            pos += 1
+
+    # Columns qualified by a table's name, or by none
+    qualified: Dict[Optional[str], Set[str]] = {None: set()}
+    all_columns: Set[Optional[str]] = set()
+    id_compared: Set[Optional[str]] = set()
+    for pos, token in enumerate(tokens):
+        if token.kind == "op" and token.value == "*":
+            previous = get(pos - 1)
+            if previous is not None and previous.value == ".":
+                all_columns.add(_unquote(tokens[pos - 2]))
+            elif previous is not None and (
+                _is_word(previous, "SELECT", "DISTINCT") or previous.value == ","
+            ):
+                all_columns.add(None)
+        if not is_name(pos) or get(pos + 1) == Token("op", "."):
+            continue
+
+        start = pos
+        qualifier = None
+        if get(pos - 1) == Token("op", ".") and is_name(pos - 2):
+            start = pos - 2
+            qualifier = _unquote(tokens[pos - 2])
+        column = _unquote(token)
+        qualified.setdefault(qualifier, set()).add(column)
+
+        following = get(pos + 1)
+        preceding = get(start - 1)
+        if column.lower() == "id" and (
+            (following is not None and following.value in _EQUALITY_OPERATORS)
+            or _is_word(following, "IN")
+            or (preceding is not None and preceding.value in _EQUALITY_OPERATORS)
+        ):
+            id_compared.add(qualifier)
+
+    references = []
+    for table, name in tables:
+        references.append(
+            TableReference(
+                table,
+                (
+                    None
+                    if name in all_columns or None in all_columns
+                    else frozenset(qualified[None] | qualified.get(name, set()))
+                ),
+                None in id_compared or name in id_compared,
+            )
+        )
+    has_limit = any(_is_word(token, "LIMIT") for token in tokens)
+    return references, has_limit
+
+
+# -----------------------------------------------------------------------------
+
+
+def sort_rows(
+    rows: List[Tuple[Any, ...]], keys: Sequence[Tuple[int, bool]]
+) -> List[Tuple[Any, ...]]:
+    """Sort result rows like SQLite would, with NULLs first when ascending.
+
+    ``keys`` are (index into the row, descending) pairs.
+    """
+    for index, descending in reversed(keys):
+        rows = sorted(
+            rows,
+            key=lambda row: (0, 0) if row[index] is None else (1, row[index]),
+            reverse=descending,
+        )
+    return rows
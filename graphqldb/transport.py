@@ -0,0 +1,171 @@
+"""HTTP/2 transport for the requests made to an API.
+
+Requests go through a ``requests.Session`` with an adapter sending them with
+``httpx`` (the ``http2`` extra), which multiplexes the concurrent requests to
+an endpoint over one connection. Servers not negotiating h2 are spoken to over
+HTTP/1.1. Errors are raised as the ``requests`` exceptions, as with the
+default transport.
+"""
+from __future__ import annotations
+
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple, Union
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from .cancel import QueryCancelled, get_current_scope
+
+# -----------------------------------------------------------------------------
+
+# Transports
+HTTP1 = "http1"
+HTTP2 = "http2"
+TRANSPORTS = (HTTP1, HTTP2)
+
+# Requests in flight at once, by default
+MAX_STREAMS = 100
+
+# -----------------------------------------------------------------------------
+
+
+class _Raw:
+    """The body of an ``httpx`` response, as read by ``requests.Response``."""
+
+    def __init__(self, response: Any, release: threading.Semaphore):
+        self.response = response
+        self.release = release
+        self.closed = False
+
+    def stream(
+        self, chunk_size: Optional[int], decode_content: bool
+    ) -> Iterator[bytes]:
+        import httpx
+
+        try:
+            yield from self.response.iter_bytes(chunk_size)
+        except httpx.TimeoutException as ex:
+            raise requests.Timeout(ex) from ex
+        except httpx.TransportError as ex:
+            raise requests.ConnectionError(ex) from ex
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.response.close()
+            self.release.release()
+
+
+class HTTPXAdapter(BaseAdapter):
+    """Sends the requests of a session with an (HTTP/2) ``httpx`` client.
+
+    At most ``max_streams`` requests are in flight at once; a streamed response
+    counts until it is closed.
+    """
+
+    def __init__(self, max_streams: int = MAX_STREAMS, client: Any = None):
+        import httpx
+
+        super().__init__()
+        self.client = (
+            client
+            if client is not None
+            else httpx.Client(
+                http2=True,
+                # Multiplexed over one connection with h2; as many as there
+                # are streams when falling back to HTTP/1.1
+                limits=httpx.Limits(max_connections=max_streams),
+            )
+        )
+        self.streams = threading.BoundedSemaphore(max_streams)
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout: Union[None, float, Tuple[float, float], Tuple[float, None]] = None,
+        verify: Union[bool, str] = True,
+        cert: Any = None,
+        proxies: Optional[Mapping[str, str]] = None,
+    ) -> requests.Response:
+        import httpx
+
+        # Connection-specific headers are dropped by ``h2``
+        httpx_request = self.client.build_request(
+            request.method or "POST",
+            request.url or "",
+            headers=dict(request.headers),
+            content=request.body,
+            timeout=(
+                httpx.Timeout(timeout[1], connect=timeout[0])
+                if isinstance(timeout, tuple)
+                else httpx.Timeout(timeout)
+            ),
+        )
+
+        # Waiting for a stream counts against the statement's deadline too
+        scope = get_current_scope()
+        if not self.streams.acquire(
+            timeout=None if scope is None else scope.get_timeout()
+        ):
+            raise QueryCancelled("Query exceeded its deadline")
+        try:
+            httpx_response = self.client.send(httpx_request, stream=True)
+        except BaseException as ex:
+            self.streams.release()
+            if isinstance(ex, httpx.TimeoutException):
+                raise requests.Timeout(ex, request=request) from ex
+            if isinstance(ex, httpx.TransportError):
+                raise requests.ConnectionError(ex, request=request) from ex
+            raise
+
+        response = requests.Response()
+        response.status_code = httpx_response.status_code
+        response.headers = CaseInsensitiveDict(httpx_response.headers.items())
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.reason = httpx_response.reason_phrase
+        response.url = request.url or ""
+        response.request = request
+        # The body is read by the session unless streaming
+        response.raw = _Raw(httpx_response, self.streams)
+        return response
+
+    def close(self) -> None:
+        self.client.close()
+
+
+# -----------------------------------------------------------------------------
+
+_sessions: Dict[int, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(
+    transport: str = HTTP1, max_streams: int = MAX_STREAMS
+) -> Optional[requests.Session]:
+    """The session requests are sent with, None for the default transport.
+
+    Sessions are shared (by ``max_streams``), so that requests to an endpoint
+    share its connection.
+    """
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown transport: {transport}")
+    if transport == HTTP1:
+        return None
+
+    with _sessions_lock:
+        session = _sessions.get(max_streams)
+        if session is None:
+            session = requests.Session()
+            # As with the default transport, nothing is kept between requests
+            session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+            adapter = HTTPXAdapter(max_streams)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[max_streams] = session
+        return session
@@ -110,9 +110,15 @@ setup(
         ],
     },
     install_requires=(
-        "shillelagh >= 1.2.0",
+        "shillelagh >= 1.4.0",
         "requests >= 2.31.0",
     ),
+    extras_require={
+        "arrow": ["pyarrow"],
+        "numpy": ["numpy"],
+        "otel": ["opentelemetry-api"],
+        "http2": ["httpx[http2]"],
+    },
     license="MIT",
     classifiers=[
         # Trove classifiers
@@ -120,7 +126,6 @@ setup(
         "Development Status :: 2 - Pre-Alpha",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
@@ -1,4 +1,5 @@
-from typing import Final, Generator
+import json
+from typing import Any, Dict, Final, Generator, List, Optional
 
 import pytest
 import responses
@@ -12,6 +13,9 @@ SWAPI_GRAPHQL_DB_URL: Final[
 ] = "graphql://swapi-graphql.netlify.app/.netlify/functions/index"
 PETSTORE_GRAPHQL_DB_URL: Final[str] = "graphql://pet-library.moonhighway.com/"
 
+FAKE_GRAPHQL_DB_URL: Final[str] = "graphql://example.com/graphql"
+FAKE_GRAPHQL_API: Final[str] = "https://example.com/graphql"
+
 # -----------------------------------------------------------------------------
 
 
@@ -63,3 +67,216 @@ def petstore_connection_on_engine(
 def mocked_responses() -> Generator[responses.RequestsMock, None, None]:
     with responses.RequestsMock() as rsps:
         yield rsps
+
+
+# -----------------------------------------------------------------------------
+
+
+def get_request_query(call: Any) -> str:
+    """Return the GraphQL document sent in a recorded ``responses`` call."""
+    return json.loads(call.request.body)["query"]
+
+
+def add_response(mocked_responses: responses.RequestsMock, data: Any) -> None:
+    """Answer the next request to the fake API with ``data``."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": data}
+    )
+
+
+def add_page(
+    mocked_responses: responses.RequestsMock, page: int, has_next_page: bool
+) -> None:
+    """Answer the next request with page ``page`` of ``allPeople``.
+
+    Each page has one person, named ``p<page>``, and ends at cursor ``c<page>``.
+    """
+    add_response(
+        mocked_responses,
+        {
+            "allPeople": {
+                "edges": [{"node": {"name": f"p{page}"}}],
+                "pageInfo": {"endCursor": f"c{page}", "hasNextPage": has_next_page},
+            }
+        },
+    )
+
+
+def _type_ref(
+    name: Optional[str], kind: str, of_type: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    return {"name": name, "kind": kind, "ofType": of_type}
+
+
+def _field(name: str, type_ref: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+    return {"name": name, "type": type_ref, **kwargs}
+
+
+def _arg(name: str, kind: str = "SCALAR") -> Dict[str, Any]:
+    return {"name": name, "type": {"kind": kind}}
+
+
+def _object(
+    name: str, fields: List[Dict[str, Any]], interfaces: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "kind": "OBJECT",
+        "fields": fields,
+        "interfaces": [{"name": x} for x in interfaces or []],
+    }
+
+
+def _scalar(name: str) -> Dict[str, Any]:
+    return {"name": name, "kind": "SCALAR", "fields": None, "interfaces": None}
+
+
+@pytest.fixture
+def fake_introspection() -> Dict[str, Any]:
+    """A trimmed SWAPI-like introspection result (the ``data`` payload)."""
+    id_type = _type_ref(None, "NON_NULL", _type_ref("ID", "SCALAR"))
+    string_type = _type_ref("String", "SCALAR")
+    return {
+        "__schema": {
+            "queryType": {
+                "fields": [
+                    _field(
+                        "allPeople",
+                        _type_ref("PeopleConnection", "OBJECT"),
+                        args=[_arg("after"), _arg("first")],
+                    ),
+                    _field(
+                        "person",
+                        _type_ref("Person", "OBJECT"),
+                        args=[_arg("id"), _arg("personID")],
+                    ),
+                    _field(
+                        "node",
+                        _type_ref("Node", "INTERFACE"),
+                        args=[_arg("id", kind="NON_NULL")],
+                    ),
+                    # Hasura-style list and aggregate fields
+                    _field(
+                        "users",
+                        _type_ref(
+                            None,
+                            "NON_NULL",
+                            _type_ref(
+                                None,
+                                "LIST",
+                                _type_ref(
+                                    None, "NON_NULL", _type_ref("User", "OBJECT")
+                                ),
+                            ),
+                        ),
+                        args=[_arg("distinct_on", kind="LIST"), _arg("where")],
+                    ),
+                    _field(
+                        "users_aggregate",
+                        _type_ref("users_aggregate", "OBJECT"),
+                        args=[_arg("where")],
+                    ),
+                ]
+            },
+            "types": [
+                _scalar("ID"),
+                _scalar("String"),
+                _scalar("Boolean"),
+                _scalar("Int"),
+                _object(
+                    "PeopleConnection",
+                    [
+                        _field("pageInfo", _type_ref("PageInfo", "OBJECT")),
+                        _field(
+                            "edges",
+                            _type_ref(None, "LIST", _type_ref("PeopleEdge", "OBJECT")),
+                        ),
+                    ],
+                ),
+                _object(
+                    "PeopleEdge",
+                    [
+                        _field("node", _type_ref("Person", "OBJECT")),
+                        _field("cursor", string_type),
+                    ],
+                ),
+                _object(
+                    "Person",
+                    [
+                        _field("id", id_type),
+                        _field("name", string_type),
+                        _field("homeworld", _type_ref("Planet", "OBJECT")),
+                    ],
+                    interfaces=["Node"],
+                ),
+                _object(
+                    "Planet",
+                    [
+                        _field("id", id_type),
+                        _field("name", string_type),
+                        _field(
+                            "residentConnection",
+                            _type_ref("PlanetResidentsConnection", "OBJECT"),
+                        ),
+                        _field(
+                            "tags",
+                            _type_ref(
+                                None,
+                                "NON_NULL",
+                                _type_ref(
+                                    None,
+                                    "LIST",
+                                    _type_ref(
+                                        None, "NON_NULL", _type_ref("Tag", "OBJECT")
+                                    ),
+                                ),
+                            ),
+                        ),
+                    ],
+                    interfaces=["Node"],
+                ),
+                _object(
+                    "PlanetResidentsConnection",
+                    [
+                        _field(
+                            "edges",
+                            _type_ref(
+                                None, "LIST", _type_ref("PlanetResidentsEdge", "OBJECT")
+                            ),
+                        ),
+                    ],
+                ),
+                _object(
+                    "PlanetResidentsEdge",
+                    [_field("node", _type_ref("Person", "OBJECT"))],
+                ),
+                _object("Tag", [_field("name", string_type)]),
+                _object(
+                    "PageInfo",
+                    [
+                        _field("hasNextPage", _type_ref("Boolean", "SCALAR")),
+                        _field("endCursor", string_type),
+                    ],
+                ),
+                _object(
+                    "User",
+                    [
+                        _field("id", id_type),
+                        _field("status", string_type),
+                        _field("age", _type_ref("Int", "SCALAR")),
+                    ],
+                ),
+                {
+                    "name": "Node",
+                    "kind": "INTERFACE",
+                    "fields": [_field("id", id_type)],
+                    "interfaces": None,
+                },
+            ],
+        }
+    }
+
+
+@pytest.fixture
+def fake_engine() -> Engine:
+    return create_engine(FAKE_GRAPHQL_DB_URL)
@@ -1,14 +1,28 @@
+from typing import Any, Dict, List, Optional
+
 import pytest
-from shillelagh.fields import ISODate, ISODateTime, String
+import responses
+from shillelagh.fields import Integer, ISODate, ISODateTime, String
+from shillelagh.filters import Equal, Operator
 
 from graphqldb.adapter import (
+    MAX_INCLUDE_DEPTH,
+    GraphQLAdapter,
+    TablePlans,
     TypeInfo,
+    _get_predicate_check,
     _get_variable_argument_str,
     _parse_query_args,
+    explode_node,
     extract_flattened_value,
+    find_lookup_field,
     get_gql_fields,
     parse_gql_type,
 )
+from graphqldb.schema import Schema
+from graphqldb.sql import Predicate, parse_select
+
+from .conftest import FAKE_GRAPHQL_API, add_page, add_response, get_request_query
 
 # -----------------------------------------------------------------------------
 
@@ -36,6 +50,56 @@ def test_get_gql_fields_nested_multiple():
     )
 
 
+def test_get_gql_fields_deep() -> None:
+    assert (
+        get_gql_fields(["a__b__c", "a__b__d", "a__e"], connection_paths={"a__b"})
+        == "a {b {edges {node {c d}}} e}"
+    )
+
+
+def test_explode_node() -> None:
+    node = {
+        "id": "p",
+        "homeworld": {
+            "name": "x",
+            "tags": [{"name": "t1"}, {"name": "t2"}],
+            "residentConnection": {
+                "edges": [{"node": {"name": "a"}}, {"node": {"name": "b"}}]
+            },
+        },
+    }
+    list_paths = {"homeworld__tags": False, "homeworld__residentConnection": True}
+
+    # Only children used by the columns multiply the rows
+    assert explode_node(node, ["id", "homeworld__name"], list_paths) == [
+        {"id": "p", "homeworld__name": "x"}
+    ]
+    assert explode_node(
+        node, ["id", "homeworld__residentConnection__name"], list_paths
+    ) == [
+        {"id": "p", "homeworld__residentConnection__name": "a"},
+        {"id": "p", "homeworld__residentConnection__name": "b"},
+    ]
+    assert [
+        (row["homeworld__tags__name"], row["homeworld__residentConnection__name"])
+        for row in explode_node(
+            node,
+            ["homeworld__tags__name", "homeworld__residentConnection__name"],
+            list_paths,
+        )
+    ] == [("t1", "a"), ("t1", "b"), ("t2", "a"), ("t2", "b")]
+
+    # The rows share the column names they were asked for
+    columns = ["id", "homeworld__tags__name"]
+    for row in explode_node(node, columns, list_paths):
+        assert [c for c in row if c is columns[1]] == [columns[1]]
+
+    # Empty children (or a null parent) give a row of nulls
+    assert explode_node(
+        {"id": "q", "homeworld": None}, ["id", "homeworld__tags__name"], list_paths
+    ) == [{"id": "q", "homeworld__tags__name": None}]
+
+
 def test_extract_flattened_value():
     data = {"foo": 1}
     assert extract_flattened_value(data, "foo") == 1
@@ -75,6 +139,7 @@ def test_parse_gql_type():
 def test_get_variable_argument_str():
     assert _get_variable_argument_str({"a": 1}) == "a: 1"
     assert _get_variable_argument_str({"a": 1, "b": "c"}) == 'a: 1 b: "c"'
+    assert _get_variable_argument_str({"a": 'c"d'}) == 'a: "c\\"d"'
 
 
 def test_parse_query_args():
@@ -94,3 +159,481 @@ def test_parse_query_args():
     # dupe
     with pytest.raises(ValueError):
         _parse_query_args({"arg_foo": ["bar"], "iarg_foo": [3]})
+
+
+# -----------------------------------------------------------------------------
+
+
+def _make_adapter(**kwargs: Any) -> GraphQLAdapter:
+    return GraphQLAdapter(
+        table="allPeople",
+        include=kwargs.pop("include", []),
+        query_args=kwargs.pop("query_args", {}),
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+        **kwargs,
+    )
+
+
+def test_find_lookup_field(fake_introspection: Dict[str, Any]) -> None:
+    schema = Schema.from_introspection(fake_introspection)
+
+    assert find_lookup_field("Person", schema=schema) == ("person", None)
+    # Only ``node(id:)`` can fetch a Planet
+    assert find_lookup_field("Planet", schema=schema) == ("node", "Planet")
+
+    query_fields = fake_introspection["__schema"]["queryType"]["fields"]
+    fake_introspection["__schema"]["queryType"]["fields"] = query_fields[:2]
+    schema = Schema.from_introspection(fake_introspection)
+    assert find_lookup_field("Planet", schema=schema) is None
+
+
+def test_adapter_nested_include(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={
+            "data": {
+                "allPeople": {
+                    "edges": [
+                        {
+                            "node": {
+                                "name": "Luke",
+                                "homeworld": {
+                                    "residentConnection": {
+                                        "edges": [
+                                            {"node": {"name": "Luke"}},
+                                            {"node": {"name": "Owen"}},
+                                        ]
+                                    }
+                                },
+                            }
+                        }
+                    ],
+                    "pageInfo": {"endCursor": "c0", "hasNextPage": False},
+                }
+            }
+        },
+    )
+
+    adapter = _make_adapter(include=["homeworld__residentConnection"])
+    assert adapter.list_paths == {"homeworld__residentConnection": True}
+    assert "homeworld__residentConnection__name" in adapter.columns
+    # Only the named path is followed, not the residents' own homeworld
+    assert "homeworld__residentConnection__homeworld__name" not in adapter.columns
+
+    columns = ["name", "homeworld__residentConnection__name"]
+    assert list(adapter.get_data({}, [], requested_columns=columns)) == [
+        {"name": "Luke", "homeworld__residentConnection__name": "Luke"},
+        {"name": "Luke", "homeworld__residentConnection__name": "Owen"},
+    ]
+    assert "homeworld {residentConnection {edges {node {name}}}}" in (
+        get_request_query(mocked_responses.calls[1])
+    )
+
+
+def test_adapter_include_cycle(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+
+    adapter = _make_adapter(include=["homeworld", "residentConnection", "tags"])
+    assert "homeworld__tags__name" in adapter.columns
+    assert max(len(c.split("__")) for c in adapter.columns) <= MAX_INCLUDE_DEPTH + 1
+
+
+def test_adapter_include_scalar_list(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    planet = next(
+        t for t in fake_introspection["__schema"]["types"] if t["name"] == "Planet"
+    )
+    planet["fields"].append(
+        {
+            "name": "climates",
+            "type": {
+                "name": None,
+                "kind": "LIST",
+                "ofType": {"name": "String", "kind": "SCALAR", "ofType": None},
+            },
+        }
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+
+    adapter = _make_adapter(include=["homeworld", "climates"])
+    assert "homeworld__name" in adapter.columns
+    assert not any("climates" in c for c in adapter.columns)
+    assert adapter.list_paths == {}
+
+
+def test_adapter_lookup(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "cGVvcGxlOjE=", "name": "Luke Skywalker"}}},
+    )
+
+    adapter = _make_adapter()
+    assert adapter.lookup_field == "person"
+    assert adapter.get_columns()["id"].filters == [Equal]
+    assert adapter.get_cost([("id", Operator.EQ)], []) < adapter.get_cost([], [])
+
+    rows = list(adapter.get_data({"id": Equal("cGVvcGxlOjE=")}, []))
+    assert rows == [{"id": "cGVvcGxlOjE=", "name": "Luke Skywalker"}]
+    assert 'n0: person(id: "cGVvcGxlOjE=")' in get_request_query(
+        mocked_responses.calls[1]
+    )
+
+
+def test_adapter_lookup_batched(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}, "n1": None}},
+    )
+
+    adapter = _make_adapter()
+    rows = list(adapter.get_data_lookup(["a", "b"]))
+    assert rows == [{"id": "a", "name": "A"}]
+    query = get_request_query(mocked_responses.calls[1])
+    assert 'n0: person(id: "a")' in query
+    assert 'n1: person(id: "b")' in query
+
+
+def test_adapter_lookup_disabled_with_query_args(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+
+    adapter = _make_adapter(query_args={"first": 3})
+    assert adapter.lookup_field is None
+    assert adapter.get_columns()["id"].filters == []
+
+
+def test_adapter_aggregate(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"g0": {"aggregate": {"a0": 3, "a1": {"age": 4.5}}}}},
+    )
+
+    adapter = GraphQLAdapter(
+        table="users",
+        include=[],
+        query_args={},
+        is_connection=False,
+        graphql_api=FAKE_GRAPHQL_API,
+        aggregate_queries={"users": "users_aggregate"},
+    )
+    result = adapter.get_data_aggregate(
+        parse_select("select count(*), avg(age) as a from users where age > 1")
+    )
+    assert result is not None
+    columns, rows = result
+    assert [name for name, _ in columns] == ["count(*)", "a"]
+    assert rows == [(3, 4.5)]
+    assert get_request_query(mocked_responses.calls[1]) == (
+        "query {g0: users_aggregate(where: {_and: [{age: {_gt: 1}}]})"
+        "{aggregate {a0: count a1: avg {age}}}}"
+    )
+
+    # Not expressible: bare column that isn't grouped, unknown column
+    assert adapter.get_data_aggregate(parse_select("select age from users")) is None
+    assert (
+        adapter.get_data_aggregate(parse_select("select sum(nope) from users")) is None
+    )
+
+
+def test_adapter_aggregate_group_by(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"users": [{"status": "a"}, {"status": None}]}},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={
+            "data": {
+                "g0": {"aggregate": {"a1": 1}},
+                "g1": {"aggregate": {"a1": 5}},
+            }
+        },
+    )
+
+    adapter = GraphQLAdapter(
+        table="users",
+        include=[],
+        query_args={},
+        is_connection=False,
+        graphql_api=FAKE_GRAPHQL_API,
+        aggregate_queries={"users": "users_aggregate"},
+    )
+    result = adapter.get_data_aggregate(
+        parse_select(
+            "select status, count(*) as c from users group by status order by c desc"
+        )
+    )
+    assert result is not None
+    _, rows = result
+    assert rows == [(None, 5), ("a", 1)]
+
+    assert "users(distinct_on: [status])" in get_request_query(
+        mocked_responses.calls[1]
+    )
+    aggregate_query = get_request_query(mocked_responses.calls[2])
+    assert 'g0: users_aggregate(where: {_and: [{status: {_eq: "a"}}]})' in (
+        aggregate_query
+    )
+    assert "g1: users_aggregate(where: {_and: [{status: {_is_null: true}}]})" in (
+        aggregate_query
+    )
+
+
+def test_get_predicate_check() -> None:
+    check = _get_predicate_check(Integer(), Predicate("a", ">", 1))
+    assert check is not None
+    assert check(2)
+    assert not check(1)
+    assert not check(None)
+
+    check = _get_predicate_check(String(), Predicate("a", "IN", ["x", "y"]))
+    assert check is not None
+    assert check("x")
+    assert not check("z")
+
+    check = _get_predicate_check(String(), Predicate("a", "IS NULL"))
+    assert check is not None
+    assert check(None)
+
+    # SQLite would coerce types here, so we don't evaluate these locally
+    assert _get_predicate_check(String(), Predicate("a", "=", 1)) is None
+    assert _get_predicate_check(Integer(), Predicate("a", "=", "1")) is None
+    assert _get_predicate_check(ISODateTime(), Predicate("a", "=", "x")) is None
+
+
+def test_adapter_direct(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    pages: List[List[Optional[str]]] = [["A", "B"], ["C", None]]
+    for page, names in enumerate(pages):
+        mocked_responses.add(
+            method=responses.POST,
+            url=FAKE_GRAPHQL_API,
+            json={
+                "data": {
+                    "allPeople": {
+                        "edges": [{"node": {"name": name}} for name in names],
+                        "pageInfo": {"endCursor": f"c{page}", "hasNextPage": not page},
+                    }
+                }
+            },
+        )
+
+    adapter = _make_adapter()
+    result = adapter.get_data_direct(
+        parse_select(
+            "select name as n from allPeople where name != 'B' "
+            "order by n desc limit 5 offset 1"
+        )
+    )
+    assert result is not None
+    columns, rows = result
+    assert columns == [("n", String())]
+    assert list(rows) == [("A",)]
+
+    # Only the referenced column is requested
+    query = get_request_query(mocked_responses.calls[1])
+    assert "name" in query
+    assert "id" not in query
+    assert 'after: "c0"' in get_request_query(mocked_responses.calls[2])
+
+
+def test_adapter_direct_limit(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={
+            "data": {
+                "allPeople": {
+                    "edges": [{"node": {"id": "a"}}, {"node": {"id": "b"}}],
+                    "pageInfo": {"endCursor": "c0", "hasNextPage": True},
+                }
+            }
+        },
+    )
+
+    adapter = _make_adapter()
+    result = adapter.get_data_direct(parse_select("select * from allPeople limit 2"))
+    assert result is not None
+    columns, rows = result
+    assert [name for name, _ in columns] == ["id", "name"]
+    assert list(rows) == [("a", None), ("b", None)]
+
+    # We stop paginating once we have enough rows
+    assert len(mocked_responses.calls) == 2
+    assert "first: 2" in get_request_query(mocked_responses.calls[1])
+
+
+def test_adapter_direct_negative_limit(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    add_response(mocked_responses, fake_introspection)
+    for _ in range(2):
+        add_page(mocked_responses, 0, False)
+
+    adapter = _make_adapter()
+    # As in SQLite, a negative LIMIT is no limit and a negative OFFSET is none
+    for sql in [
+        "select name from allPeople limit -1",
+        "select name from allPeople limit 1 offset -1",
+    ]:
+        result = adapter.get_data_direct(parse_select(sql))
+        assert result is not None
+        assert list(result[1]) == [("p0",)]
+    assert "first" not in get_request_query(mocked_responses.calls[1])
+
+
+def test_adapter_direct_unsupported(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+
+    adapter = _make_adapter()
+    for sql in [
+        "select nope from allPeople",
+        "select name from allPeople where name = 1",
+        "select count(*) from allPeople",
+    ]:
+        assert adapter.get_data_direct(parse_select(sql)) is None
+
+
+def test_adapter_table_plans(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+
+    plans = TablePlans()
+    adapter = _make_adapter(table_plans=plans.id)
+    assert _make_adapter(table_plans=plans.id).table_plan is adapter.table_plan
+    # Narrowed by query args, the table is planned separately (from the same
+    # schema)
+    narrowed = _make_adapter(table_plans=plans.id, query_args={"first": 1})
+    assert narrowed.lookup_field is None
+    assert len(mocked_responses.calls) == 1
+
+    plans.clear()
+    assert _make_adapter(table_plans=plans.id).table_plan is not adapter.table_plan
+    assert len(mocked_responses.calls) == 2
+
+    # Expired at once
+    plans = TablePlans(ttl=0)
+    _make_adapter(table_plans=plans.id)
+    _make_adapter(table_plans=plans.id)
+    assert len(mocked_responses.calls) == 4
+
+
+def test_adapter_dictionary_encoding(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    residents = {"residentConnection": {"edges": [{"node": {"name": "Owen"}}]}}
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={
+            "data": {
+                "allPeople": {
+                    "edges": [
+                        {"node": {"name": "Luke", "homeworld": residents}},
+                        {"node": {"name": "Luke", "homeworld": residents}},
+                    ],
+                    "pageInfo": {"endCursor": "c0", "hasNextPage": False},
+                }
+            }
+        },
+    )
+
+    adapter = _make_adapter(
+        include=["homeworld__residentConnection"], dictionary_encoding=True
+    )
+    columns = ["name", "homeworld__residentConnection__name"]
+    first, second = adapter.get_data({}, [], requested_columns=columns)
+    assert first == second
+
+    # Decoded separately, the values and the exploded column names are shared
+    for column in columns:
+        assert first[column] is second[column]
+    assert [k for k in first if k in columns] == columns
+    assert all(a is b for a, b in zip(first, second))
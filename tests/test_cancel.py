@@ -0,0 +1,133 @@
+import gc
+import stat
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+import responses
+from sqlalchemy import create_engine, exc, text
+
+from graphqldb import cancel
+from graphqldb.cancel import CancelToken, QueryCancelled, StatementScope
+
+from .conftest import FAKE_GRAPHQL_DB_URL, add_page, add_response
+
+# -----------------------------------------------------------------------------
+
+
+def test_statement_scope_deadline() -> None:
+    token = CancelToken()
+    StatementScope(token).check()
+    assert StatementScope(token, timeout=None).get_timeout() is None
+
+    with pytest.raises(QueryCancelled, match="deadline"):
+        StatementScope(token, timeout=0).check()
+
+
+def test_cancel_query() -> None:
+    token = CancelToken()
+    scope = StatementScope(token, timeout=60)
+    assert cancel.cancel_query(token.cancel_id)
+    with pytest.raises(QueryCancelled, match="cancelled"):
+        scope.get_timeout()
+
+    # Once the statement is over, there is nothing to cancel
+    scope.close()
+    assert not cancel.cancel_query(token.cancel_id)
+    StatementScope(token).check()
+
+
+def test_cancel_query_in_process_only(tmp_path: Path) -> None:
+    # Without a cancel directory, nothing is written anywhere
+    token = CancelToken()
+    scope = StatementScope(token)
+    cancel._tokens.pop(token.cancel_id)
+    assert not cancel.cancel_query(token.cancel_id)
+    assert not cancel.cancel_query(token.cancel_id, str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+    scope.close()
+
+
+def test_cancel_query_other_process(tmp_path: Path) -> None:
+    cancel_dir = tmp_path / "cancel"
+
+    # Nothing is running under the id, so no marker is left
+    assert not cancel.cancel_query("abc", str(cancel_dir))
+    assert not cancel_dir.exists()
+
+    # Running in another process, so a marker is left for the process that is
+    token = CancelToken("abc", str(cancel_dir))
+    scope = StatementScope(token)
+    assert stat.S_IMODE(cancel_dir.stat().st_mode) == 0o700
+    cancel._tokens.pop("abc")
+    assert cancel.cancel_query("abc", str(cancel_dir))
+    assert token.is_cancelled()
+
+    scope.close()
+    assert list(cancel_dir.iterdir()) == []
+
+
+def test_cancel_dir_removed_unconsumed(tmp_path: Path) -> None:
+    # A statement whose results are never consumed leaves nothing behind
+    token = CancelToken("abc", str(tmp_path))
+    token.start()
+    assert list(tmp_path.iterdir()) != []
+    del token
+    gc.collect()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_statement_scope_iter_checked() -> None:
+    token = CancelToken()
+    scope = StatementScope(token)
+    chunks = scope.iter_checked(iter([b"a", b"b"]))
+    assert next(chunks) == b"a"
+
+    assert cancel.cancel_query(token.cancel_id)
+    with pytest.raises(QueryCancelled, match="cancelled"):
+        next(chunks)
+    scope.close()
+
+
+def test_cursor_cancel_stops_pagination(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    add_response(mocked_responses, fake_introspection)
+    add_page(mocked_responses, 0, True)
+    add_page(mocked_responses, 1, False)
+    mocked_responses.assert_all_requests_are_fired = False
+
+    engine = create_engine(FAKE_GRAPHQL_DB_URL)
+    connection = engine.raw_connection()
+    cursor = connection.cursor()
+    cursor.execute("select name from allPeople")
+    assert cursor.fetchone() == ("p0",)
+
+    cancel.cancel_query(cursor.cancel_id)
+    with pytest.raises(QueryCancelled):
+        cursor.fetchall()
+    # The second page was never requested
+    assert len(mocked_responses.calls) == 2
+    connection.close()
+
+
+def test_statement_timeout_execution_option(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    add_response(mocked_responses, fake_introspection)
+    add_page(mocked_responses, 0, True)
+    add_page(mocked_responses, 1, False)
+    mocked_responses.assert_all_requests_are_fired = False
+
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, statement_timeout=60)
+    with engine.connect() as connection:
+        result = connection.execute(text("select name from allPeople"))
+        assert list(result) == [("p0",), ("p1",)]
+
+        # The table is already planned, so the deadline is hit fetching rows
+        with pytest.raises(exc.OperationalError, match="deadline"):
+            list(
+                connection.execution_options(statement_timeout=0).execute(
+                    text("select name from allPeople")
+                )
+            )
@@ -0,0 +1,99 @@
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+import requests
+import responses
+from sqlalchemy import create_engine, text
+
+from graphqldb.adapter import GraphQLAdapter
+from graphqldb.checkpoint import CheckpointStore, get_checkpoint_key
+
+from .conftest import (
+    FAKE_GRAPHQL_API,
+    FAKE_GRAPHQL_DB_URL,
+    add_page,
+    add_response,
+    get_request_query,
+)
+
+# -----------------------------------------------------------------------------
+
+
+def test_checkpoint_store(tmp_path: Path) -> None:
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    key = get_checkpoint_key("https://host/graphql", "allPeople", {}, ["name", "id"])
+    assert key == get_checkpoint_key(
+        "https://host/graphql", "allPeople", {}, ["id", "name"]
+    )
+    assert key != get_checkpoint_key("https://host/graphql", "allPeople", {}, ["id"])
+
+    assert store.get(key) is None
+    store.set(key, "c0")
+    store.set(key, "c1")
+    assert CheckpointStore(store.path).get(key) == "c1"
+    store.clear(key)
+    assert store.get(key) is None
+
+
+def test_adapter_resume_scan(
+    tmp_path: Path,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    add_response(mocked_responses, fake_introspection)
+    add_page(mocked_responses, 0, True)
+    mocked_responses.add(method=responses.POST, url=FAKE_GRAPHQL_API, status=502)
+    add_page(mocked_responses, 1, False)
+
+    checkpoint_path = str(tmp_path / "checkpoints.db")
+    adapter = GraphQLAdapter(
+        table="allPeople",
+        include=[],
+        query_args={},
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+        checkpoint_path=checkpoint_path,
+    )
+
+    pages = []
+    with pytest.raises(requests.HTTPError):
+        for nodes in adapter.get_pages(["name"], checkpoint=True):
+            pages.append(nodes)
+    assert pages == [[{"name": "p0"}]]
+
+    # The next scan picks up after the last page that was read
+    assert list(adapter.get_pages(["name"], checkpoint=True)) == [[{"name": "p1"}]]
+    assert 'after: "c0"' in get_request_query(mocked_responses.calls[3])
+
+    # Completed scans start from the beginning again
+    key = get_checkpoint_key(FAKE_GRAPHQL_API, "allPeople", {}, ["name"])
+    assert CheckpointStore(checkpoint_path).get(key) is None
+
+
+def test_query_checkpoint_abandoned_scan(
+    tmp_path: Path,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    add_response(mocked_responses, fake_introspection)
+    for page, has_next_page in [(0, True), (1, True), (0, True), (1, False)]:
+        add_page(mocked_responses, page, has_next_page)
+
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL, checkpoint_path=str(tmp_path / "checkpoints.db")
+    )
+    with engine.connect() as connection:
+        connection = connection.execution_options(checkpoint=True)
+        # The LIMIT can't be pushed down with the predicate, so the scan is
+        # abandoned once the second page was read
+        result = connection.execute(
+            text("select name from allPeople where name != 'zz' limit 2")
+        )
+        assert list(result) == [("p0",), ("p1",)]
+
+        # ...and isn't resumed by the next statement
+        result = connection.execute(text("select name from allPeople"))
+        assert list(result) == [("p0",), ("p1",)]
+
+    assert "after" not in get_request_query(mocked_responses.calls[3])
@@ -0,0 +1,97 @@
+from typing import Any, Dict
+
+import pytest
+import responses
+from sqlalchemy import create_engine
+
+from graphqldb import fetch_arrow, fetch_numpy, iter_arrow_batches
+
+from .conftest import FAKE_GRAPHQL_DB_URL, add_response, get_request_query
+
+# -----------------------------------------------------------------------------
+
+USERS = [
+    {"id": "1", "age": 30},
+    {"id": "2", "age": None},
+    {"id": "3", "age": 5},
+]
+
+
+def test_fetch_arrow(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    pa = pytest.importorskip("pyarrow")
+    add_response(mocked_responses, fake_introspection)
+    add_response(mocked_responses, {"users": USERS})
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, list_queries=["users"])
+
+    table = fetch_arrow(engine, "users", ["id", "age"])
+    assert table.schema == pa.schema([("id", pa.string()), ("age", pa.int64())])
+    assert table.to_pydict() == {"id": ["1", "2", "3"], "age": [30, None, 5]}
+    assert "id age" in get_request_query(mocked_responses.calls[1])
+
+
+def test_iter_arrow_batches(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    pytest.importorskip("pyarrow")
+    add_response(mocked_responses, fake_introspection)
+    add_response(mocked_responses, {"users": USERS})
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, list_queries=["users"])
+
+    batches = list(iter_arrow_batches(engine, "users", ["age"], batch_size=2))
+    assert [batch.to_pydict() for batch in batches] == [
+        {"age": [30, None]},
+        {"age": [5]},
+    ]
+
+
+def test_iter_arrow_batches_page_size(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    pytest.importorskip("pyarrow")
+    add_response(mocked_responses, fake_introspection)
+    for page in range(2):
+        add_response(
+            mocked_responses,
+            {
+                "allPeople": {
+                    "edges": [{"node": {"name": f"p{page}-{i}"}} for i in range(2)],
+                    "pageInfo": {"endCursor": f"c{page}", "hasNextPage": not page},
+                }
+            },
+        )
+    engine = create_engine(FAKE_GRAPHQL_DB_URL)
+
+    batches = list(iter_arrow_batches(engine, "allPeople", ["name"], batch_size=2))
+    assert [batch.num_rows for batch in batches] == [2, 2]
+
+    # The batch size is used as the page size
+    assert "first: 2" in get_request_query(mocked_responses.calls[1])
+    assert 'after: "c0"' in get_request_query(mocked_responses.calls[2])
+
+
+def test_fetch_unknown_column(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    pytest.importorskip("pyarrow")
+    add_response(mocked_responses, fake_introspection)
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, list_queries=["users"])
+
+    with pytest.raises(ValueError, match="Unknown columns"):
+        fetch_arrow(engine, "users", ["nope"])
+
+
+def test_fetch_numpy(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    np = pytest.importorskip("numpy")
+    add_response(mocked_responses, fake_introspection)
+    add_response(mocked_responses, {"users": USERS})
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, list_queries=["users"])
+
+    arrays = fetch_numpy(engine, "users", ["id", "age"], batch_size=2)
+    assert arrays["age"].dtype == np.int64
+    assert arrays["age"].mask.tolist() == [False, True, False]
+    assert arrays["age"].compressed().tolist() == [30, 5]
+    assert arrays["id"].tolist() == ["1", "2", "3"]
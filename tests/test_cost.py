@@ -0,0 +1,205 @@
+from typing import Any, Dict, Generator, List
+
+import pytest
+import responses
+
+from graphqldb import lib
+from graphqldb.adapter import GraphQLAdapter
+from graphqldb.cost import (
+    THROTTLED_BACKOFF,
+    CostBudget,
+    CostStatus,
+    clear_budgets,
+    get_budget,
+    is_throttled,
+    parse_cost_extension,
+    parse_rate_limit_headers,
+)
+from graphqldb.lib import run_query
+
+from .conftest import FAKE_GRAPHQL_API, get_request_query
+
+# -----------------------------------------------------------------------------
+
+
+@pytest.fixture(autouse=True)
+def budgets() -> Generator[None, None, None]:
+    clear_budgets()
+    yield
+    clear_budgets()
+
+
+def _cost(
+    cost: float, available: float, maximum: float = 1000, restore_rate: float = 50
+) -> Dict[str, Any]:
+    return {
+        "cost": {
+            "requestedQueryCost": cost,
+            "actualQueryCost": cost,
+            "throttleStatus": {
+                "maximumAvailable": maximum,
+                "currentlyAvailable": available,
+                "restoreRate": restore_rate,
+            },
+        }
+    }
+
+
+def test_parse_cost() -> None:
+    assert parse_cost_extension(_cost(12, 988), {}) == CostStatus(
+        cost=12, remaining=988, maximum=1000, restore_rate=50
+    )
+    assert parse_cost_extension({}, {}) is None
+
+    headers = {
+        "X-RateLimit-Remaining": "4990",
+        "X-RateLimit-Limit": "5000",
+        "X-RateLimit-Reset": "1700000000",
+    }
+    assert parse_rate_limit_headers({}, headers) == CostStatus(
+        remaining=4990, maximum=5000, reset_at=1700000000
+    )
+    assert parse_rate_limit_headers({}, {}) is None
+
+    assert is_throttled(429, None)
+    assert is_throttled(200, [{"extensions": {"code": "THROTTLED"}}])
+    assert not is_throttled(200, [{"message": "Oops"}])
+
+    with pytest.raises(ValueError, match="Unknown cost parsers"):
+        get_budget(FAKE_GRAPHQL_API, parsers=["graphql-cost"])
+
+
+def test_budget_reserve() -> None:
+    budget = get_budget(FAKE_GRAPHQL_API)
+    # Nothing is known of the budget yet
+    assert budget.reserve("allPeople") == 0
+
+    budget.update(_cost(30, 40), {}, "allPeople")
+    assert budget.reserve("allPeople") == 0
+    # The first query took 30 of the 40 left, so the next waits for 20 more
+    assert budget.reserve("allPeople") == pytest.approx(0.4, abs=0.01)
+    # ...and the one after that, for the next 30 too
+    assert budget.reserve("allPeople") == pytest.approx(1.0, abs=0.01)
+
+    # Shared by API and token
+    assert get_budget(FAKE_GRAPHQL_API) is budget
+    assert get_budget(FAKE_GRAPHQL_API, "token") is not budget
+
+
+def test_budget_retry_wait() -> None:
+    budget = get_budget(FAKE_GRAPHQL_API)
+    assert budget.get_retry_wait({"Retry-After": "3"}, 0) == 3
+    # Nothing tells how long to wait, so the retries back off
+    assert [budget.get_retry_wait({}, attempt) for attempt in range(3)] == [
+        THROTTLED_BACKOFF,
+        THROTTLED_BACKOFF * 2,
+        THROTTLED_BACKOFF * 4,
+    ]
+
+    # Once the budget is known, retries are paced by it
+    budget.update(_cost(30, 0), {}, "allPeople")
+    assert budget.get_retry_wait({}, 2) == 0
+
+
+def test_budget_page_size() -> None:
+    budget = CostBudget([parse_cost_extension])
+    assert budget.get_page_size("allPeople", 100) == 100
+
+    budget.set_rows("allPeople", 100)
+    budget.update(_cost(400, 600), {}, "allPeople")
+    assert budget.get_page_size("allPeople", 100) == 100
+
+    # A page costing more than half of the budget is made to fit it
+    budget.update(_cost(800, 200), {}, "allPeople")
+    assert budget.get_page_size("allPeople", 100) == 62
+    # ...unless smaller already
+    assert budget.get_page_size("allPeople", 50) == 50
+
+
+def test_run_query_throttled(mocked_responses: responses.RequestsMock) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        status=429,
+        headers={"Retry-After": "0"},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={
+            "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+            "extensions": _cost(10, 0, restore_rate=1000),
+        },
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"ok": True}, "extensions": _cost(10, 990, restore_rate=1000)},
+    )
+
+    budget = get_budget(FAKE_GRAPHQL_API)
+    assert run_query(FAKE_GRAPHQL_API, query="{ok}", budget=budget) == {"ok": True}
+    assert len(mocked_responses.calls) == 3
+    assert budget.last_cost == 10
+
+    # Without a budget, a throttled query fails
+    mocked_responses.add(method=responses.POST, url=FAKE_GRAPHQL_API, status=429)
+    with pytest.raises(Exception, match="429"):
+        run_query(FAKE_GRAPHQL_API, query="{ok}")
+
+
+def test_run_query_throttled_backoff(
+    mocked_responses: responses.RequestsMock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    waits: List[float] = []
+    monkeypatch.setattr(lib, "wait_for", waits.append)
+    for _ in range(2):
+        mocked_responses.add(method=responses.POST, url=FAKE_GRAPHQL_API, status=429)
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": {"ok": True}}
+    )
+
+    budget = get_budget(FAKE_GRAPHQL_API)
+    assert run_query(FAKE_GRAPHQL_API, query="{ok}", budget=budget) == {"ok": True}
+    assert waits == [THROTTLED_BACKOFF, THROTTLED_BACKOFF * 2]
+
+
+def test_adapter_lowers_page_size(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    for i, has_next_page in enumerate([True, False]):
+        mocked_responses.add(
+            method=responses.POST,
+            url=FAKE_GRAPHQL_API,
+            json={
+                "data": {
+                    "allPeople": {
+                        "edges": [{"node": {"name": "Luke"}}] * (4 - 2 * i),
+                        "pageInfo": {
+                            "endCursor": f"c{i}",
+                            "hasNextPage": has_next_page,
+                        },
+                    }
+                },
+                "extensions": _cost(800, 200, restore_rate=10_000),
+            },
+        )
+
+    adapter = GraphQLAdapter(
+        table="allPeople",
+        include=[],
+        query_args={},
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+    )
+    rows = list(adapter.get_data({}, [], requested_columns=["name"]))
+    assert len(rows) == 6
+
+    # Four rows cost 800, so the next page asks for what 500 affords
+    assert "first" not in get_request_query(mocked_responses.calls[1])
+    assert "first: 2" in get_request_query(mocked_responses.calls[2])
@@ -1,8 +1,17 @@
-from sqlalchemy import inspect, text
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+import responses
+from sqlalchemy import INTEGER, create_engine, inspect, text
 from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import NoSuchTableError
 
 from graphqldb.dialect import APSWGraphQLDialect
 
+from .conftest import FAKE_GRAPHQL_API, FAKE_GRAPHQL_DB_URL, get_request_query
+
 
 def test_create_engine(swapi_engine: Engine) -> None:
     pass
@@ -120,3 +129,273 @@ def test_create_connect_args():
     assert kwargs_graphql["bearer_token"] == "abcd"
     assert kwargs_graphql["pagination_relay"] is True
     assert kwargs_graphql["list_queries"] == ["abcd"]
+    assert kwargs_graphql["table_plans"] == dialect.table_plans.id
+    assert kwargs["direct_execution"] is True
+    assert kwargs["cancel_dir"] is None
+
+    dialect = APSWGraphQLDialect(cross_process_cancel=True, cancel_dir="/cancel")
+    _, kwargs = dialect.create_connect_args(url_http)
+    assert kwargs["cancel_dir"] == "/cancel"
+
+
+def test_query_id_lookup(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """An id-equality constraint is served by the singular field, not a scan."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}}},
+    )
+
+    with fake_engine.connect() as connection:
+        result = connection.execute(text("select name from allPeople where id = 'a'"))
+        assert list(result) == [("A",)]
+
+    assert len(mocked_responses.calls) == 2
+    assert "person(id:" in get_request_query(mocked_responses.calls[1])
+
+
+def test_query_aggregate_pushdown(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Configured aggregate statements are answered with one aggregate request."""
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL,
+        list_queries=["users"],
+        aggregate_queries={"users": "users_aggregate"},
+    )
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"g0": {"aggregate": {"a0": 42}}}},
+    )
+
+    with engine.connect() as connection:
+        result = connection.execute(text("select count(*) as total from users"))
+        assert list(result) == [(42,)]
+
+    assert len(mocked_responses.calls) == 2
+    assert "users_aggregate" in get_request_query(mocked_responses.calls[1])
+
+
+def test_query_aggregate_fallback(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Unsupported aggregate shapes fall back to scanning through SQLite."""
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL,
+        list_queries=["users"],
+        aggregate_queries={"users": "users_aggregate"},
+    )
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"users": [{"age": 1}, {"age": 2}, {"age": 2}]}},
+    )
+
+    with engine.connect() as connection:
+        result = connection.execute(
+            text("select age, count(*) from users group by age having count(*) > 1")
+        )
+        assert list(result) == [(2, 2)]
+
+
+def test_query_direct_in_lookup(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """An ``id IN (...)`` list is fetched with one batched lookup request."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}, "n1": {"id": "b", "name": "B"}}},
+    )
+
+    with fake_engine.connect() as connection:
+        result = connection.execute(
+            text("select name from allPeople where id in ('a', :b) order by name"),
+            {"b": "b"},
+        )
+        assert list(result) == [("A",), ("B",)]
+
+    assert len(mocked_responses.calls) == 2
+    query = get_request_query(mocked_responses.calls[1])
+    assert 'n0: person(id: "a")' in query
+    assert 'n1: person(id: "b")' in query
+
+
+def test_query_direct_not_graphql_table(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Tables the API doesn't have are left to SQLite."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    with fake_engine.connect() as connection:
+        result = connection.execute(text("select name from sqlite_master"))
+        assert list(result) == []
+
+        connection.execute(text("create temp table numbers (x int)"))
+        connection.execute(text("insert into numbers values (1)"))
+        assert list(connection.execute(text("select x from numbers"))) == [(1,)]
+
+    # The schema was introspected once to tell
+    assert len(mocked_responses.calls) == 1
+
+
+def test_query_requested_columns(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """The virtual table only fetches the columns SQLite asks for."""
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, direct_execution=False)
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={
+            "data": {
+                "allPeople": {
+                    "edges": [{"node": {"name": "A"}}, {"node": {"name": "B"}}],
+                    "pageInfo": {"endCursor": "c0", "hasNextPage": False},
+                }
+            }
+        },
+    )
+
+    with engine.connect() as connection:
+        result = connection.execute(
+            text("select upper(name) from allPeople order by 1 desc")
+        )
+        assert list(result) == [("B",), ("A",)]
+
+    query = get_request_query(mocked_responses.calls[1])
+    assert "name" in query
+    assert "id" not in query
+
+
+def test_query_snapshot(
+    tmp_path: Path,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Tables with a snapshot are fetched once and then served locally."""
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL,
+        list_queries=["users"],
+        snapshots={"users": {"path": str(tmp_path / "users.db")}},
+    )
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"users": [{"id": "1", "age": 30}, {"id": "2", "age": 5}]}},
+    )
+
+    with engine.connect() as connection:
+        result = connection.execute(text("select id from users where age > 10"))
+        assert list(result) == [("1",)]
+        result = connection.execute(text("select count(*) from users"))
+        assert list(result) == [(2,)]
+
+    # Introspection and the copy; the second statement needs neither
+    assert len(mocked_responses.calls) == 2
+
+
+def test_table_plans_shared_by_threads(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Connections in other threads share the table plans of their engine."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}}},
+    )
+
+    barrier = threading.Barrier(4)
+    results: List[Any] = []
+
+    def query() -> None:
+        with fake_engine.connect() as connection:
+            barrier.wait()
+            result = connection.execute(
+                text("select name from allPeople where id = 'a'")
+            )
+            results.append(list(result))
+
+    threads = [threading.Thread(target=query) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [[("A",)]] * 4
+    # One introspection, then a lookup per statement
+    assert len(mocked_responses.calls) == 5
+    assert all(
+        "person(id:" in get_request_query(call) for call in mocked_responses.calls[1:]
+    )
+
+
+def test_reflection_one_introspection(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    """Tables are reflected (and then queried) from one introspection."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}}},
+    )
+
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, list_queries=["users"])
+    insp = inspect(engine)
+    # Neither the lookup nor the aggregate field is a table
+    assert insp.get_table_names() == ["allPeople", "users"]
+    assert insp.has_table("allPeople")
+    assert not insp.has_table("nope")
+    assert [c["name"] for c in insp.get_columns("allPeople")] == ["id", "name"]
+    assert [c["name"] for c in insp.get_columns("users")] == ["id", "status", "age"]
+    age = insp.get_columns("users")[2]["type"]
+    assert isinstance(age, INTEGER)
+    with pytest.raises(NoSuchTableError):
+        insp.get_columns("nope")
+    assert len(mocked_responses.calls) == 1
+
+    # The adapters plan from the same schema
+    with engine.connect() as connection:
+        result = connection.execute(text("select name from allPeople where id = 'a'"))
+        assert list(result) == [("A",)]
+    assert len(mocked_responses.calls) == 2
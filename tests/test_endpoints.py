@@ -0,0 +1,151 @@
+import time
+from typing import Any, Dict, Generator, List
+
+import pytest
+import requests
+import responses
+from sqlalchemy import create_engine, text
+
+from graphqldb import events
+from graphqldb.endpoints import (
+    LEAST_OUTSTANDING,
+    EndpointPool,
+    clear_pools,
+    get_endpoints,
+)
+
+from .conftest import FAKE_GRAPHQL_API, FAKE_GRAPHQL_DB_URL
+
+# -----------------------------------------------------------------------------
+
+REPLICA_API = "https://replica.example.com/graphql"
+
+
+@pytest.fixture(autouse=True)
+def shared_pools() -> Generator[None, None, None]:
+    clear_pools()
+    yield
+    clear_pools()
+
+
+def _ok(mocked_responses: responses.RequestsMock, url: str) -> None:
+    mocked_responses.add(method=responses.POST, url=url, json={"data": {"ok": url}})
+
+
+def test_round_robin(mocked_responses: responses.RequestsMock) -> None:
+    _ok(mocked_responses, FAKE_GRAPHQL_API)
+    _ok(mocked_responses, REPLICA_API)
+
+    pool = EndpointPool([FAKE_GRAPHQL_API, REPLICA_API])
+    results = [pool.run_query(query="{ok}")["ok"] for _ in range(4)]
+    assert results == [FAKE_GRAPHQL_API, REPLICA_API] * 2
+
+
+def test_least_outstanding() -> None:
+    pool = EndpointPool([FAKE_GRAPHQL_API, REPLICA_API], LEAST_OUTSTANDING)
+    first = pool.acquire(set())
+    # The other endpoint has nothing in flight
+    second = pool.acquire(set())
+    assert second is not first
+    pool.release(second, ok=True)
+    assert pool.acquire(set()) is second
+
+
+def test_failover(mocked_responses: responses.RequestsMock) -> None:
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, body=requests.ConnectionError()
+    )
+    _ok(mocked_responses, REPLICA_API)
+
+    recorded: List[events.QueryEvent] = []
+    events.add_listener(recorded.append)
+    try:
+        pool = EndpointPool([FAKE_GRAPHQL_API, REPLICA_API])
+        assert pool.run_query(query="{ok}") == {"ok": REPLICA_API}
+    finally:
+        events.remove_listener(recorded.append)
+
+    assert [e.name for e in recorded] == ["request", "retry", "request"]
+    assert isinstance(recorded[1].error, requests.ConnectionError)
+
+
+def test_no_failover_on_query_errors(mocked_responses: responses.RequestsMock) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"errors": [{"message": "bad"}]},
+    )
+
+    pool = EndpointPool([FAKE_GRAPHQL_API, REPLICA_API])
+    with pytest.raises(ValueError, match="bad"):
+        pool.run_query(query="{ok}")
+    assert len(mocked_responses.calls) == 1
+    assert pool.endpoints[0].failures == 0
+
+
+def test_ejection(mocked_responses: responses.RequestsMock) -> None:
+    mocked_responses.add(method=responses.POST, url=FAKE_GRAPHQL_API, status=503)
+    _ok(mocked_responses, REPLICA_API)
+
+    pool = EndpointPool(
+        [FAKE_GRAPHQL_API, REPLICA_API], max_failures=1, ejection_time=0.05
+    )
+    for _ in range(3):
+        assert pool.run_query(query="{ok}") == {"ok": REPLICA_API}
+    # Ejected after the first failure
+    assert len(mocked_responses.calls) == 4
+
+    # Then admitted again on trial
+    time.sleep(0.05)
+    mocked_responses.replace(
+        responses.POST, FAKE_GRAPHQL_API, json={"data": {"ok": FAKE_GRAPHQL_API}}
+    )
+    results = {pool.run_query(query="{ok}")["ok"] for _ in range(2)}
+    assert results == {FAKE_GRAPHQL_API, REPLICA_API}
+    assert pool.endpoints[0].ejected_until is None
+
+
+def test_all_endpoints_down(mocked_responses: responses.RequestsMock) -> None:
+    for url in [FAKE_GRAPHQL_API, REPLICA_API]:
+        mocked_responses.add(method=responses.POST, url=url, status=502)
+
+    pool = EndpointPool([FAKE_GRAPHQL_API, REPLICA_API])
+    with pytest.raises(requests.HTTPError):
+        pool.run_query(query="{ok}")
+    assert len(mocked_responses.calls) == 2
+
+
+def test_get_endpoints() -> None:
+    assert get_endpoints(FAKE_GRAPHQL_API, None) == [FAKE_GRAPHQL_API]
+    assert get_endpoints(FAKE_GRAPHQL_API, [REPLICA_API, FAKE_GRAPHQL_API]) == [
+        FAKE_GRAPHQL_API,
+        REPLICA_API,
+    ]
+
+
+def test_engine_endpoints(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Statements are served by a replica while the URL's endpoint is down."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, body=requests.ConnectionError()
+    )
+    mocked_responses.add(
+        method=responses.POST, url=REPLICA_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=REPLICA_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}}},
+    )
+
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, endpoints=[REPLICA_API])
+    with engine.connect() as connection:
+        result = connection.execute(text("select name from allPeople where id = 'a'"))
+        assert list(result) == [("A",)]
+
+
+def test_engine_load_balancing_unknown() -> None:
+    with pytest.raises(ValueError, match="load balancing"):
+        create_engine(FAKE_GRAPHQL_DB_URL, load_balancing="random")
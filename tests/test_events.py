@@ -0,0 +1,112 @@
+from typing import Any, Dict, Iterator, List
+
+import pytest
+import responses
+
+from graphqldb import events
+from graphqldb.adapter import GraphQLAdapter
+from graphqldb.events import QueryEvent
+
+from .conftest import FAKE_GRAPHQL_API
+
+# -----------------------------------------------------------------------------
+
+
+@pytest.fixture
+def recorded() -> Iterator[List[QueryEvent]]:
+    recorded: List[QueryEvent] = []
+    events.add_listener(recorded.append)
+    yield recorded
+    events.remove_listener(recorded.append)
+
+
+def test_span_without_listeners() -> None:
+    with events.span(events.PAGE, "t") as event:
+        assert event is None
+    events.emit(events.CACHE_HIT, "t")
+
+
+def test_span(recorded: List[QueryEvent]) -> None:
+    with pytest.raises(KeyError):
+        with events.span(events.PAGE, "t") as event:
+            assert event is not None
+            assert events.get_current_event() is event
+            raise KeyError("x")
+
+    assert events.get_current_event() is None
+    assert len(recorded) == 1
+    assert recorded[0].name == events.PAGE
+    assert isinstance(recorded[0].error, KeyError)
+    assert recorded[0].duration > 0
+
+
+def test_adapter_events(
+    recorded: List[QueryEvent],
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    for page in range(2):
+        mocked_responses.add(
+            method=responses.POST,
+            url=FAKE_GRAPHQL_API,
+            json={
+                "data": {
+                    "allPeople": {
+                        "edges": [{"node": {"name": f"p{page}"}}] * (page + 1),
+                        "pageInfo": {"endCursor": f"c{page}", "hasNextPage": not page},
+                    }
+                }
+            },
+        )
+
+    adapter = GraphQLAdapter(
+        table="allPeople",
+        include=[],
+        query_args={},
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+    )
+    assert len(list(adapter.get_data({}, [], requested_columns=["name"]))) == 3
+
+    assert [(e.name, e.rows, e.cursor) for e in recorded] == [
+        (events.INTROSPECTION, None, None),
+        (events.PAGE, 1, None),
+        (events.ROWS, 1, None),
+        (events.PAGE, 2, "c0"),
+        (events.ROWS, 2, None),
+    ]
+    introspection = recorded[0]
+    assert introspection.table == "allPeople"
+    assert introspection.request_bytes > 0
+    assert introspection.response_bytes > 0
+    assert introspection.duration >= introspection.request_duration > 0
+
+
+def test_opentelemetry() -> None:
+    pytest.importorskip("opentelemetry.sdk")
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+        InMemorySpanExporter,
+    )
+
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    listener = events.enable_opentelemetry(provider)
+    try:
+        with events.span(events.PAGE, "t") as event:
+            assert event is not None
+            event.rows = 5
+    finally:
+        events.remove_listener(listener)
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "graphql.page"
+    assert span.attributes is not None
+    assert span.attributes["graphql.rows"] == 5
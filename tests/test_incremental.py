@@ -0,0 +1,220 @@
+import json
+from typing import Any, Dict, List
+
+import pytest
+import responses
+from sqlalchemy import create_engine, text
+
+from graphqldb import events
+from graphqldb.adapter import GraphQLAdapter
+from graphqldb.incremental import IncrementalResult, get_boundary, iter_parts
+
+from .conftest import FAKE_GRAPHQL_API, FAKE_GRAPHQL_DB_URL, get_request_query
+
+# -----------------------------------------------------------------------------
+
+
+def _multipart(payloads: List[Dict[str, Any]], boundary: str = "-") -> bytes:
+    parts = [
+        f"\r\n--{boundary}\r\nContent-Type: application/json; charset=utf-8\r\n\r\n"
+        + json.dumps(payload)
+        for payload in payloads
+    ]
+    return ("".join(parts) + f"\r\n--{boundary}--\r\n").encode()
+
+
+def _add_multipart(
+    mocked_responses: responses.RequestsMock, payloads: List[Dict[str, Any]]
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        body=_multipart(payloads),
+        content_type='multipart/mixed; boundary="-"',
+    )
+
+
+@pytest.mark.parametrize(
+    "content_type, boundary",
+    [
+        ('multipart/mixed; boundary="graphql"', "graphql"),
+        ("multipart/mixed;deferSpec=20220824", "-"),
+        ("application/json", None),
+    ],
+)
+def test_get_boundary(content_type: str, boundary: str) -> None:
+    assert get_boundary(content_type) == boundary
+
+
+def test_iter_parts() -> None:
+    body = _multipart([{"a": 1}, {"b": "--"}], boundary="graphql")
+    # However the response is chunked
+    for size in [1, 7, len(body)]:
+        chunks = [body[i : i + size] for i in range(0, len(body), size)]
+        assert [json.loads(p) for p in iter_parts(chunks, "graphql")] == [
+            {"a": 1},
+            {"b": "--"},
+        ]
+
+
+def test_incremental_result() -> None:
+    result = IncrementalResult()
+    result.apply({"data": {"users": [{"id": "1"}]}, "hasNext": True})
+    result.apply(
+        {
+            "incremental": [
+                {"items": [{"id": "2"}, {"id": "3"}], "path": ["users", 1]},
+                {"data": {"tags": []}, "path": ["users", 0]},
+            ],
+            "hasNext": True,
+        }
+    )
+    # The earlier format
+    result.apply({"data": {"tags": ["a"]}, "path": ["users", 1], "hasNext": False})
+
+    assert result.data == {
+        "users": [{"id": "1", "tags": []}, {"id": "2", "tags": ["a"]}, {"id": "3"}]
+    }
+    assert not result.has_next
+
+    with pytest.raises(ValueError, match="boom"):
+        result.apply({"incremental": [{"errors": ["boom"], "path": ["users", 0]}]})
+
+
+def test_query_list_stream(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    """Rows of a streamed list are yielded as each increment arrives."""
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL,
+        list_queries=["users"],
+        incremental_delivery=True,
+        direct_execution=False,
+    )
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    _add_multipart(
+        mocked_responses,
+        [
+            {"data": {"users": []}, "hasNext": True},
+            {
+                "incremental": [{"items": [{"age": 30}], "path": ["users", 0]}],
+                "hasNext": True,
+            },
+            {
+                "incremental": [{"items": [{"age": 5}], "path": ["users", 1]}],
+                "hasNext": False,
+            },
+        ],
+    )
+
+    recorded: List[events.QueryEvent] = []
+    events.add_listener(recorded.append)
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("select age from users"))
+            assert list(result) == [(30,), (5,)]
+    finally:
+        events.remove_listener(recorded.append)
+
+    query = get_request_query(mocked_responses.calls[1])
+    assert "users @stream(initialCount: 0){" in query
+    accept = mocked_responses.calls[1].request.headers["Accept"]
+    assert accept.startswith("multipart/mixed")
+    assert [e.rows for e in recorded if e.name == "page"] == [0, 1, 1]
+
+
+def test_query_connection_defer(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    """Nodes wait for their deferred list children, and a LIMIT stops early."""
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, incremental_delivery=True)
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    _add_multipart(
+        mocked_responses,
+        [
+            {
+                "data": {
+                    "allPeople": {
+                        "edges": [
+                            {"node": {"name": "A", "homeworld": {}}},
+                            {"node": {"name": "B", "homeworld": None}},
+                        ],
+                        "pageInfo": {"endCursor": "c", "hasNextPage": True},
+                    }
+                },
+                "hasNext": True,
+            },
+            {
+                "incremental": [
+                    {
+                        "data": {"tags": [{"name": "t"}]},
+                        "path": ["allPeople", "edges", 0, "node", "homeworld"],
+                    }
+                ],
+                "hasNext": True,
+            },
+        ],
+    )
+
+    with engine.connect() as connection:
+        result = connection.execute(
+            text(
+                "select name, homeworld__tags__name "
+                'from "allPeople?include=homeworld__tags" limit 2'
+            )
+        )
+        assert list(result) == [("A", "t"), ("B", None)]
+
+    query = get_request_query(mocked_responses.calls[1])
+    assert "edges @stream(initialCount: 2){" in query
+    assert "homeworld {... @defer {tags {name}}}" in query
+    # The LIMIT was met without another page
+    assert len(mocked_responses.calls) == 2
+
+
+def test_connection_stream_limit(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    """Streamed nodes past the LIMIT are dropped, with the rest of the response."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    _add_multipart(
+        mocked_responses,
+        [
+            {
+                "data": {
+                    "allPeople": {
+                        "edges": [{"node": {"name": name}} for name in "ABC"],
+                        "pageInfo": {"endCursor": "c", "hasNextPage": True},
+                    }
+                },
+                "hasNext": True,
+            },
+            {
+                "incremental": [
+                    {
+                        "items": [{"node": {"name": "D"}}],
+                        "path": ["allPeople", "edges", 3],
+                    }
+                ],
+                "hasNext": False,
+            },
+        ],
+    )
+
+    adapter = GraphQLAdapter(
+        table="allPeople",
+        include=[],
+        query_args={},
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+        incremental_delivery=True,
+    )
+    pages = adapter.get_pages(["name"], limit=2)
+    assert list(pages) == [[{"name": "A"}, {"name": "B"}]]
+    assert len(mocked_responses.calls) == 2
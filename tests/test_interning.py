@@ -0,0 +1,40 @@
+import json
+
+from graphqldb.interning import DictionaryEncoder
+
+# -----------------------------------------------------------------------------
+
+
+def _new(value: str) -> str:
+    # Decoded anew, as from a response
+    return json.loads(json.dumps(value))
+
+
+def test_dictionary_encoder() -> None:
+    encoder = DictionaryEncoder(["status"])
+    first = encoder.encode({"status": _new("active"), "name": _new("Luke")})
+    second = encoder.encode({"status": _new("active"), "name": _new("Luke")})
+
+    assert first["status"] is second["status"]
+    # Only the given columns are interned
+    assert first["name"] is not second["name"]
+    # Other values are left as they are
+    assert encoder.encode({"status": None, "age": 1}) == {"status": None, "age": 1}
+
+    # Rows are encoded in place
+    row = {"status": _new("active")}
+    assert encoder.encode(row) is row
+    assert row["status"] is first["status"]
+
+
+def test_dictionary_encoder_cap() -> None:
+    encoder = DictionaryEncoder(["id"], max_distinct=2)
+    values = encoder.encode_column(
+        "id", [_new(v) for v in ["id-a", "id-b", "id-c", "id-a"]]
+    )
+    again = encoder.encode_column("id", [_new(v) for v in ["id-a", "id-c"]])
+
+    assert again[0] is values[0] and values[3] is values[0]
+    # Past the cap, values aren't added
+    assert again[1] is not values[2]
+    assert len(encoder.dictionaries["id"]) == 2
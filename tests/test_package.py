@@ -0,0 +1,25 @@
+import subprocess  # noqa: S404
+import sys
+
+import graphqldb
+
+# -----------------------------------------------------------------------------
+
+
+def test_exports() -> None:
+    for name in graphqldb.__all__:
+        assert callable(getattr(graphqldb, name))
+        assert name in dir(graphqldb)
+
+
+def test_import_is_lazy() -> None:
+    # In a fresh interpreter, as the tests have imported everything already
+    code = (
+        "import sys; from graphqldb import events; "
+        "print(' '.join(m for m in ['graphqldb.dialect', 'shillelagh', 'sqlalchemy']"
+        " if m in sys.modules))"
+    )
+    output = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout
+    assert output.strip() == ""
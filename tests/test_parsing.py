@@ -0,0 +1,59 @@
+import pytest
+from shillelagh.fields import Integer, ISODate, ISODateTime, ISOTime, String
+
+from graphqldb.adapter import TypeInfo, parse_gql_type
+from graphqldb.parsing import get_parser, parse_column
+
+# -----------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "2023-01-02T03:04:05",
+        "2023-01-02T03:04:05Z",
+        "2023-01-02T03:04:05.123456+05:30",
+        # Falls back to dateutil before Python 3.11
+        "2023-01-02T03:04:05.12Z",
+        "2023-01-02",
+        "2023-W01-1",
+        "not a timestamp",
+        None,
+    ],
+)
+def test_parse_datetime(value) -> None:
+    """The fast path agrees with shillelagh's parser."""
+    assert get_parser(ISODateTime())(value) == ISODateTime().parse(value)
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        (ISODate(), "2023-01-02"),
+        (ISODate(), "2023-13-02"),
+        (ISOTime(), "03:04:05.123"),
+        (ISOTime(), None),
+    ],
+)
+def test_parse_date_time(field, value) -> None:
+    assert get_parser(field)(value) == field.parse(value)
+
+
+def test_parse_column() -> None:
+    values = ["2023-01-02T00:00:00Z", None, "2023-01-02T00:00:00Z"]
+    parsed = parse_column(ISODateTime(), values)
+    assert parsed == [ISODateTime().parse(v) for v in values]
+    # Repeated values are parsed once
+    assert parsed[0] is parsed[2]
+
+    assert parse_column(Integer(), [1, None]) == [1, None]
+
+
+def test_parse_gql_type_shared() -> None:
+    """Tables share one field instance per scalar type."""
+    type_info = TypeInfo(name="DateTime", ofType=None, kind="SCALAR")
+    assert parse_gql_type(type_info) is parse_gql_type(type_info)
+    assert (
+        type(parse_gql_type(TypeInfo(name="String", ofType=None, kind="SCALAR")))
+        is String
+    )
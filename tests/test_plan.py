@@ -0,0 +1,156 @@
+from typing import Any, Dict
+
+import pytest
+import responses
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+from graphqldb import explain
+from graphqldb.sql import UnsupportedStatement
+
+from .conftest import FAKE_GRAPHQL_API, FAKE_GRAPHQL_DB_URL
+
+# -----------------------------------------------------------------------------
+
+
+def test_explain_connection_limit(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """A bare LIMIT is pushed down as ``first``, without requesting any data."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    plan = explain(fake_engine, "select name from allPeople limit 5")
+
+    assert plan.strategy == "connection"
+    assert plan.direct
+    assert plan.columns == ["name"]
+    assert len(plan.documents) == 1
+    assert "allPeople(first: 5)" in plan.documents[0]
+    assert plan.pushed_down == ["LIMIT 5"]
+    assert plan.local == []
+    assert plan.page_size == 5
+    assert plan.estimated_requests == 1
+    assert plan.estimated_rows == 5
+    assert not plan.full_scan
+
+    # Only the introspection
+    assert len(mocked_responses.calls) == 1
+
+
+def test_explain_full_scan(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Predicates the server can't answer are evaluated locally over a scan."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    plan = explain(
+        fake_engine,
+        "select id from allPeople where name = ? order by id desc limit 2",
+        ["A"],
+    )
+
+    assert plan.columns == ["id", "name"]
+    assert plan.pushed_down == []
+    assert plan.local == ["name = 'A'", "ORDER BY id DESC", "LIMIT 2"]
+    assert plan.estimated_requests is None
+    assert plan.full_scan
+
+
+def test_explain_sql(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """``EXPLAIN <statement>`` returns the plan as (key, value) rows."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    with fake_engine.connect() as connection:
+        result = connection.execute(
+            text("explain select name from allPeople where id in ('a', 'b')")
+        )
+        assert list(result.keys()) == ["key", "value"]
+        rows = list(result)
+
+    values: Dict[str, Any] = {key: value for key, value in rows}
+    assert values["strategy"] == "lookup"
+    assert values["pushed_down"] == "id IN ('a', 'b')"
+    assert values["estimated_requests"] == "1"
+    assert values["full_scan"] == "False"
+    documents = [value for key, value in rows if key == "document"]
+    assert len(documents) == 1
+    assert 'n1: person(id: "b")' in documents[0]
+
+    assert len(mocked_responses.calls) == 1
+
+
+def test_explain_not_direct(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Through SQLite, ids are looked up one at a time and the rest is local."""
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, direct_execution=False)
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    plan = explain(
+        engine, "select name from allPeople where id in ('a', 'b') order by name"
+    )
+
+    assert not plan.direct
+    assert plan.strategy == "lookup"
+    assert len(plan.documents) == 2
+    assert plan.estimated_requests == 2
+    assert plan.local == ["ORDER BY name"]
+
+
+def test_explain_aggregate(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL,
+        list_queries=["users"],
+        aggregate_queries={"users": "users_aggregate"},
+    )
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    plan = explain(engine, "select count(*) as total from users where age > 10")
+
+    assert plan.strategy == "aggregate"
+    assert plan.columns == ["age"]
+    assert plan.pushed_down == ["age > 10", "count(*)"]
+    assert "users_aggregate(where:" in plan.documents[0]
+    assert plan.estimated_requests == 1
+    assert plan.estimated_rows == 1
+
+
+def test_explain_not_graphql_table(
+    fake_engine: Engine,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """Other tables are explained by SQLite."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    with fake_engine.connect() as connection:
+        result = connection.execute(text("explain select name from sqlite_master"))
+        assert list(result.keys())[:2] == ["addr", "opcode"]
+        assert list(result)[0][:2] == (0, "Init")
+
+    with pytest.raises(UnsupportedStatement, match="sqlite_master"):
+        explain(fake_engine, "select name from sqlite_master")
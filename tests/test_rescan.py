@@ -0,0 +1,182 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Tuple
+
+import pytest
+import responses
+from sqlalchemy import create_engine, text
+
+from graphqldb import events
+from graphqldb.rescan import ScanBuffers
+
+from .conftest import FAKE_GRAPHQL_API, FAKE_GRAPHQL_DB_URL
+
+# -----------------------------------------------------------------------------
+
+COLUMNS = frozenset(["id"])
+
+
+def _scan(rows: List[Dict[str, Any]], scans: List[int]) -> Iterator[Dict[str, Any]]:
+    scans.append(1)
+    yield from rows
+
+
+def test_scan_buffers_replay() -> None:
+    buffers = ScanBuffers()
+    rows = [{"id": "a"}, {"id": "b"}]
+    scans: List[int] = []
+
+    for _ in range(3):
+        assert list(buffers.scan("key", COLUMNS, lambda: _scan(rows, scans))) == rows
+    assert len(scans) == 1
+    assert buffers.memory > 0
+
+    buffers.close()
+    assert buffers.memory == 0
+
+
+def test_scan_buffers_partial_scan() -> None:
+    buffers = ScanBuffers()
+    rows = [{"id": "a"}, {"id": "b"}]
+    scans: List[int] = []
+
+    partial = buffers.scan("key", COLUMNS, lambda: _scan(rows, scans))
+    assert next(partial) == rows[0]
+    partial.close()
+    assert buffers.memory == 0
+
+    assert list(buffers.scan("key", COLUMNS, lambda: _scan(rows, scans))) == rows
+    assert len(scans) == 2
+    assert ("key", COLUMNS) in buffers.buffers
+
+
+def test_scan_buffers_spill() -> None:
+    """Past the budget, a table scanned again is kept in a file."""
+    buffers = ScanBuffers(max_memory=0)
+    rows: List[Dict[str, Any]] = [
+        {"id": "a", "tags": ["x"]},
+        {"id": "b", "tags": None},
+    ]
+    scans: List[int] = []
+
+    # Too big to keep the first time
+    assert list(buffers.scan("key", COLUMNS, lambda: _scan(rows, scans))) == rows
+    assert ("key", COLUMNS) not in buffers.buffers
+    # Then spilled
+    assert list(buffers.scan("key", COLUMNS, lambda: _scan(rows, scans))) == rows
+    path = buffers.buffers[("key", COLUMNS)].path
+    assert path is not None and os.path.exists(path)
+    assert list(buffers.scan("key", COLUMNS, lambda: _scan(rows, scans))) == rows
+    assert len(scans) == 2
+
+    buffers.close()
+    assert not os.path.exists(path)
+
+
+# -----------------------------------------------------------------------------
+
+
+def _callback(request: Any) -> Tuple[int, Dict[str, str], str]:
+    query = json.loads(request.body)["query"]
+    if "allPeople" in query:
+        data: Dict[str, Any] = {
+            "allPeople": {
+                "edges": [{"node": {"name": name}} for name in "ABC"],
+                "pageInfo": {"endCursor": "c", "hasNextPage": False},
+            }
+        }
+    else:
+        data = {"users": [{"age": 30}, {"age": 5}]}
+    return 200, {}, json.dumps({"data": data})
+
+
+@pytest.mark.parametrize("rescan_buffer_size, requests", [(None, 1 + 1 + 3), (1000, 3)])
+def test_join_rescans(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+    rescan_buffer_size: Any,
+    requests: int,
+) -> None:
+    """The inner table of a join is requested once per statement."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add_callback(
+        method=responses.POST, url=FAKE_GRAPHQL_API, callback=_callback
+    )
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL,
+        list_queries=["users"],
+        rescan_buffer_size=rescan_buffer_size,
+    )
+
+    with engine.connect() as connection:
+        result = connection.execute(
+            text("select p.name, u.age from allPeople p cross join users u")
+        )
+        assert len(list(result)) == 6
+    assert len(mocked_responses.calls) == requests
+
+
+def test_prefetch_join(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    """The tables of a join are requested at the same time."""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def callback(request: Any) -> Tuple[int, Dict[str, str], str]:
+        # Both scans have to be in flight for either to be answered
+        barrier.wait()
+        return _callback(request)
+
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add_callback(
+        method=responses.POST, url=FAKE_GRAPHQL_API, callback=callback
+    )
+    engine = create_engine(FAKE_GRAPHQL_DB_URL, list_queries=["users"], prefetch=True)
+
+    recorded: List[events.QueryEvent] = []
+    events.add_listener(recorded.append)
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(
+                text("select p.name, u.age from allPeople p cross join users u")
+            )
+            assert len(list(result)) == 6
+    finally:
+        events.remove_listener(recorded.append)
+
+    assert len(mocked_responses.calls) == 3
+    # SQLite's first scan of each table read the prefetched rows
+    assert {e.table for e in recorded if e.name == "cache_hit"} == {
+        "allPeople",
+        "users",
+    }
+
+
+def test_single_table_not_buffered(
+    mocked_responses: responses.RequestsMock, fake_introspection: Dict[str, Any]
+) -> None:
+    """Only statements reading more than one table keep their scans."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add_callback(
+        method=responses.POST, url=FAKE_GRAPHQL_API, callback=_callback
+    )
+    engine = create_engine(
+        FAKE_GRAPHQL_DB_URL, list_queries=["users"], direct_execution=False
+    )
+    connection = engine.raw_connection()
+    cursor = connection.cursor()
+
+    cursor.execute("select name from allPeople")
+    assert len(cursor.fetchall()) == 3
+    assert cursor.scope.buffers is None
+
+    cursor.execute("select p.name, u.age from allPeople p cross join users u")
+    assert cursor.scope.buffers is not None
+    connection.close()
@@ -0,0 +1,87 @@
+from typing import Any, Dict, Generator
+
+import pytest
+import responses
+from sqlalchemy import create_engine, text
+
+from graphqldb.schema import Schema, TypeRef, clear_schemas, get_schema
+
+from .conftest import FAKE_GRAPHQL_API, FAKE_GRAPHQL_DB_URL
+
+# -----------------------------------------------------------------------------
+
+
+@pytest.fixture(autouse=True)
+def shared_schemas() -> Generator[None, None, None]:
+    clear_schemas()
+    yield
+    clear_schemas()
+
+
+def test_schema_from_introspection(fake_introspection: Dict[str, Any]) -> None:
+    schema = Schema.from_introspection(fake_introspection)
+
+    all_people = schema.query_fields["allPeople"]
+    assert all_people.type == TypeRef("OBJECT", "PeopleConnection")
+    assert set(all_people.args) == {"after", "first"}
+
+    person = schema.types["Person"]
+    assert person.kind == "OBJECT"
+    assert person.fields is not None
+    assert list(person.fields)[:2] == ["id", "name"]
+    assert schema.get_fields("Missing") is None
+
+    # Equal type references are one object
+    planet_fields = schema.get_fields("Planet")
+    assert planet_fields is not None
+    assert person.fields["name"].type is planet_fields["name"].type
+
+
+def test_type_ref_named_type() -> None:
+    ref = TypeRef("NON_NULL", None, TypeRef("LIST", None, TypeRef("OBJECT", "Tag")))
+    assert ref.named_type == "Tag"
+    assert TypeRef("LIST").named_type is None
+
+
+def test_get_schema_ttl(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    """With a ttl, one introspection serves every caller."""
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+
+    schema = get_schema(FAKE_GRAPHQL_API, ttl=60)
+    assert get_schema(FAKE_GRAPHQL_API, ttl=60) is schema
+    assert len(mocked_responses.calls) == 1
+
+    # Without one, or with another token, it is introspected again
+    get_schema(FAKE_GRAPHQL_API)
+    get_schema(FAKE_GRAPHQL_API, "token", ttl=60)
+    assert len(mocked_responses.calls) == 3
+
+
+def test_engines_share_schema(
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    mocked_responses.add(
+        method=responses.POST, url=FAKE_GRAPHQL_API, json={"data": fake_introspection}
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"n0": {"id": "a", "name": "A"}}},
+    )
+
+    for _ in range(2):
+        engine = create_engine(FAKE_GRAPHQL_DB_URL, schema_ttl=60)
+        with engine.connect() as connection:
+            result = connection.execute(
+                text("select name from allPeople where id = 'a'")
+            )
+            assert list(result) == [("A",)]
+
+    # One introspection, then a lookup per statement
+    assert len(mocked_responses.calls) == 3
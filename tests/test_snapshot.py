@@ -0,0 +1,171 @@
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+import responses
+
+from graphqldb.adapter import GraphQLAdapter
+from graphqldb.snapshot import Snapshot
+
+from .conftest import FAKE_GRAPHQL_API, get_request_query
+
+# -----------------------------------------------------------------------------
+
+
+def test_snapshot_write_and_read(tmp_path: Path) -> None:
+    path = str(tmp_path / "t.db")
+    snapshot = Snapshot(path, ["id", "name"], key="id")
+    assert not snapshot.is_populated()
+    assert snapshot.is_stale(None)
+
+    with snapshot.write(replace=True) as writer:
+        writer.insert([{"id": "a", "name": "A"}, {"id": "b", "name": None}])
+        writer.cursor = "c0"
+
+    assert snapshot.is_populated()
+    assert not snapshot.is_stale(None)
+    assert snapshot.is_stale(0)
+    assert snapshot.get_meta()["cursor"] == "c0"
+    assert list(snapshot.get_data(["name"], ids=["b"])) == [{"name": None}]
+
+    with snapshot.write(replace=False) as writer:
+        writer.insert([{"id": "b", "name": "B"}])
+    assert list(snapshot.get_data(["id", "name"])) == [
+        {"id": "a", "name": "A"},
+        {"id": "b", "name": "B"},
+    ]
+    # The cursor is kept when an incremental refresh doesn't move it
+    assert snapshot.get_meta()["cursor"] == "c0"
+
+    # A copy with other columns is not used
+    assert not Snapshot(path, ["id"], key="id").is_populated()
+
+
+def test_snapshot_write_failure(tmp_path: Path) -> None:
+    snapshot = Snapshot(str(tmp_path / "t.db"), ["id"], key="id")
+    with snapshot.write(replace=True) as writer:
+        writer.insert([{"id": "a"}])
+
+    with pytest.raises(RuntimeError):
+        with snapshot.write(replace=True) as writer:
+            writer.insert([{"id": "b"}])
+            raise RuntimeError("network error")
+
+    assert list(snapshot.get_data(["id"])) == [{"id": "a"}]
+
+
+def test_adapter_snapshot_updated_arg(
+    tmp_path: Path,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"users": [{"id": "1", "age": 30}, {"id": "2", "age": 5}]}},
+    )
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": {"users": [{"id": "2", "age": 40}]}},
+    )
+
+    adapter = GraphQLAdapter(
+        table="users",
+        include=[],
+        query_args={},
+        is_connection=False,
+        graphql_api=FAKE_GRAPHQL_API,
+        snapshots={
+            "users": {
+                "path": str(tmp_path / "users.db"),
+                "updated_arg": "age_gt",
+                "updated_column": "age",
+            }
+        },
+    )
+    assert list(adapter.get_data({}, [], requested_columns=["id", "age"])) == [
+        {"id": "1", "age": 30},
+        {"id": "2", "age": 5},
+    ]
+    # Served from the copy
+    assert list(adapter.get_data({}, [], requested_columns=["age"])) == [
+        {"age": 30},
+        {"age": 5},
+    ]
+    assert len(mocked_responses.calls) == 2
+
+    adapter.refresh_snapshot()
+    assert "age_gt: 30" in get_request_query(mocked_responses.calls[2])
+    assert list(adapter.get_data({}, [], requested_columns=["id", "age"])) == [
+        {"id": "1", "age": 30},
+        {"id": "2", "age": 40},
+    ]
+
+
+def test_adapter_snapshot_resume_cursor(
+    tmp_path: Path,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+    for page in range(2):
+        mocked_responses.add(
+            method=responses.POST,
+            url=FAKE_GRAPHQL_API,
+            json={
+                "data": {
+                    "allPeople": {
+                        "edges": [{"node": {"id": f"p{page}", "name": None}}],
+                        "pageInfo": {"endCursor": f"c{page}", "hasNextPage": False},
+                    }
+                }
+            },
+        )
+
+    adapter = GraphQLAdapter(
+        table="allPeople",
+        include=[],
+        query_args={},
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+        snapshots={
+            "allPeople": {"path": str(tmp_path / "people.db"), "resume_cursor": True}
+        },
+    )
+    adapter.refresh_snapshot()
+    adapter.refresh_snapshot()
+
+    assert 'after: "c0"' in get_request_query(mocked_responses.calls[2])
+    assert [row["id"] for row in adapter.get_data({}, [])] == ["p0", "p1"]
+
+
+def test_adapter_snapshot_not_used_with_query_args(
+    tmp_path: Path,
+    mocked_responses: responses.RequestsMock,
+    fake_introspection: Dict[str, Any],
+) -> None:
+    mocked_responses.add(
+        method=responses.POST,
+        url=FAKE_GRAPHQL_API,
+        json={"data": fake_introspection},
+    )
+
+    adapter = GraphQLAdapter(
+        table="allPeople",
+        include=[],
+        query_args={"first": 3},
+        is_connection=None,
+        graphql_api=FAKE_GRAPHQL_API,
+        snapshots={"allPeople": {"path": str(tmp_path / "people.db")}},
+    )
+    assert adapter.snapshot is None
@@ -0,0 +1,140 @@
+from typing import Any, List, Tuple
+
+import pytest
+
+from graphqldb.sql import (
+    Aggregate,
+    OrderBy,
+    Predicate,
+    SelectItem,
+    UnsupportedStatement,
+    find_tables,
+    parse_select,
+    sort_rows,
+    strip_explain,
+)
+
+# -----------------------------------------------------------------------------
+
+
+def test_parse_select_simple() -> None:
+    statement = parse_select("select id, name from allPeople")
+    assert statement.items == [SelectItem("id"), SelectItem("name")]
+    assert statement.table == "allPeople"
+    assert statement.where == []
+    assert not statement.is_aggregate
+
+
+def test_parse_select_quoted_table() -> None:
+    statement = parse_select("""SELECT "id" FROM 'allPeople?include=homeworld'""")
+    assert statement.table == "allPeople?include=homeworld"
+    assert statement.items == [SelectItem("id")]
+
+
+def test_parse_select_aggregate() -> None:
+    statement = parse_select(
+        """SELECT status AS status, count(*) AS count, SUM(users.age)
+        FROM users
+        WHERE age >= ? AND name IN ('a', 'b') AND deleted_at IS NULL
+        GROUP BY status
+        ORDER BY count DESC
+        LIMIT 10 OFFSET 5""",
+        (18,),
+    )
+    assert statement.items == [
+        SelectItem("status", "status"),
+        SelectItem(Aggregate("COUNT", None), "count"),
+        SelectItem(Aggregate("SUM", "age")),
+    ]
+    assert statement.items[2].name == "sum(age)"
+    assert statement.where == [
+        Predicate("age", ">=", 18),
+        Predicate("name", "IN", ["a", "b"]),
+        Predicate("deleted_at", "IS NULL"),
+    ]
+    assert statement.group_by == ["status"]
+    assert statement.order_by == [OrderBy("count", True)]
+    assert statement.limit == 10
+    assert statement.offset == 5
+    assert statement.is_aggregate
+
+
+def test_parse_select_between() -> None:
+    statement = parse_select("select a from t where a between 1 and -2.5")
+    assert statement.where == [Predicate("a", ">=", 1), Predicate("a", "<=", -2.5)]
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "select a from t1 join t2 on t1.a = t2.a",
+        "select a from t where a = 1 or a = 2",
+        "select distinct a from t",
+        "select upper(a) from t",
+        "select a from t where a like 'x%'",
+        "select a, count(*) from t group by a having count(*) > 1",
+        "select a from (select a from t)",
+        "select a from t order by 1",
+        "select a from t x",
+        "insert into t values (1)",
+    ],
+)
+def test_parse_select_unsupported(sql: str) -> None:
+    with pytest.raises(UnsupportedStatement):
+        parse_select(sql)
+
+
+def test_parse_select_negative_limit() -> None:
+    statement = parse_select("select a from t limit -1 offset -2")
+    assert statement.limit is None
+    assert statement.offset is None
+    assert parse_select("select a from t limit 2, -1").offset == 2
+
+
+def test_parse_select_parameters() -> None:
+    with pytest.raises(UnsupportedStatement):
+        parse_select("select a from t where a = ?")
+    with pytest.raises(UnsupportedStatement):
+        parse_select("select a from t", (1,))
+
+
+def test_sort_rows() -> None:
+    rows: List[Tuple[Any, ...]] = [(1, "b"), (None, "a"), (2, "a")]
+    assert sort_rows(rows, [(0, False)]) == [(None, "a"), (1, "b"), (2, "a")]
+    assert sort_rows(rows, [(0, True)]) == [(2, "a"), (1, "b"), (None, "a")]
+    assert sort_rows(rows, [(1, False), (0, True)]) == [
+        (2, "a"),
+        (None, "a"),
+        (1, "b"),
+    ]
+
+
+def test_strip_explain() -> None:
+    assert strip_explain("EXPLAIN select * from t") == "select * from t"
+    assert strip_explain("  explain\nselect 1") == "select 1"
+    assert strip_explain("explain query plan select * from t") is None
+    assert strip_explain("select * from t") is None
+
+
+def test_find_tables() -> None:
+    references, has_limit = find_tables(
+        'select p.name, u.age from main."allPeople?include=homeworld" as p '
+        "cross join users u where u.status = 'x'"
+    )
+    assert not has_limit
+    assert [(r.table, r.id_compared) for r in references] == [
+        ("allPeople?include=homeworld", False),
+        ("users", False),
+    ]
+    assert "name" in (references[0].columns or set())
+    assert not {"age", "status"} & (references[0].columns or set())
+    assert {"age", "status"} <= (references[1].columns or set())
+
+    references, has_limit = find_tables(
+        "select a.*, b.x from a, b join c on c.id = b.c_id "
+        "where b.y in (select y from d) limit 1"
+    )
+    assert has_limit
+    assert [r.table for r in references] == ["a", "b", "c", "d"]
+    assert references[0].columns is None
+    assert [r.id_compared for r in references] == [False, False, True, False]
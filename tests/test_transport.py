@@ -0,0 +1,121 @@
+from typing import Any, List
+
+import pytest
+import requests
+from sqlalchemy.engine import make_url
+
+from graphqldb.cancel import CancelToken, QueryCancelled, StatementScope, activate
+from graphqldb.dialect import APSWGraphQLDialect
+from graphqldb.lib import run_query, run_query_incremental
+from graphqldb.transport import HTTPXAdapter, get_session
+
+from .conftest import FAKE_GRAPHQL_API
+
+# -----------------------------------------------------------------------------
+
+
+def test_get_session_default() -> None:
+    assert get_session() is None
+    with pytest.raises(ValueError, match="Unknown transport"):
+        get_session("http3")
+
+
+def test_create_connect_args_transport() -> None:
+    dialect = APSWGraphQLDialect(transport="http2", max_streams=10)
+
+    _, kwargs = dialect.create_connect_args(make_url("graphql://host/path"))
+    kwargs_graphql = kwargs["adapter_kwargs"]["graphql"]
+    assert kwargs_graphql["transport"] == "http2"
+    assert kwargs_graphql["max_streams"] == 10
+
+    # The URL wins
+    url = make_url("graphql://host/path?transport=http1&max_streams=4")
+    _, kwargs = dialect.create_connect_args(url)
+    kwargs_graphql = kwargs["adapter_kwargs"]["graphql"]
+    assert kwargs_graphql["transport"] == "http1"
+    assert kwargs_graphql["max_streams"] == 4
+
+
+def _get_session(handler: Any) -> requests.Session:
+    httpx = pytest.importorskip("httpx")
+    adapter = HTTPXAdapter(
+        max_streams=1, client=httpx.Client(transport=httpx.MockTransport(handler))
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
+def test_httpx_adapter() -> None:
+    requests_seen: List[Any] = []
+
+    def handler(request: Any) -> Any:
+        import httpx
+
+        requests_seen.append(request)
+        return httpx.Response(200, json={"data": {"ok": True}})
+
+    session = _get_session(handler)
+    # The single stream is released after each response
+    for _ in range(2):
+        assert run_query(FAKE_GRAPHQL_API, query="{ok}", session=session) == {
+            "ok": True
+        }
+
+    assert b'"query": "{ok}"' in requests_seen[0].content
+    assert requests_seen[0].headers["content-type"] == "application/json"
+
+
+def test_httpx_adapter_incremental() -> None:
+    body = (
+        b'\r\n---\r\n\r\n{"data": {"users": []}, "hasNext": true}'
+        b'\r\n---\r\n\r\n{"incremental": [{"items": [1], "path": ["users", 0]}],'
+        b' "hasNext": false}\r\n-----\r\n'
+    )
+
+    def handler(request: Any) -> Any:
+        import httpx
+
+        return httpx.Response(
+            200, content=body, headers={"Content-Type": "multipart/mixed"}
+        )
+
+    session = _get_session(handler)
+    payloads = list(
+        run_query_incremental(FAKE_GRAPHQL_API, query="{users}", session=session)
+    )
+    assert [p["hasNext"] for p in payloads] == [True, False]
+
+
+def test_httpx_adapter_connection_error() -> None:
+    def handler(request: Any) -> Any:
+        import httpx
+
+        raise httpx.ConnectError("refused", request=request)
+
+    session = _get_session(handler)
+    with pytest.raises(requests.ConnectionError):
+        run_query(FAKE_GRAPHQL_API, query="{ok}", session=session)
+    # The stream was released
+    with pytest.raises(requests.ConnectionError):
+        run_query(FAKE_GRAPHQL_API, query="{ok}", session=session)
+
+
+def test_httpx_adapter_stream_deadline() -> None:
+    def handler(request: Any) -> Any:
+        import httpx
+
+        return httpx.Response(200, json={"data": {"ok": True}})
+
+    session = _get_session(handler)
+    adapter = session.get_adapter(FAKE_GRAPHQL_API)
+    assert isinstance(adapter, HTTPXAdapter)
+    # The single stream is taken, and isn't released before the deadline
+    adapter.streams.acquire()
+    with activate(StatementScope(CancelToken(), timeout=0.01)) as scope:
+        with pytest.raises(QueryCancelled, match="deadline"):
+            run_query(FAKE_GRAPHQL_API, query="{ok}", session=session)
+        scope.close()
+
+    adapter.streams.release()
+    assert run_query(FAKE_GRAPHQL_API, query="{ok}", session=session) == {"ok": True}